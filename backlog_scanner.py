@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+
+from logger import logger  # 导入日志模块
+from throttle import BatchThrottle
+
+
+class BacklogScanner:
+    """已有文件扫描器
+
+    监听开始时用 os.scandir 流式遍历监听文件夹，将监听关闭期间到达的文件交给分类管道处理。
+    递归监听的文件夹按其深度和通配符条件遍历子文件夹。
+    文件按批次提交，每批之间按速率限制休眠，避免登录时占满磁盘；可随时通过 stop 中断。
+    """
+
+    def __init__(self, roots, on_file, batch_size, files_per_second,
+                 progress_callback=None, should_skip=None, is_busy=None):
+        """
+        Args:
+            roots: 要扫描的监听文件夹（WatchRoot 列表）
+            on_file: 处理单个文件的回调函数，参数为文件路径
+            batch_size: 每批提交的文件数量
+            files_per_second: 每秒最多提交的文件数量，0 表示不限速
+            progress_callback: 进度回调，参数为已提交的文件数量和是否已完成
+            should_skip: 判断是否跳过文件的函数，参数为文件路径
+            is_busy: 判断分类管道是否繁忙的函数，繁忙时暂停提交
+        """
+        self.roots = roots
+        self.on_file = on_file
+        self.batch_size = max(1, int(batch_size))
+        self.files_per_second = max(0, float(files_per_second))
+        self.progress_callback = progress_callback
+        self.should_skip = should_skip
+        self.is_busy = is_busy
+        self.submitted = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.submitted = 0
+        self._thread = threading.Thread(target=self._run, name='BacklogScanner', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """中断扫描并等待扫描线程退出"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        start_time = time.monotonic()
+        self._throttle = BatchThrottle(self.files_per_second, self._stop_event, self.is_busy)
+        self._in_batch = 0
+        for root in self.roots:
+            if self._stop_event.is_set():
+                break
+            logger.info("开始扫描已有文件: %s", root.path)
+            try:
+                self._scan_root(root)
+            except Exception as e:
+                logger.error("扫描已有文件时出错: %s", e)
+
+        interrupted = self._stop_event.is_set()
+        if self.progress_callback:
+            self.progress_callback(self.submitted, True)
+        if interrupted:
+            logger.info("已有文件扫描被中断，已提交 %s 个文件", self.submitted)
+        else:
+            logger.info("已有文件扫描完成，共提交 %s 个文件，耗时 %.1f 秒", self.submitted, time.monotonic() - start_time)
+
+    def _scan_root(self, root):
+        """遍历一个监听文件夹，递归监听时按深度优先处理子文件夹"""
+        folders = [root.path]
+        while folders and not self._stop_event.is_set():
+            folder = folders.pop()
+            try:
+                entries = os.scandir(folder)
+            except OSError as e:
+                logger.warning("无法扫描文件夹 %s: %s", folder, e)
+                continue
+            with entries:
+                for entry in entries:
+                    if self._stop_event.is_set():
+                        return
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if root.recursive and root.accepts_folder(entry.path):
+                                if not (self.should_skip and self.should_skip(entry.path)):
+                                    folders.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if not root.accepts(entry.path):
+                        continue
+                    if self.should_skip and self.should_skip(entry.path):
+                        continue
+
+                    self.on_file(entry.path)
+                    self.submitted += 1
+                    self._in_batch += 1
+
+                    if self._in_batch >= self.batch_size:
+                        if self.progress_callback:
+                            self.progress_callback(self.submitted, False)
+                        self._throttle.wait(self._in_batch)
+                        self._in_batch = 0
+
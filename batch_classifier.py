@@ -0,0 +1,282 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from logger import logger  # 导入日志模块
+from name_allocator import TargetNameAllocator
+from move_engine import MoveEngine
+from content_sniffer import ContentSniffer
+from journal import ClassificationJournal, journal_path
+from dir_cache import known_directories
+from sharding import name_cache_size
+from watch_roots import WatchRoot
+from classifier_engine import is_temp_file
+from constants import WORKER_COUNT
+
+# 生成计划时每批交给线程池识别类型和匹配规则的文件数量
+PLAN_CHUNK_SIZE = 256
+
+
+class MoveTask:
+    """移动计划中的一项"""
+    __slots__ = ('source', 'destination', 'target_folder', 'category', 'size')
+
+    def __init__(self, source, destination, target_folder, category, size):
+        self.source = source
+        self.destination = destination
+        self.target_folder = target_folder
+        self.category = category
+        self.size = size
+
+
+class BatchReport:
+    """批量分类的结果"""
+    __slots__ = ('files', 'bytes', 'failed', 'seconds')
+
+    def __init__(self, files=0, bytes=0, failed=0, seconds=0.0):
+        self.files = files
+        self.bytes = bytes
+        self.failed = failed
+        self.seconds = seconds
+
+    @property
+    def files_per_second(self):
+        return self.files / self.seconds if self.seconds > 0 else float(self.files)
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes / self.seconds if self.seconds > 0 else float(self.bytes)
+
+
+class BatchClassifier:
+    """立即整理一个文件夹中的已有文件
+
+    用 os.scandir 流式遍历文件夹，按与监听模式相同的规则和重名处理生成完整的移动计划
+    （识别文件类型和规则匹配由线程池并行处理），然后按目标文件夹分组交给线程池执行：同一目标文件夹的文件由同一个线程依次移动，
+    不同目标文件夹之间并行。不经过文件事件和写入完成检测，适合一次整理大量文件。
+    """
+
+    def __init__(self, config_manager, worker_count=None):
+        """
+        Args:
+            config_manager: 配置管理器
+            worker_count: 生成和执行计划的线程数，为None时使用配置中的 worker_count
+        """
+        self.config_manager = config_manager
+        config = config_manager.get_config()
+        self.worker_count = max(1, int(worker_count or config.get('worker_count', WORKER_COUNT)))
+        self.move_engine = MoveEngine(fsync=config.get('fsync_after_copy', False))
+        self.content_sniffer = ContentSniffer() if config.get('content_sniffing', False) else None
+
+    def get_root(self, directory=None):
+        """获取要整理的文件夹，已在监听列表中时使用其过滤条件和专用规则
+
+        Args:
+            directory: 要整理的文件夹，为None时使用配置中的源文件夹
+
+        Returns:
+            WatchRoot: 要整理的文件夹，未设置时返回None
+        """
+        if not directory:
+            directory = self.config_manager.get_config().get('source_folder', '')
+        if not directory:
+            return None
+        key = os.path.normcase(os.path.abspath(directory))
+        for root in self.config_manager.get_watch_roots():
+            if root.key == key:
+                return root
+        return WatchRoot(directory)
+
+    def plan(self, root):
+        """生成移动计划，不修改任何文件
+
+        先用 os.scandir 流式遍历出候选文件，再把识别文件类型（读取文件头）和规则匹配按批次交给线程池并行处理，
+        最后按遍历顺序依次分配目标文件名，计划与单线程生成的结果一致。
+
+        Args:
+            root: 要整理的文件夹（WatchRoot）
+
+        Returns:
+            list: MoveTask 列表，按遍历顺序排列
+        """
+        start_time = time.perf_counter()
+        rule_index = self.config_manager.get_rule_index(root)
+        snapshot = self.config_manager.get_snapshot()
+        candidates = self._scan(root)
+
+        chunks = [candidates[i:i + PLAN_CHUNK_SIZE] for i in range(0, len(candidates), PLAN_CHUNK_SIZE)]
+        if self.worker_count > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix='BatchPlan') as executor:
+                matches = executor.map(lambda chunk: self._match_chunk(chunk, rule_index), chunks)
+                matches = [match for chunk_matches in matches for match in chunk_matches]
+        else:
+            matches = [match for chunk in chunks for match in self._match_chunk(chunk, rule_index)]
+
+        # 使用单独的分配器，计划中的文件名只记录在索引中，不创建占位文件；
+        # 索引被淘汰后计划中的文件名会丢失，缓存大小需要容纳全部分片子文件夹
+        allocator = TargetNameAllocator(name_cache_size(snapshot.shard_policies.values()))
+        # 计划中的文件按已移动计入按数量分片的子文件夹，使用单独的分片方式，不影响实际移动的计数
+        shard_policies = {}
+        tasks = []
+        for (file_path, file_name, stat), (target_folder, category) in zip(candidates, matches):
+            if not target_folder:
+                logger.warning("未找到目标文件夹，文件 %s 不会被移动", file_path)
+                continue
+            policy = snapshot.get_shard_policy(target_folder)
+            if policy is not None:
+                if target_folder not in shard_policies:
+                    shard_policies[target_folder] = policy.copy()
+                policy = shard_policies[target_folder]
+                target_folder = policy.folder_for(file_name, stat.st_mtime)
+                policy.commit(target_folder)
+            destination = allocator.reserve(target_folder, file_name, create=False)
+            tasks.append(MoveTask(file_path, destination, target_folder, category, stat.st_size))
+
+        logger.info("移动计划生成完成: %s, 共 %s 个文件，耗时 %.2f 秒",
+                    root.path, len(tasks), time.perf_counter() - start_time)
+        return tasks
+
+    def _scan(self, root):
+        """遍历要整理的文件夹，返回 (文件路径, 文件名, stat) 列表"""
+        candidates = []
+        folders = [root.path]
+        while folders:
+            folder = folders.pop()
+            try:
+                entries = os.scandir(folder)
+            except OSError as e:
+                logger.warning("无法扫描文件夹 %s: %s", folder, e)
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if (root.recursive and root.accepts_folder(entry.path)
+                                    and not self.config_manager.is_in_target_folder(entry.path)):
+                                folders.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if is_temp_file(entry.path) or not root.accepts(entry.path):
+                        continue
+                    if self.config_manager.is_in_target_folder(entry.path):
+                        continue
+                    candidates.append((entry.path, entry.name, stat))
+        return candidates
+
+    def _match_chunk(self, chunk, rule_index):
+        """识别一批文件的类型并匹配规则，在线程池中调用
+
+        Returns:
+            list: 与 chunk 对应的 (目标文件夹, 分类名称) 列表
+        """
+        matches = []
+        for file_path, file_name, stat in chunk:
+            _, file_extension = os.path.splitext(file_name)
+            file_extension = file_extension.lower()
+            if self.content_sniffer:
+                file_extension = self.content_sniffer.refine_extension(file_path, file_extension, rule_index)
+            matches.append(rule_index.match(file_path, file_extension, stat))
+        return matches
+
+    def execute(self, tasks, progress_callback=None):
+        """按目标文件夹分组并行执行移动计划
+
+        目标文件名在执行时重新分配，目标文件夹在生成计划后没有变化时与计划一致。
+
+        Args:
+            tasks: plan 返回的 MoveTask 列表
+            progress_callback: 进度回调，参数为已处理的文件数量和文件总数，在工作线程中调用
+
+        Returns:
+            BatchReport: 执行结果
+        """
+        groups = {}
+        for task in tasks:
+            groups.setdefault(task.target_folder, []).append(task)
+
+        # 找回上次中断的跨文件系统复制，重新执行同一计划时从中断处继续
+        self.move_engine.recover_partials(list(groups))
+        report = BatchReport()
+        lock = threading.Lock()
+        allocator = TargetNameAllocator(name_cache_size(self.config_manager.get_snapshot().shard_policies.values()))
+        journal = ClassificationJournal(journal_path(self.config_manager))
+        total = len(tasks)
+
+        def run_group(target_folder, group):
+            files = size = failed = 0
+            try:
+                known_directories.ensure(target_folder)
+            except OSError as e:
+                logger.error("创建目标文件夹 %s 失败: %s", target_folder, e)
+                failed = len(group)
+                group = []
+            for task in group:
+                target_file_path = None
+                try:
+                    started = time.time()
+                    target_file_path = allocator.reserve(target_folder, os.path.basename(task.source))
+                    result = self.move_engine.move(task.source, target_file_path)
+                    journal.record(task.source, target_file_path, task.category, result.size, started)
+                    files += 1
+                    size += result.size
+                except Exception as e:
+                    if target_file_path:
+                        allocator.release(target_file_path)
+                    logger.error("移动文件 %s 时出错: %s", task.source, e)
+                    failed += 1
+            with lock:
+                report.files += files
+                report.bytes += size
+                report.failed += failed
+                done = report.files + report.failed
+            if progress_callback:
+                progress_callback(done, total)
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix='BatchClassifier') as executor:
+            for target_folder, group in groups.items():
+                executor.submit(run_group, target_folder, group)
+        report.seconds = time.perf_counter() - start_time
+        journal.close()
+
+        logger.info("批量分类完成: %s 个文件, %s 个失败, 耗时 %.2f 秒, %.1f 文件/秒, %.1f MB/秒",
+                    report.files, report.failed, report.seconds,
+                    report.files_per_second, report.bytes_per_second / 1024 / 1024)
+        return report
+
+
+def run_batch(directory=None, dry_run=False):
+    """命令行入口：整理文件夹并在标准输出中打印计划或结果
+
+    Args:
+        directory: 要整理的文件夹，为None时使用配置中的源文件夹
+        dry_run: 只打印移动计划，不移动文件
+
+    Returns:
+        int: 进程退出码
+    """
+    from config_manager import ConfigManager
+
+    classifier = BatchClassifier(ConfigManager())
+    root = classifier.get_root(directory)
+    if root is None or not os.path.isdir(root.path):
+        print(f"文件夹不存在或未设置源文件夹: {directory or ''}")
+        return 1
+
+    tasks = classifier.plan(root)
+    total_bytes = sum(task.size for task in tasks)
+    if dry_run:
+        for task in tasks:
+            print(f"{task.source} -> {task.destination}")
+        print(f"共 {len(tasks)} 个文件, {total_bytes / 1024 / 1024:.1f} MB（未移动任何文件）")
+        return 0
+
+    report = classifier.execute(tasks)
+    print(f"已移动 {report.files} 个文件, 失败 {report.failed} 个, 耗时 {report.seconds:.2f} 秒")
+    print(f"速度: {report.files_per_second:.1f} 文件/秒, {report.bytes_per_second / 1024 / 1024:.1f} MB/秒")
+    return 0 if report.failed == 0 else 1
@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# 各场景的默认文件数量和文件大小（字节）
+SCENARIOS = {
+    'small_files': (1000, 4 * 1024),            # 大量小文件同时出现
+    'large_files': (3, 128 * 1024 * 1024),      # 少量大文件
+    'slow_writers': (20, 1024 * 1024),          # 类似浏览器下载，多个文件同时分块缓慢写入
+    'crdownload': (200, 64 * 1024),             # 先写入 .crdownload 临时文件，完成后重命名
+    'collisions': (500, 4 * 1024),              # 大量同名文件，目标文件夹中已有许多同名文件
+}
+
+# 测试使用的分类规则
+_EXTENSIONS = ('.pdf', '.jpg', '.zip', '.mp4', '.txt')
+
+# 写入文件时每次写入的字节数
+_WRITE_CHUNK_SIZE = 1024 * 1024
+# 缓慢写入时每块的大小和间隔（秒）
+_SLOW_CHUNK_SIZE = 64 * 1024
+_SLOW_CHUNK_DELAY = 0.02
+
+
+def _file_key(file_path):
+    """同一文件系统内移动不改变文件标识，用于对应源文件和移动后的文件"""
+    stat = os.stat(file_path)
+    return stat.st_dev, stat.st_ino
+
+
+def _percentile(values, q):
+    """最近秩法计算分位数，values 需已排序"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def peak_rss():
+    """获取当前进程的峰值内存（字节），不支持的系统返回None"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 的单位是 KB，macOS 是字节
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _write_file(file_path, size, chunk_size=_WRITE_CHUNK_SIZE, delay=0.0):
+    chunk = b'\0' * min(chunk_size, max(size, 1))
+    with open(file_path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            f.write(chunk[:remaining])
+            remaining -= len(chunk)
+            if delay and remaining > 0:
+                f.flush()
+                time.sleep(delay)
+
+
+def _make_listener():
+    from classifier_engine import EngineListener
+
+    class LatencyListener(EngineListener):
+        """记录每个文件从写入完成到移动完成的耗时"""
+
+        def __init__(self):
+            self.latencies = []
+            self.last_moved = None
+            self._ready = {}  # 文件标识 -> 写入完成的时间
+            self._moved = {}  # 先于 expect 收到的移动通知
+            self._condition = threading.Condition()
+
+        def expect(self, file_path):
+            """文件写入完成（或重命名为最终文件名）后调用"""
+            now = time.perf_counter()
+            key = _file_key(file_path)
+            with self._condition:
+                moved = self._moved.pop(key, None)
+                if moved is None:
+                    self._ready[key] = now
+                else:
+                    self.latencies.append(max(0.0, moved - now))
+                    self._condition.notify_all()
+
+        def file_classified(self, file_path, target_folder):
+            now = time.perf_counter()
+            try:
+                key = _file_key(file_path)
+            except OSError:
+                return
+            with self._condition:
+                self.last_moved = now
+                ready = self._ready.pop(key, None)
+                if ready is None:
+                    self._moved[key] = now
+                else:
+                    self.latencies.append(now - ready)
+                    self._condition.notify_all()
+
+        def wait(self, count, timeout):
+            """等待 count 个文件移动完成，返回是否全部完成"""
+            deadline = time.monotonic() + timeout
+            with self._condition:
+                while len(self.latencies) < count:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            return True
+
+    return LatencyListener()
+
+
+def _generate(scenario, source, target, count, size, listener, seed):
+    """按场景在监听文件夹中生成文件"""
+    rng = random.Random(seed)
+
+    def name(i):
+        return f'file_{i:06d}{rng.choice(_EXTENSIONS)}'
+
+    if scenario in ('small_files', 'large_files'):
+        for i in range(count):
+            file_path = os.path.join(source, name(i))
+            _write_file(file_path, size)
+            listener.expect(file_path)
+
+    elif scenario == 'slow_writers':
+        def writer(file_path):
+            _write_file(file_path, size, _SLOW_CHUNK_SIZE, _SLOW_CHUNK_DELAY)
+            listener.expect(file_path)
+
+        threads = [threading.Thread(target=writer, args=(os.path.join(source, name(i)),)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    elif scenario == 'crdownload':
+        for i in range(count):
+            file_path = os.path.join(source, name(i))
+            _write_file(file_path + '.crdownload', size)
+            os.replace(file_path + '.crdownload', file_path)
+            listener.expect(file_path)
+
+    elif scenario == 'collisions':
+        # 目标文件夹中预先放入同名文件，源文件位于不同的子文件夹中但文件名相同
+        folder = os.path.join(target, 'pdf')
+        os.makedirs(folder, exist_ok=True)
+        open(os.path.join(folder, 'report.pdf'), 'wb').close()
+        for i in range(1, count + 1):
+            open(os.path.join(folder, f'report_{i}.pdf'), 'wb').close()
+        for i in range(count):
+            folder = os.path.join(source, f'd{i:06d}')
+            os.mkdir(folder)
+            file_path = os.path.join(folder, 'report.pdf')
+            _write_file(file_path, size)
+            listener.expect(file_path)
+
+    else:
+        raise ValueError(f'未知的场景: {scenario}')
+
+
+def run_scenario(scenario, count=None, size=None, workers=None, timeout=600.0, seed=0):
+    """在当前进程中运行一个场景
+
+    使用临时文件夹中的独立配置，不影响用户的配置、分类记录和重复文件索引。
+
+    Returns:
+        dict: 测试结果
+    """
+    from config_manager import ConfigManager
+    from classifier_engine import ClassifierEngine
+
+    default_count, default_size = SCENARIOS[scenario]
+    count = default_count if count is None else count
+    size = default_size if size is None else size
+
+    work_dir = tempfile.mkdtemp(prefix='fc_benchmark_')
+    try:
+        source = os.path.join(work_dir, 'source')
+        target = os.path.join(work_dir, 'target')
+        os.makedirs(source)
+        os.makedirs(target)
+
+        config_manager = ConfigManager(os.path.join(work_dir, 'config.json'))
+        config = config_manager.get_config()
+        config.update({
+            'source_folder': source,
+            'watch_roots': [{'path': source, 'recursive': True}],
+            'rules': [{'extensions': [ext], 'target_folder': os.path.join(target, ext[1:]), 'category': ext[1:]}
+                      for ext in _EXTENSIONS],
+            'default_target_folder': '',
+            'scan_existing_files': False,
+        })
+        if workers:
+            config['worker_count'] = workers
+        config_manager.save_config(config, immediate=True)
+        config_manager.compile_rules()
+
+        engine = ClassifierEngine(config_manager)
+        listener = _make_listener()
+        engine.add_listener(listener)
+        if not engine.start():
+            raise RuntimeError('无法启动分类引擎')
+        try:
+            started = time.perf_counter()
+            _generate(scenario, source, target, count, size, listener, seed)
+            completed = listener.wait(count, timeout)
+        finally:
+            engine.stop()
+            config_manager.flush()
+
+        latencies = sorted(listener.latencies)
+        end = listener.last_moved or time.perf_counter()
+        seconds = end - started
+        return {
+            'scenario': scenario,
+            'files': count,
+            'file_size': size,
+            'moved': len(latencies),
+            'completed': completed,
+            'seconds': round(seconds, 4),
+            'files_per_second': round(len(latencies) / seconds, 2) if seconds > 0 else 0.0,
+            'bytes_per_second': round(len(latencies) * size / seconds, 2) if seconds > 0 else 0.0,
+            'latency_p50': round(_percentile(latencies, 0.5), 6),
+            'latency_p99': round(_percentile(latencies, 0.99), 6),
+            'latency_max': round(latencies[-1], 6) if latencies else 0.0,
+            'peak_rss': peak_rss(),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _run_isolated(scenario, args):
+    """在子进程中运行场景，保证各场景的峰值内存互不影响"""
+    command = [sys.executable, os.path.abspath(__file__), '--child', scenario,
+               '--timeout', str(args.timeout), '--seed', str(args.seed)]
+    for option in ('count', 'size', 'workers'):
+        value = getattr(args, option)
+        if value is not None:
+            command += [f'--{option}', str(value)]
+    # 子进程的日志输出到标准错误，只在失败时显示
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr.decode('utf-8', 'replace'))
+        raise RuntimeError(f'场景 {scenario} 运行失败')
+    return json.loads(process.stdout.decode('utf-8').strip().splitlines()[-1])
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout.decode().strip()
+    except Exception:
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='文件分类管道的吞吐量和延迟测试')
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help=f'要运行的场景，默认全部运行: {", ".join(SCENARIOS)}')
+    parser.add_argument('--count', type=int, help='每个场景的文件数量，默认使用场景的默认值')
+    parser.add_argument('--size', type=int, help='文件大小（字节），默认使用场景的默认值')
+    parser.add_argument('--workers', type=int, help='分类线程数，默认使用配置的默认值')
+    parser.add_argument('--timeout', type=float, default=600.0, help='每个场景等待文件移动完成的最长时间（秒）')
+    parser.add_argument('--seed', type=int, default=0, help='生成文件名的随机种子')
+    parser.add_argument('--output', metavar='FILE', help='保存 JSON 结果的文件路径')
+    parser.add_argument('--child', metavar='SCENARIO', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        result = run_scenario(args.child, args.count, args.size, args.workers, args.timeout, args.seed)
+        print(json.dumps(result))
+        return 0
+
+    scenarios = args.scenarios or list(SCENARIOS)
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        print(f"未知的场景: {', '.join(unknown)}")
+        return 2
+
+    results = []
+    for scenario in scenarios:
+        result = _run_isolated(scenario, args)
+        results.append(result)
+        rss = f"{result['peak_rss'] / 1024 / 1024:.1f} MB" if result['peak_rss'] else '-'
+        print(f"{scenario:<14} {result['moved']}/{result['files']} 个文件  "
+              f"{result['files_per_second']:.1f} 文件/秒  "
+              f"p50 {result['latency_p50'] * 1000:.1f} ms  p99 {result['latency_p99'] * 1000:.1f} ms  "
+              f"峰值内存 {rss}")
+
+    if args.output:
+        report = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+    return 0 if all(result['completed'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,617 @@
+import os
+import time
+import threading
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+from logger import logger  # 导入日志模块
+from settle_detector import SettleDetector
+from event_coalescer import EventCoalescer
+from worker_pool import ClassificationWorkerPool
+from name_allocator import TargetNameAllocator
+from move_engine import MoveEngine
+from content_sniffer import ContentSniffer
+from dedup_index import DuplicateIndex
+from journal import ClassificationJournal, journal_path
+from metrics import metrics, MetricsExporter
+from dir_cache import known_directories
+from backlog_scanner import BacklogScanner
+from sharding import ShardRebalancer, name_cache_size
+from poll_watcher import PollingObserver, is_remote_filesystem
+from watch_roots import find_root
+from startup_profiler import profiler
+from constants import (WORKER_COUNT, WORKER_QUEUE_SIZE, SPILL_FILE, BACKLOG_BATCH_SIZE, BACKLOG_FILES_PER_SECOND,
+                       DEDUP_INDEX_FILE, SHARD_REBALANCE_BATCH_SIZE, SHARD_REBALANCE_FILES_PER_SECOND)
+
+
+def is_temp_file(file_path):
+    """判断是否是下载过程中的临时文件"""
+    _, file_extension = os.path.splitext(file_path)
+    file_extension = file_extension.lower()
+    file_name = os.path.basename(file_path)
+    return file_extension == '.tmp' or file_extension == '.crdownload' or '.tmp' in file_name
+
+
+class EngineListener:
+    """分类引擎的事件监听器
+
+    按需重写下列方法后通过 ClassifierEngine.add_listener 注册。
+    回调在引擎的后台线程中调用，界面程序需要自行切换到界面线程。
+    """
+
+    def file_classified(self, file_path, target_folder):
+        """文件已被移动到目标文件夹
+
+        Args:
+            file_path: 移动后的文件路径
+            target_folder: 目标文件夹
+        """
+
+    def backlog_progress(self, submitted, finished):
+        """已有文件扫描进度
+
+        Args:
+            submitted: 已提交分类的文件数量
+            finished: 扫描是否已结束
+        """
+
+    def monitoring_changed(self, is_monitoring):
+        """监听状态变化
+
+        Args:
+            is_monitoring: 是否正在监听
+        """
+
+
+class FileEventHandler(FileSystemEventHandler):
+    def __init__(self, engine, root):
+        super().__init__()
+        self.engine = engine
+        self.root = root
+
+    def accepts(self, file_path):
+        """判断文件是否满足监听文件夹的过滤条件，并且不在分类目标文件夹中"""
+        if not self.root.accepts(file_path):
+            return False
+        return not self.engine.config_manager.is_in_target_folder(file_path)
+
+    def on_created(self, event):
+        # 只处理文件创建事件，忽略目录创建事件
+        if not event.is_directory:
+            file_path = event.src_path
+            logger.debug("检测到文件创建事件: %s", file_path)
+
+            # 忽略明显的临时文件
+            if is_temp_file(file_path):
+                logger.debug("忽略临时文件: %s", file_path)
+                return
+
+            if not self.accepts(file_path):
+                logger.debug("文件不满足监听条件，忽略: %s", file_path)
+                return
+
+            # 先合并同一文件的重复事件，再交给写入完成检测器，不阻塞事件线程
+            self.engine.event_coalescer.submit(file_path)
+
+    def on_moved(self, event):
+        # 处理文件重命名事件（包括Chrome下载完成后的.tmp文件重命名）
+        if not event.is_directory:
+            # 获取目标文件路径（重命名后的文件路径）
+            dest_path = event.dest_path
+
+            # 检查源文件是否是临时文件
+            src_path = event.src_path
+
+            logger.debug("检测到文件移动/重命名事件: %s -> %s", src_path, dest_path)
+
+            # 如果源文件是临时文件，则等待目标文件写入完成后处理
+            if is_temp_file(src_path) and self.accepts(dest_path):
+                logger.debug("检测到临时文件重命名: %s -> %s", src_path, dest_path)
+                self.engine.event_coalescer.submit(dest_path)
+
+
+class ClassifierEngine:
+    """文件分类引擎
+
+    包含监听、写入完成检测、规则匹配和文件移动的完整管道，不依赖任何界面库，
+    可以由托盘程序或后台守护进程使用。状态变化通过 EngineListener 通知调用方。
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self.observer = None
+        self.poll_observer = None
+        self.watch_roots = []
+        self._watches = {}  # 监听文件夹路径 -> (事件处理器, 监听对象, 所属的 Observer)
+        self._listeners = []
+        self._lock = threading.RLock()
+        self.backlog_scanner = None
+        self.shard_rebalancer = None
+        self._shard_keys = ()  # 正在整理的分片设置，设置变化时重新整理
+        self.is_monitoring = False
+        self.settle_detector = SettleDetector(self.on_file_settled)
+        self.event_coalescer = EventCoalescer(self.settle_detector.submit)
+        self.name_allocator = TargetNameAllocator()
+        self.content_sniffer = ContentSniffer()
+        self.move_engine = MoveEngine(fsync=self.config_manager.get_config().get('fsync_after_copy', False))
+
+        # 文件分类线程池，队列满时溢出到配置目录下的文件
+        config = self.config_manager.get_config()
+        config_dir = os.path.dirname(os.path.abspath(self.config_manager.config_file))
+        spill_file = os.path.join(config_dir, SPILL_FILE)
+        self.duplicate_index = DuplicateIndex(os.path.join(config_dir, DEDUP_INDEX_FILE))
+        self.journal = ClassificationJournal(journal_path(self.config_manager))
+        self.worker_pool = ClassificationWorkerPool(
+            self.process_new_file,
+            config.get('worker_count', WORKER_COUNT),
+            config.get('queue_size', WORKER_QUEUE_SIZE),
+            spill_file
+        )
+        self.metrics_exporter = None
+        # 队列深度等状态值在导出指标时读取
+        metrics.register_collector('pipeline', self.get_stats)
+        logger.debug("ClassifierEngine 实例已创建")
+
+    def add_listener(self, listener):
+        """注册事件监听器
+
+        Args:
+            listener: EngineListener 实例
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event, *args):
+        """依次调用监听器的回调，单个监听器出错不影响其他监听器和分类管道"""
+        for listener in list(self._listeners):
+            try:
+                getattr(listener, event)(*args)
+            except Exception as e:
+                logger.error("调用事件监听器 %s 时出错: %s", event, e)
+
+    def start(self):
+        """开始监听
+
+        Returns:
+            bool: 是否正在监听
+        """
+        with self._lock:
+            if self.is_monitoring:
+                logger.debug("文件监视器已经在运行中，不需要重新启动")
+                return True
+
+            config = self.config_manager.get_config()
+
+            # 所有监听文件夹共用一个 Observer 和同一条分类管道
+            self.watch_roots = self._get_valid_roots()
+            if not self.watch_roots:
+                logger.warning("没有有效的监听文件夹，无法启动监视器")
+                return False
+            self._resize_name_cache()
+
+            self.worker_pool.start()
+            self.settle_detector.start()
+            self.event_coalescer.start()
+            self.observer = Observer()
+            # 网络文件系统不提供变化通知，使用轮询监听
+            self.poll_observer = PollingObserver()
+            self._watches = {}
+            for root in self.watch_roots:
+                self._schedule_root(root)
+            self.observer.start()
+            self.poll_observer.start()
+            self.is_monitoring = True
+
+            # 按配置导出指标文件或本机 /metrics 接口
+            if config.get('metrics_file') or config.get('metrics_port'):
+                self.metrics_exporter = MetricsExporter(metrics, config.get('metrics_file', ''),
+                                                        int(config.get('metrics_port', 0) or 0))
+                self.metrics_exporter.start()
+
+        self._notify('monitoring_changed', True)
+
+        # 启动耗时分析模式只测量启动过程，不创建目标文件夹，也不整理已有文件
+        if profiler.enabled:
+            return True
+
+        self._ensure_target_folders()
+        # 找回上次运行中断的跨文件系统复制，删除过期的临时文件和空占位文件
+        threading.Thread(target=self.move_engine.recover_partials,
+                         args=(self.config_manager.get_snapshot().target_folders,),
+                         name='RecoverPartials', daemon=True).start()
+        # 处理监听关闭期间到达的文件
+        if config.get('scan_existing_files', True):
+            self.start_backlog_scan()
+        # 把设置分片之前直接存放在目标文件夹中的文件整理到子文件夹
+        if config.get('shard_rebalance', True):
+            self.start_shard_rebalance()
+        return True
+
+    def reload_config(self):
+        """热更新配置，不重建监视器
+
+        分类规则和目标文件夹通过规则快照自动生效；只有监听文件夹的集合或递归选项变化时，
+        才在运行中的 Observer 上增删对应的监听，未变化的文件夹不受影响。
+        """
+        with self._lock:
+            if not self.is_monitoring:
+                return
+
+            new_roots = self._get_valid_roots()
+            new_keys = {root.key for root in new_roots}
+
+            # 移除不再监听或递归、轮询选项变化的文件夹
+            for key, (handler, watch, observer) in list(self._watches.items()):
+                new_root = next((root for root in new_roots if root.key == key), None)
+                if (new_root is None or new_root.recursive != handler.root.recursive
+                        or new_root.polling != handler.root.polling):
+                    observer.unschedule(watch)
+                    del self._watches[key]
+                    logger.info("停止监听文件夹: %s", handler.root.path)
+                else:
+                    # 只更新过滤条件，事件处理器继续使用原有的监听
+                    handler.root = new_root
+
+            added_roots = []
+            for root in new_roots:
+                if root.key not in self._watches:
+                    self._schedule_root(root)
+                    added_roots.append(root)
+
+            self.watch_roots = new_roots
+            self._resize_name_cache()
+            self._ensure_target_folders()
+
+            # 新增的监听文件夹也需要处理其中已有的文件；上一次扫描未完成时重新扫描全部文件夹
+            if added_roots and self.config_manager.get_config().get('scan_existing_files', True):
+                if self.backlog_scanner and self.backlog_scanner.is_running():
+                    self.backlog_scanner.stop()
+                    added_roots = new_roots
+                self.start_backlog_scan(added_roots)
+            if self.config_manager.get_config().get('shard_rebalance', True):
+                self.start_shard_rebalance()
+            elif self.shard_rebalancer:
+                self.shard_rebalancer.stop()
+                self.shard_rebalancer = None
+                self._shard_keys = ()
+            if not new_keys:
+                logger.warning("没有有效的监听文件夹，监视器处于空闲状态")
+            logger.info("配置已热更新，规则版本: %s", self.config_manager.get_snapshot().version)
+
+    def _get_valid_roots(self):
+        """获取当前配置中存在的监听文件夹"""
+        roots = []
+        for root in self.config_manager.get_watch_roots():
+            if os.path.isdir(root.path):
+                roots.append(root)
+            else:
+                logger.warning("监听文件夹无效或不存在: %s，已跳过", root.path)
+        return roots
+
+    def _schedule_root(self, root):
+        """在 Observer 上添加一个监听文件夹，网络文件系统上的文件夹改为轮询监听"""
+        handler = FileEventHandler(self, root)
+        polling = root.polling
+        if polling is None:
+            polling = is_remote_filesystem(root.path)
+        if polling:
+            watch = self.poll_observer.schedule(handler, skip_folder=self.config_manager.is_in_target_folder)
+            self._watches[root.key] = (handler, watch, self.poll_observer)
+        else:
+            watch = self.observer.schedule(handler, root.path, recursive=root.recursive)
+            self._watches[root.key] = (handler, watch, self.observer)
+        logger.info("开始监听文件夹: %s%s%s", root.path, " (包含子文件夹)" if root.recursive else "",
+                    " (轮询)" if polling else "")
+
+    def start_backlog_scan(self, roots=None):
+        """扫描监听文件夹中已有的文件并交给分类管道处理
+
+        Args:
+            roots: 要扫描的监听文件夹，为None时扫描全部监听文件夹
+        """
+        config = self.config_manager.get_config()
+        self.backlog_scanner = BacklogScanner(
+            roots if roots is not None else self.watch_roots,
+            # 已有文件与实时事件一样先等待写入完成，监听开始时仍在下载的文件不会被移动到一半
+            self.settle_detector.submit,
+            config.get('backlog_batch_size', BACKLOG_BATCH_SIZE),
+            config.get('backlog_files_per_second', BACKLOG_FILES_PER_SECOND),
+            progress_callback=lambda submitted, finished: self._notify('backlog_progress', submitted, finished),
+            should_skip=lambda path: is_temp_file(path) or self.config_manager.is_in_target_folder(path),
+            is_busy=lambda: (self.worker_pool.is_saturated()
+                             or self.settle_detector.pending_count() >= self.worker_pool.capacity // 2)
+        )
+        self.backlog_scanner.start()
+
+    def _ensure_target_folders(self):
+        """在后台一次性创建所有目标文件夹，分类文件时不再需要 os.makedirs
+
+        热更新配置通常在界面线程中进行，文件夹位于网络驱动器时也不会卡住界面。
+        """
+        known_directories.ensure_all_in_background(self.config_manager.get_snapshot().target_folders)
+
+    def _resize_name_cache(self):
+        """按分片子文件夹的数量调整文件名索引的缓存大小"""
+        policies = self.config_manager.get_snapshot().shard_policies.values()
+        self.name_allocator.set_capacity(name_cache_size(policies))
+
+    def start_shard_rebalance(self):
+        """在后台整理设置了分片的目标文件夹，分片设置没有变化且上一次整理仍在进行时不重新开始"""
+        policies = list(self.config_manager.get_snapshot().shard_policies.values())
+        keys = tuple(policy.key for policy in policies)
+        if keys == self._shard_keys and self.shard_rebalancer and self.shard_rebalancer.is_running():
+            return
+        if self.shard_rebalancer:
+            self.shard_rebalancer.stop()
+            self.shard_rebalancer = None
+        self._shard_keys = keys
+        if not policies:
+            return
+        config = self.config_manager.get_config()
+        self.shard_rebalancer = ShardRebalancer(
+            policies, self.name_allocator, self.move_engine, self.journal, self.duplicate_index,
+            config.get('shard_rebalance_batch_size', SHARD_REBALANCE_BATCH_SIZE),
+            config.get('shard_rebalance_files_per_second', SHARD_REBALANCE_FILES_PER_SECOND),
+            is_busy=lambda: self.worker_pool.stats()['in_flight'] > 0
+        )
+        self.shard_rebalancer.start()
+
+    def stop(self):
+        with self._lock:
+            if not (self.observer and self.is_monitoring):
+                logger.debug("文件监视器未运行，无需停止")
+                return
+            logger.info("停止文件监视器")
+            if self.backlog_scanner:
+                self.backlog_scanner.stop()
+                self.backlog_scanner = None
+            if self.shard_rebalancer:
+                self.shard_rebalancer.stop()
+                self.shard_rebalancer = None
+                self._shard_keys = ()
+            self.observer.stop()
+            self.poll_observer.stop()
+            self.observer.join()
+            self.poll_observer.join()
+            self.event_coalescer.stop()
+            self.settle_detector.stop()
+            self.worker_pool.stop()
+            self.duplicate_index.save()
+            self.journal.close()
+            if self.metrics_exporter:
+                self.metrics_exporter.stop()
+                self.metrics_exporter = None
+            self._watches = {}
+            self.is_monitoring = False
+
+        self._notify('monitoring_changed', False)
+
+    def on_file_settled(self, file_path):
+        """文件写入完成后的回调，在写入完成检测线程中调用，将文件交给线程池处理"""
+        logger.info("处理写入完成的文件: %s", file_path)
+        self.enqueue_file(file_path)
+
+    def enqueue_file(self, file_path):
+        """确定文件的目标文件夹后交给线程池处理"""
+        root = find_root(self.watch_roots, file_path)
+        target_folder, category = self.resolve_target_folder(file_path, root)
+        if not target_folder:
+            logger.warning("未找到目标文件夹，文件 %s 不会被移动", file_path)
+            return
+        self.worker_pool.submit(file_path, target_folder, category)
+
+    def get_stats(self):
+        """获取处理管道的状态
+
+        Returns:
+            dict: 文件事件合并计数、等待写入完成的文件数量、轮询计数、分片整理计数以及线程池的队列深度、正在处理的任务数等
+        """
+        stats = self.worker_pool.stats()
+        stats.update(self.event_coalescer.stats())
+        stats['settling'] = self.settle_detector.pending_count()
+        if self.poll_observer is not None:
+            stats.update(self.poll_observer.stats())
+        if self.shard_rebalancer is not None:
+            stats['rebalanced'] = self.shard_rebalancer.moved
+        return stats
+
+    def resolve_target_folder(self, file_path, root=None):
+        """根据分类规则确定文件的目标文件夹
+
+        Args:
+            file_path: 文件路径
+            root: 文件所在的监听文件夹，设置了专用规则时使用该文件夹的规则
+
+        Returns:
+            tuple: (目标文件夹, 分类名称)，没有可用的目标文件夹时目标文件夹为None
+        """
+        # 获取文件扩展名
+        _, file_extension = os.path.splitext(file_path)
+        file_extension = file_extension.lower()
+
+        logger.info("处理新文件: %s, 扩展名: %s", file_path, file_extension)
+
+        # 在编译后的规则查找表中查找（扩展名、文件名、大小和修改时间条件），保持按规则顺序第一个匹配的规则生效
+        lookup_started = time.perf_counter()
+        rule_index = self.config_manager.get_rule_index(root)
+        if self.config_manager.get_config().get('content_sniffing', False):
+            # 扩展名没有匹配到规则时（包括没有扩展名）根据文件内容识别类型
+            file_extension = self.content_sniffer.refine_extension(file_path, file_extension, rule_index)
+        target_folder, category = rule_index.match(file_path, file_extension)
+        metrics.observe('rule_lookup', time.perf_counter() - lookup_started)
+        logger.debug("匹配分类: %s, 目标文件夹: %s", category, target_folder)
+
+        return target_folder, category
+
+    def process_new_file(self, file_path, target_folder=None, category=None):
+        """将文件移动到目标文件夹
+
+        Args:
+            file_path: 文件路径
+            target_folder: 目标文件夹，为None时根据分类规则确定
+            category: 匹配到的分类名称，记录在分类记录中，为None时使用目标文件夹的名称
+        """
+        # 再次检查文件是否存在
+        if not os.path.exists(file_path):
+            logger.warning("文件不再存在，无法处理: %s", file_path)
+            return
+
+        if target_folder is None:
+            target_folder, category = self.resolve_target_folder(file_path, find_root(self.watch_roots, file_path))
+
+        # 如果找到了目标文件夹，移动文件
+        if target_folder:
+            try:
+                # 再次检查文件是否存在
+                if not os.path.exists(file_path):
+                    logger.warning("文件不再存在，无法移动: %s", file_path)
+                    return
+
+                started = time.time()
+
+                # 规则设置了分片时放入目标文件夹下的子文件夹，分类名称仍按规则的目标文件夹确定
+                rule_folder = target_folder
+                if not category:
+                    category = os.path.basename(os.path.normpath(rule_folder))
+                shard_policy = self.config_manager.get_snapshot().get_shard_policy(rule_folder)
+                if shard_policy is not None:
+                    target_folder = self._shard_folder(file_path, shard_policy)
+
+                # 确保目标文件夹存在，规则中的目标文件夹已在开始监听时创建，通常只需一次缓存查找
+                stage_started = time.perf_counter()
+                known_directories.ensure(target_folder)
+                metrics.observe('mkdir', time.perf_counter() - stage_started)
+
+                # 目标文件夹中已有内容相同的文件时按配置跳过、删除或改为硬链接；
+                # 设置了分片时在规则的目标文件夹及其全部分片子文件夹中查找
+                duplicate_action = self.config_manager.get_config().get('duplicate_action', 'none')
+                duplicate = None
+                dedup_folder = rule_folder if shard_policy is not None else None
+                if duplicate_action != 'none':
+                    duplicate = self.duplicate_index.find_duplicate(file_path, rule_folder,
+                                                                    recursive=shard_policy is not None)
+                    if duplicate and self.handle_duplicate(file_path, duplicate, duplicate_action, rule_folder):
+                        if duplicate_action == 'delete' and not os.path.exists(file_path):
+                            self.journal.record(file_path, duplicate, category,
+                                                os.path.getsize(duplicate), started, action='delete')
+                        return
+
+                # 分配不冲突的目标文件名（已存在同名文件时自动添加序号）
+                file_name = os.path.basename(file_path)
+                stage_started = time.perf_counter()
+                try:
+                    target_file_path = self.name_allocator.reserve(target_folder, file_name)
+                except FileNotFoundError:
+                    # 目标文件夹在记录到缓存之后被删除，重新创建后再分配一次
+                    known_directories.invalidate(target_folder)
+                    self.name_allocator.invalidate(target_folder)
+                    known_directories.ensure(target_folder)
+                    target_file_path = self.name_allocator.reserve(target_folder, file_name)
+                metrics.observe('name_allocation', time.perf_counter() - stage_started)
+
+                result = None
+                linked = duplicate_action == 'hardlink' and duplicate and self.link_duplicate(
+                    file_path, duplicate, target_file_path)
+                if not linked:
+                    # 移动文件，覆盖分配文件名时创建的占位文件
+                    logger.info("移动文件: %s -> %s", file_path, target_file_path)
+                    try:
+                        stage_started = time.perf_counter()
+                        result = self.move_engine.move(file_path, target_file_path)
+                        metrics.observe('move', time.perf_counter() - stage_started)
+                    except Exception:
+                        self.name_allocator.release(target_file_path)
+                        raise
+                if shard_policy is not None:
+                    shard_policy.commit(target_folder)
+                if duplicate_action != 'none':
+                    self.duplicate_index.add(target_file_path, dedup_folder)
+                self.journal.record(file_path, target_file_path, category,
+                                    result.size if result else os.path.getsize(target_file_path), started,
+                                    action='move' if result else 'hardlink')
+                metrics.inc('files_classified_total')
+                if result:
+                    metrics.inc('bytes_moved_total', result.size)
+                if result and not result.same_device:
+                    logger.info("跨文件系统复制完成: %s 字节, 耗时 %.2f 秒, 速度 %.1f MB/s",
+                                result.size, result.seconds, result.throughput / 1024 / 1024)
+
+                # 通知监听器，传递重命名后的文件路径和规则的目标文件夹路径（不是分片子文件夹）
+                stage_started = time.perf_counter()
+                self._notify('file_classified', target_file_path, rule_folder)
+                metrics.observe('notify', time.perf_counter() - stage_started)
+                logger.debug("文件分类完成，通知监听器: %s", target_file_path)
+            except Exception as e:
+                metrics.inc('move_errors_total')
+                logger.error("移动文件 %s 时出错: %s", file_path, e)
+        else:
+            logger.warning("未找到目标文件夹，文件 %s 不会被移动", file_path)
+
+    def _shard_folder(self, file_path, policy):
+        """按目标文件夹的分片方式获取文件应放入的子文件夹"""
+        mtime = None
+        if policy.needs_mtime:
+            try:
+                mtime = os.path.getmtime(file_path)
+            except OSError:
+                pass
+        return policy.folder_for(os.path.basename(file_path), mtime)
+
+    def handle_duplicate(self, file_path, duplicate, action, target_folder=None):
+        """处理与目标文件夹中已有文件内容相同的文件
+
+        Args:
+            file_path: 待分类的文件路径
+            duplicate: 目标文件夹中内容相同的文件
+            action: 处理方式，skip 保留原文件不移动，delete 删除原文件，hardlink 由 link_duplicate 处理
+            target_folder: 通知监听器时使用的规则目标文件夹，为None时使用重复文件所在的文件夹
+
+        Returns:
+            bool: 文件是否已处理完毕，无需继续移动
+        """
+        if action == 'skip':
+            logger.info("目标文件夹中已有相同文件，跳过: %s", file_path)
+            return True
+        if action == 'delete':
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                logger.error("删除重复文件 %s 失败: %s", file_path, e)
+                return True
+            logger.info("目标文件夹中已有相同文件 %s，已删除: %s", duplicate, file_path)
+            self._notify('file_classified', duplicate, target_folder or os.path.dirname(duplicate))
+            return True
+        return False
+
+    def link_duplicate(self, file_path, duplicate, target_file_path):
+        """用指向已有文件的硬链接代替重复文件，不支持硬链接时返回 False 改为正常移动
+
+        Args:
+            file_path: 待分类的文件路径
+            duplicate: 目标文件夹中内容相同的文件
+            target_file_path: 分配的目标文件路径（占位文件）
+
+        Returns:
+            bool: 是否已创建硬链接并删除原文件
+        """
+        link_path = target_file_path + '.fclink'
+        try:
+            os.link(duplicate, link_path)
+            os.replace(link_path, target_file_path)
+        except OSError as e:
+            logger.warning("创建硬链接失败，改为移动文件: %s", e)
+            try:
+                os.remove(link_path)
+            except OSError:
+                pass
+            return False
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            logger.warning("删除已链接的重复文件 %s 失败: %s", file_path, e)
+        logger.info("目标文件夹中已有相同文件，已创建硬链接: %s -> %s", target_file_path, duplicate)
+        return True
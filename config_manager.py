@@ -1,7 +1,13 @@
 import os
 import json
+import time
+import atexit
 import platform
+import threading
 from logger import logger  # 导入日志模块
+from constants import CONFIG_SAVE_DELAY, CONFIG_SAVE_MAX_DELAY, CONFIG_COMPACT_RULES
+from rule_index import RuleIndex, RulesSnapshot
+from watch_roots import load_watch_roots
 
 class ConfigManager:
     def __init__(self, config_file='config.json'):
@@ -22,19 +28,26 @@ class ConfigManager:
         # 确保配置目录存在
         try:
             os.makedirs(app_data_dir, exist_ok=True)
-            logger.debug(f"确保配置目录存在: {app_data_dir}")
+            logger.debug("确保配置目录存在: %s", app_data_dir)
         except Exception as e:
-            logger.error(f"创建配置目录失败: {str(e)}")
+            logger.error("创建配置目录失败: %s", e)
             # 如果创建目录失败，回退到应用程序目录
             app_data_dir = os.path.dirname(os.path.abspath(__file__))
-            logger.warning(f"回退到应用程序目录: {app_data_dir}")
+            logger.warning("回退到应用程序目录: %s", app_data_dir)
         
         # 设置配置文件的完整路径
         self.config_file = os.path.join(app_data_dir, config_file)
-        logger.debug(f"配置文件路径: {self.config_file}")
+        logger.debug("配置文件路径: %s", self.config_file)
+        
+        # 延迟写入的状态：短时间内的多次保存合并为一次写入
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._dirty_since = None
+        atexit.register(self.flush)
         
         # 加载配置
         self.config = self.load_config()
+        self.compile_rules()
         logger.info("配置管理器初始化完成")
     
     default_config = {
@@ -183,57 +196,211 @@ class ConfigManager:
         ],
         "auto_start": False,
         "show_notifications": True,
-        "is_monitoring": False
+        "is_monitoring": False,
+        "worker_count": 4,
+        "queue_size": 1000,
+        "fsync_after_copy": False,
+        "scan_existing_files": True,
+        "content_sniffing": False,
+        "duplicate_action": "none",
+        "metrics_file": "",
+        "metrics_port": 0,
+        "backlog_batch_size": 100,
+        "backlog_files_per_second": 200,
+        "shard_rebalance": True,
+        "shard_rebalance_batch_size": 200,
+        "shard_rebalance_files_per_second": 100,
+        "watch_roots": []
     }
 
     def load_config(self):
         try:
             if os.path.exists(self.config_file):
-                logger.debug(f"正在加载配置文件: {self.config_file}")
+                logger.debug("正在加载配置文件: %s", self.config_file)
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                 logger.info("配置文件加载成功")
                 return config
             else:
-                logger.warning(f"配置文件不存在: {self.config_file}，将创建默认配置")
-                self.save_config(self.default_config)
+                logger.warning("配置文件不存在: %s，将创建默认配置", self.config_file)
+                self._write_config(self.default_config)
                 return self.default_config
         except Exception as e:
-            logger.error(f"加载配置文件时出错: {str(e)}，将使用默认配置")
+            logger.error("加载配置文件时出错: %s，将使用默认配置", e)
             return self.default_config
     
-    def save_config(self, config=None):
+    def save_config(self, config=None, immediate=False):
+        """保存配置
+        
+        新配置立即生效（包括重新编译规则快照），写入磁盘则延迟进行：
+        CONFIG_SAVE_DELAY 秒内的多次保存只写入一次，最长延迟 CONFIG_SAVE_MAX_DELAY 秒。
+        
+        Args:
+            config: 新的配置，为None时保存当前配置
+            immediate: 是否立即写入磁盘并返回写入结果
+        
+        Returns:
+            bool: immediate 为 True 时返回是否写入成功，否则返回 True
+        """
         if config is None:
             config = self.config
         
+        self.config = config
+        self.compile_rules()
+        
+        with self._save_lock:
+            now = time.monotonic()
+            if self._dirty_since is None:
+                self._dirty_since = now
+        if immediate:
+            return self.flush()
+        
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            delay = min(CONFIG_SAVE_DELAY, max(0, self._dirty_since + CONFIG_SAVE_MAX_DELAY - now))
+            self._save_timer = threading.Timer(delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+        logger.debug("配置已更新，等待写入文件")
+        return True
+    
+    def flush(self):
+        """立即将尚未写入的配置写入磁盘，取消等待中的延迟写入
+        
+        Returns:
+            bool: 是否写入成功（没有需要写入的修改时返回 True）
+        """
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty_since is None:
+                return True
+            self._dirty_since = None
+            return self._write_config(self.config)
+    
+    def reload(self):
+        """从磁盘重新加载配置（例如被其他程序修改后），并重新编译规则快照"""
+        self.flush()
+        self.config = self.load_config()
+        self.compile_rules()
+        logger.info("配置已从文件重新加载")
+
+    def _write_config(self, config):
+        """以原子方式写入配置文件：先写临时文件并 fsync，再替换原文件"""
         try:
-            logger.debug(f"正在保存配置到文件: {self.config_file}")
+            logger.debug("正在保存配置到文件: %s", self.config_file)
             # 确保配置文件目录存在
             os.makedirs(os.path.dirname(os.path.abspath(self.config_file)), exist_ok=True)
             
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
+            # 规则很多时使用紧凑格式，减少写入量
+            if len(config.get('rules', [])) > CONFIG_COMPACT_RULES:
+                content = json.dumps(config, ensure_ascii=False, separators=(',', ':'))
+            else:
+                content = json.dumps(config, ensure_ascii=False, indent=4)
+            
+            temp_file = self.config_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.config_file)
             
-            self.config = config
             logger.info("配置保存成功")
             return True
         except Exception as e:
-            logger.error(f"保存配置文件时出错: {str(e)}")
+            logger.error("保存配置文件时出错: %s", e)
             return False
     
+    def compile_rules(self):
+        """根据当前配置编译新版本的规则快照，并原子地替换当前快照"""
+        config = self.config
+        default_target_folder = config.get('default_target_folder', '')
+        rule_index = RuleIndex(config.get('rules', []), default_target_folder)
+        
+        # 设置了专用规则或默认分类文件夹的监听文件夹使用单独的查找表
+        watch_roots = load_watch_roots(config)
+        root_rule_indexes = {}
+        target_folders = [default_target_folder] + rule_index.target_folders()
+        for root in watch_roots:
+            if root.rules is None and root.default_target_folder is None:
+                continue
+            root_index = RuleIndex(
+                root.rules if root.rules is not None else config.get('rules', []),
+                root.default_target_folder if root.default_target_folder is not None else default_target_folder
+            )
+            root_rule_indexes[root.key] = root_index
+            target_folders.append(root.default_target_folder)
+            target_folders.extend(root_index.target_folders())
+
+        # 设置了分片的目标文件夹，同一文件夹只保留一个分片方式（按数量分片的计数需要共用）
+        shard_policies = {}
+        for index in [rule_index] + list(root_rule_indexes.values()):
+            for policy in index.shard_policies():
+                shard_policies.setdefault(policy.target_folder, policy)
+        
+        # 目标文件夹（及其子文件夹）中的文件不应再被分类
+        target_prefixes = {
+            os.path.normcase(os.path.abspath(folder)).rstrip(os.sep) + os.sep
+            for folder in target_folders if folder
+        }
+        
+        previous = getattr(self, 'snapshot', None)
+        version = previous.version + 1 if previous else 1
+        # 编译规则不访问文件系统，目标文件夹在开始监听时才创建（查询记录、预览移动计划时不会创建文件夹）
+        self.snapshot = RulesSnapshot(version, rule_index, root_rule_indexes, watch_roots, target_prefixes,
+                                      shard_policies, dict.fromkeys(folder for folder in target_folders if folder))
+        logger.debug("规则快照已更新到版本 %s，共 %s 个扩展名, %s 个监听文件夹", version, len(rule_index), len(watch_roots))
+    
+    def get_snapshot(self):
+        """获取当前版本的规则快照
+        
+        Returns:
+            RulesSnapshot: 当前规则快照，调用方处理一个文件期间应始终使用同一个快照
+        """
+        return self.snapshot
+    
+    def get_rule_index(self, root=None):
+        """获取编译后的规则查找表
+        
+        Args:
+            root: 文件所在的监听文件夹（WatchRoot），为None时返回全局规则的查找表
+        
+        Returns:
+            RuleIndex: 对应的查找表
+        """
+        return self.snapshot.get_rule_index(root)
+    
+    def get_watch_roots(self):
+        """获取所有被监听的文件夹
+        
+        Returns:
+            tuple: WatchRoot 列表
+        """
+        return self.snapshot.watch_roots
+    
+    def has_valid_watch_root(self):
+        """是否至少有一个存在的监听文件夹"""
+        return any(os.path.isdir(root.path) for root in self.snapshot.watch_roots)
+    
+    def is_in_target_folder(self, file_path):
+        """判断文件（或文件夹）是否位于某个分类目标文件夹中"""
+        return self.snapshot.is_in_target_folder(file_path)
+    
     def get_config(self):
         logger.debug("获取当前配置")
         return self.config
     
     def update_config(self, key, value):
-        logger.debug(f"更新配置: {key} = {value}")
+        logger.debug("更新配置: %s = %s", key, value)
         self.config[key] = value
         return self.save_config()
     
     def update_rule(self, index, extensions=None, target_folder=None, category=None):
-        logger.debug(f"更新规则 #{index}: 扩展名={extensions}, 目标文件夹={target_folder}, 分类={category}")
+        logger.debug("更新规则 #%s: 扩展名=%s, 目标文件夹=%s, 分类=%s", index, extensions, target_folder, category)
         if 'rules' not in self.config or index >= len(self.config['rules']):
-            logger.warning(f"规则 #{index} 不存在，无法更新")
+            logger.warning("规则 #%s 不存在，无法更新", index)
             return False
         
         if extensions is not None:
@@ -248,7 +415,7 @@ class ConfigManager:
         return self.save_config()
     
     def add_rule(self, extensions, target_folder, category):
-        logger.debug(f"添加规则: 扩展名={extensions}, 目标文件夹={target_folder}, 分类={category}")
+        logger.debug("添加规则: 扩展名=%s, 目标文件夹=%s, 分类=%s", extensions, target_folder, category)
         new_rule = {
             "extensions": extensions,
             "target_folder": target_folder,
@@ -259,9 +426,9 @@ class ConfigManager:
         return self.save_config()
     
     def delete_rule(self, index):
-        logger.debug(f"删除规则 #{index}")
+        logger.debug("删除规则 #%s", index)
         if 'rules' not in self.config or index >= len(self.config['rules']):
-            logger.warning(f"规则 #{index} 不存在，无法删除")
+            logger.warning("规则 #%s 不存在，无法删除", index)
             return False
         
         del self.config['rules'][index]
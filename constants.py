@@ -6,4 +6,59 @@ APP_NAME = "麦悠-文件自动分类器"
 # 日志设置
 ENABLE_LOGGING = True  # 是否启用日志记录
 LOG_LEVEL = "INFO"    # 日志级别：DEBUG, INFO, WARNING, ERROR, CRITICAL
-LOG_FILE = "file_classifier.log"  # 日志文件名
\ No newline at end of file
+LOG_FILE = "file_classifier.log"  # 日志文件名
+
+# 文件写入完成检测设置
+SETTLE_MIN_INTERVAL = 0.1   # 首次检查文件状态的间隔（秒）
+SETTLE_MAX_INTERVAL = 5.0   # 文件持续写入时的最大检查间隔（秒）
+SETTLE_STABLE_CHECKS = 2    # 文件大小和修改时间需要连续保持不变的检查次数
+SETTLE_QUIET_PERIOD = 1.0   # 文件大小和修改时间最后一次变化后至少经过的时间（秒），网络下载常有较长的停顿
+SETTLE_MAX_WAIT = 3600      # 单个文件最长等待时间（秒），超时后放弃处理
+
+# 文件事件合并设置
+COALESCE_WINDOW = 0.2       # 同一路径的事件在该时间内（秒）没有新事件后才交给写入完成检测
+COALESCE_REMEMBER = 10.0    # 已交给分类管道的文件标识保留时间（秒），期间同一文件的重复事件被丢弃
+
+# 网络文件夹轮询设置（文件系统不提供变化通知时使用）
+POLL_MIN_INTERVAL = 1.0     # 有文件变化时的轮询间隔（秒）
+POLL_MAX_INTERVAL = 30.0    # 长时间没有变化时的最大轮询间隔（秒）
+POLL_RACY_WINDOW = 2.0      # 文件夹修改时间与上次扫描相差不足该时间（秒）时仍重新扫描，网络文件系统的时间精度可能较低
+
+# 文件内容识别设置
+CONTENT_SNIFF_BYTES = 4096        # 识别文件类型时最多读取的字节数
+CONTENT_SNIFF_CACHE_SIZE = 4096   # 缓存的识别结果数量
+
+# 重复文件检测设置
+DEDUP_INDEX_FILE = "dedup_index.json"   # 目标文件夹内容索引的文件名
+DEDUP_PARTIAL_BYTES = 64 * 1024         # 部分哈希读取的文件开头和结尾的字节数
+
+# 分类记录设置
+JOURNAL_FILE = "classification_journal.db"   # 分类记录数据库的文件名
+JOURNAL_BATCH_SIZE = 500                     # 每个事务最多写入的记录数量
+
+# 文件分类线程池设置
+WORKER_COUNT = 4            # 默认工作线程数量
+WORKER_QUEUE_SIZE = 1000    # 每个工作线程的队列容量
+SPILL_FILE = "pending_files.jsonl"  # 队列溢出时保存待处理文件的文件名
+
+# 已有文件扫描设置
+BACKLOG_BATCH_SIZE = 100          # 每批提交的文件数量
+BACKLOG_FILES_PER_SECOND = 200    # 每秒最多提交的文件数量，0 表示不限速
+
+# 通知设置
+NOTIFICATION_BATCH_WINDOW = 1.0    # 该时间内（秒）分类的文件合并为一条通知
+NOTIFICATION_HISTORY_SIZE = 64     # 保留分类文件信息的通知条数
+NOTIFICATION_MAX_FILES = 20        # 每条通知最多保留的文件路径数量
+
+# 配置保存设置
+CONFIG_SAVE_DELAY = 0.5       # 配置变化后延迟写入文件的时间（秒），期间的多次保存合并为一次
+CONFIG_SAVE_MAX_DELAY = 3.0   # 连续修改配置时最长的写入延迟（秒）
+CONFIG_COMPACT_RULES = 100    # 规则数量超过该值时使用紧凑的 JSON 格式保存
+
+# 目标文件夹分片设置
+SHARD_DATE_FORMAT = "%Y/%m"             # 按日期分片时子文件夹的格式
+SHARD_HASH_PREFIX_LENGTH = 2            # 按哈希分片时使用的十六进制前缀长度（2 表示 256 个子文件夹）
+SHARD_MAX_ENTRIES = 10000               # 按数量分片时每个子文件夹最多存放的文件数量
+SHARD_REBALANCE_BATCH_SIZE = 200        # 整理已有文件时每批移动的文件数量
+SHARD_REBALANCE_FILES_PER_SECOND = 100  # 整理已有文件时每秒最多移动的文件数量，0 表示不限速
+SHARD_REBALANCE_MIN_AGE = 60.0          # 修改时间在该时间（秒）之内的文件暂不整理，避免移动正在分类的文件
@@ -0,0 +1,166 @@
+import os
+import threading
+from collections import OrderedDict
+
+from logger import logger  # 导入日志模块
+from constants import CONTENT_SNIFF_BYTES, CONTENT_SNIFF_CACHE_SIZE
+
+# 文件头特征：(偏移量, 特征字节, 扩展名)
+_SIGNATURES = (
+    (0, b'%PDF-', '.pdf'),
+    (0, b'\x89PNG\r\n\x1a\n', '.png'),
+    (0, b'\xff\xd8\xff', '.jpg'),
+    (0, b'GIF87a', '.gif'),
+    (0, b'GIF89a', '.gif'),
+    (0, b'BM', '.bmp'),
+    (0, b'II*\x00', '.tif'),
+    (0, b'MM\x00*', '.tif'),
+    (0, b'PK\x03\x04', '.zip'),
+    (0, b'PK\x05\x06', '.zip'),
+    (0, b'Rar!\x1a\x07', '.rar'),
+    (0, b"7z\xbc\xaf'\x1c", '.7z'),
+    (0, b'\x1f\x8b', '.gz'),
+    (0, b'BZh', '.bz2'),
+    (0, b'\xfd7zXZ\x00', '.xz'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', '.doc'),
+    (0, b'\x7fELF', '.elf'),
+    (0, b'MZ', '.exe'),
+    (0, b'RIFF', '.riff'),
+    (0, b'ID3', '.mp3'),
+    (0, b'\xff\xfb', '.mp3'),
+    (0, b'fLaC', '.flac'),
+    (0, b'OggS', '.ogg'),
+    (0, b'\x1aE\xdf\xa3', '.mkv'),
+    (0, b'SQLite format 3\x00', '.sqlite'),
+    (0, b'{\\rtf', '.rtf'),
+    (4, b'ftyp', '.mp4'),
+    (257, b'ustar', '.tar'),
+)
+
+# 同一文件头对应多种格式时按文件头中的附加信息细分
+_FTYP_BRANDS = {b'qt  ': '.mov', b'M4A ': '.m4a', b'heic': '.heic', b'heix': '.heic', b'3gp4': '.3gp'}
+_RIFF_FORMATS = {b'WAVE': '.wav', b'AVI ': '.avi', b'WEBP': '.webp'}
+_ZIP_MARKERS = ((b'mimetypeapplication/epub+zip', '.epub'), (b'word/', '.docx'),
+                (b'xl/', '.xlsx'), (b'ppt/', '.pptx'), (b'AndroidManifest.xml', '.apk'))
+
+
+def _compile_signatures(signatures):
+    """按偏移量和特征的前两个字节建立查找表，同一位置较长的特征优先匹配"""
+    table = {}
+    for offset, magic, extension in signatures:
+        table.setdefault((offset, magic[:2]), []).append((magic, extension))
+    for candidates in table.values():
+        candidates.sort(key=lambda item: len(item[0]), reverse=True)
+    offsets = sorted({offset for offset, _, _ in signatures})
+    return table, offsets
+
+
+_SIGNATURE_TABLE, _SIGNATURE_OFFSETS = _compile_signatures(_SIGNATURES)
+
+
+def detect_extension(head):
+    """根据文件开头的内容判断文件类型
+
+    Args:
+        head: 文件开头的字节
+
+    Returns:
+        str: 小写的扩展名（包含点），无法识别时返回None
+    """
+    for offset in _SIGNATURE_OFFSETS:
+        candidates = _SIGNATURE_TABLE.get((offset, head[offset:offset + 2]))
+        if not candidates:
+            continue
+        for magic, extension in candidates:
+            if head.startswith(magic, offset):
+                return _refine(extension, head)
+    return None
+
+
+def _refine(extension, head):
+    """细分容器格式（ZIP 中的 Office 文档、RIFF 和 ISO 媒体文件）"""
+    if extension == '.zip':
+        for marker, refined in _ZIP_MARKERS:
+            if marker in head:
+                return refined
+    elif extension == '.riff':
+        return _RIFF_FORMATS.get(head[8:12])
+    elif extension == '.mp4':
+        return _FTYP_BRANDS.get(head[8:12], '.mp4')
+    elif extension == '.bmp':
+        # "BM" 过短，再检查必须为0的保留字段，避免误判以 BM 开头的文本文件
+        return extension if head[6:10] == b'\x00\x00\x00\x00' else None
+    return extension
+
+
+class ContentSniffer:
+    """根据文件内容识别文件类型
+
+    只在扩展名没有匹配到规则时使用：最多读取文件开头 CONTENT_SNIFF_BYTES 字节（一次 pread），
+    与编译后的文件头特征表比较。结果按 (设备号, inode, 大小, 修改时间) 缓存，同一文件不会重复读取。
+    """
+
+    def __init__(self, read_bytes=CONTENT_SNIFF_BYTES, cache_size=CONTENT_SNIFF_CACHE_SIZE):
+        self.read_bytes = read_bytes
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sniff(self, file_path):
+        """识别文件类型
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            str: 识别出的扩展名，无法识别或无法读取时返回None
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        try:
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        except OSError as e:
+            logger.debug("无法读取文件内容: %s, %s", file_path, e)
+            return None
+        try:
+            if hasattr(os, 'pread'):
+                head = os.pread(fd, self.read_bytes, 0)
+            else:
+                head = os.read(fd, self.read_bytes)
+        except OSError as e:
+            logger.debug("读取文件内容失败: %s, %s", file_path, e)
+            return None
+        finally:
+            os.close(fd)
+
+        extension = detect_extension(head)
+        with self._lock:
+            self._cache[key] = extension
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        logger.debug("根据文件内容识别类型: %s -> %s", file_path, extension)
+        return extension
+
+    def refine_extension(self, file_path, file_extension, rule_index):
+        """扩展名没有匹配到规则时，尝试用文件内容识别出的扩展名代替
+
+        Args:
+            file_path: 文件路径
+            file_extension: 小写的文件扩展名
+            rule_index: 当前使用的规则查找表
+
+        Returns:
+            str: 用于查找规则的扩展名
+        """
+        if rule_index.matches(file_extension):
+            return file_extension
+        extension = self.sniff(file_path)
+        return extension or file_extension
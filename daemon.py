@@ -0,0 +1,68 @@
+import signal
+import threading
+
+from logger import logger  # 导入日志模块
+from config_manager import ConfigManager
+from classifier_engine import ClassifierEngine, EngineListener
+from constants import APP_NAME
+
+
+class _LogListener(EngineListener):
+    """后台模式下没有托盘通知，分类结果写入日志"""
+
+    def file_classified(self, file_path, target_folder):
+        logger.info("文件已分类: %s", file_path)
+
+    def backlog_progress(self, submitted, finished):
+        if finished:
+            logger.info("已有文件整理完成，共 %s 个文件", submitted)
+
+
+def run_daemon():
+    """以无界面的后台模式运行分类引擎，直到收到 SIGINT/SIGTERM
+
+    不导入任何 Qt 模块。收到 SIGHUP 时从磁盘重新加载配置并热更新监听文件夹和规则。
+
+    Returns:
+        int: 进程退出码
+    """
+    logger.info("%s 以后台模式启动", APP_NAME)
+    config_manager = ConfigManager()
+    engine = ClassifierEngine(config_manager)
+    engine.add_listener(_LogListener())
+
+    stop_event = threading.Event()
+    reload_event = threading.Event()
+
+    # 信号处理函数中只设置标志，日志和清理在主循环中进行
+    def on_stop(signum, frame):
+        stop_event.set()
+
+    def on_reload(signum, frame):
+        reload_event.set()
+
+    signal.signal(signal.SIGINT, on_stop)
+    signal.signal(signal.SIGTERM, on_stop)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, on_reload)
+
+    # 后台模式总是开始监听，不受托盘程序中监听开关的影响
+    if not engine.start():
+        logger.error("没有有效的监听文件夹，后台模式退出")
+        return 1
+
+    try:
+        while True:
+            # 带超时等待，保证 Windows 下也能及时响应 Ctrl+C，并定期检查重新加载请求
+            if stop_event.wait(1.0):
+                logger.info("收到退出信号，正在停止")
+                break
+            if reload_event.is_set():
+                reload_event.clear()
+                config_manager.reload()
+                engine.reload_config()
+    finally:
+        engine.stop()
+        config_manager.flush()
+        logger.info("%s 后台模式已退出", APP_NAME)
+    return 0
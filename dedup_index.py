@@ -0,0 +1,274 @@
+import os
+import json
+import hashlib
+import threading
+
+from logger import logger  # 导入日志模块
+from constants import DEDUP_PARTIAL_BYTES
+
+# 完整哈希每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 发现重复文件时的处理方式
+DUPLICATE_ACTIONS = ('none', 'skip', 'hardlink', 'delete')
+
+
+def partial_hash(file_path, size):
+    """计算文件开头和结尾各 DEDUP_PARTIAL_BYTES 字节的哈希"""
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(DEDUP_PARTIAL_BYTES))
+        if size > DEDUP_PARTIAL_BYTES * 2:
+            f.seek(-DEDUP_PARTIAL_BYTES, os.SEEK_END)
+            digest.update(f.read(DEDUP_PARTIAL_BYTES))
+        elif size > DEDUP_PARTIAL_BYTES:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def full_hash(file_path):
+    """流式计算整个文件的哈希"""
+    digest = hashlib.blake2b()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+
+class _Entry:
+    """目标文件夹中一个文件的索引信息，哈希在需要时才计算"""
+    __slots__ = ('size', 'mtime', 'partial', 'full')
+
+    def __init__(self, size, mtime, partial=None, full=None):
+        self.size = size
+        self.mtime = mtime
+        self.partial = partial
+        self.full = full
+
+
+class _FolderIndex:
+    """单个目标文件夹的索引：文件名 -> 索引信息，以及 文件大小 -> 文件名集合"""
+    __slots__ = ('entries', 'by_size')
+
+    def __init__(self):
+        self.entries = {}
+        self.by_size = {}
+
+    def add(self, name, entry):
+        self.remove(name)
+        self.entries[name] = entry
+        self.by_size.setdefault(entry.size, set()).add(name)
+
+    def remove(self, name):
+        entry = self.entries.pop(name, None)
+        if entry is not None:
+            names = self.by_size.get(entry.size)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self.by_size[entry.size]
+
+
+class DuplicateIndex:
+    """目标文件夹内容索引，用于检测重复下载的文件
+
+    每个目标文件夹首次使用时用 os.scandir 建立 文件大小 -> 文件名 的索引，之后由分类管道的移动增量维护。
+    检测时先按文件大小查找候选文件（一次字典查找），大小相同时比较开头和结尾的部分哈希，
+    部分哈希也相同时才计算完整的流式哈希。计算过的哈希和文件大小、修改时间一起保存到磁盘，
+    重启后未变化的文件不需要重新计算。哈希在调用方（分类线程池）中计算，不占用事件线程。
+    设置了分片的目标文件夹使用递归索引，包含所有分片子文件夹中的文件（按相对路径记录），
+    同一文件被分到不同子文件夹时也能检测到重复。
+    """
+
+    def __init__(self, index_file=None):
+        """
+        Args:
+            index_file: 保存索引的文件路径，为None时不保存
+        """
+        self.index_file = index_file
+        self._folders = {}
+        self._stored = None  # 从磁盘加载、尚未使用的文件夹索引
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def find_duplicate(self, file_path, target_folder, recursive=False):
+        """在目标文件夹中查找与文件内容完全相同的文件
+
+        Args:
+            file_path: 待分类的文件路径
+            target_folder: 目标文件夹
+            recursive: 是否同时查找子文件夹（分片子文件夹）中的文件
+
+        Returns:
+            str: 内容相同的文件路径，没有时返回None
+        """
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return None
+        if size == 0:
+            # 空文件（包括分配文件名时创建的占位文件）不作为重复文件处理
+            return None
+        with self._lock:
+            folder = self._get_folder(target_folder, recursive)
+            candidates = [(name, folder.entries[name]) for name in folder.by_size.get(size, ())]
+        if not candidates:
+            return None
+
+        source_partial = source_full = None
+        for name, entry in candidates:
+            candidate_path = os.path.join(target_folder, name)
+            try:
+                stat = os.stat(candidate_path)
+                if stat.st_size != entry.size or stat.st_mtime_ns != entry.mtime:
+                    # 文件在索引之后被修改或删除，更新索引后跳过
+                    self._refresh(target_folder, name, stat, recursive)
+                    continue
+                if source_partial is None:
+                    source_partial = partial_hash(file_path, size)
+                if entry.partial is None:
+                    entry.partial = partial_hash(candidate_path, size)
+                    self._dirty = True
+                if entry.partial != source_partial:
+                    continue
+                if source_full is None:
+                    source_full = full_hash(file_path)
+                if entry.full is None:
+                    entry.full = full_hash(candidate_path)
+                    self._dirty = True
+            except FileNotFoundError:
+                self._refresh(target_folder, name, None, recursive)
+                continue
+            except OSError as e:
+                logger.debug("计算文件哈希失败: %s", e)
+                continue
+            if entry.full == source_full:
+                logger.info("发现重复文件: %s 与 %s 内容相同", file_path, candidate_path)
+                return candidate_path
+        return None
+
+    def add(self, file_path, target_folder=None):
+        """记录移动到目标文件夹中的文件
+
+        Args:
+            file_path: 移动后的文件路径
+            target_folder: 设置了分片的目标文件夹，文件按相对路径记录在该文件夹的递归索引中；
+                为None时记录在文件所在文件夹的索引中
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return
+        target_folder, name, recursive = self._locate(file_path, target_folder)
+        self._refresh(target_folder, name, stat, recursive)
+
+    def discard(self, file_path, target_folder=None):
+        """从索引中删除文件，参数与 add 相同"""
+        target_folder, name, recursive = self._locate(file_path, target_folder)
+        self._refresh(target_folder, name, None, recursive)
+
+    @staticmethod
+    def _locate(file_path, target_folder):
+        """返回 (索引的文件夹, 文件在索引中的名称, 是否为递归索引)"""
+        if target_folder is None:
+            return os.path.split(file_path) + (False,)
+        return target_folder, os.path.relpath(file_path, target_folder), True
+
+    @staticmethod
+    def _folder_key(target_folder, recursive):
+        # 递归索引与同一文件夹的普通索引分开保存（* 不会出现在路径中）
+        folder_key = os.path.normcase(target_folder)
+        return folder_key + os.sep + '*' if recursive else folder_key
+
+    def _refresh(self, target_folder, name, stat, recursive=False):
+        with self._lock:
+            folder = self._folders.get(self._folder_key(target_folder, recursive))
+            if folder is None:
+                return
+            if stat is None:
+                folder.remove(name)
+            else:
+                folder.add(name, _Entry(stat.st_size, stat.st_mtime_ns))
+            self._dirty = True
+
+    def _get_folder(self, target_folder, recursive=False):
+        """获取目标文件夹的索引，首次使用时扫描文件夹（递归索引同时扫描子文件夹），调用方需持有锁"""
+        folder_key = self._folder_key(target_folder, recursive)
+        folder = self._folders.get(folder_key)
+        if folder is not None:
+            return folder
+
+        if self._stored is None:
+            self._stored = self._load()
+        stored = self._stored.pop(folder_key, {})
+
+        folder = _FolderIndex()
+        # (文件夹路径, 文件名前缀)，递归索引中子文件夹的文件按相对路径记录
+        folders = [(target_folder, '')]
+        while folders:
+            path, prefix = folders.pop()
+            try:
+                entries = os.scandir(path)
+            except OSError:
+                continue
+            with entries:
+                for dir_entry in entries:
+                    name = prefix + dir_entry.name
+                    try:
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                folders.append((dir_entry.path, name + os.sep))
+                            continue
+                        if not dir_entry.is_file(follow_symlinks=False):
+                            continue
+                        stat = dir_entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entry = _Entry(stat.st_size, stat.st_mtime_ns)
+                    # 大小和修改时间都没有变化时沿用保存的哈希
+                    saved = stored.get(name)
+                    if saved and saved[0] == entry.size and saved[1] == entry.mtime:
+                        entry.partial, entry.full = saved[2], saved[3]
+                    folder.add(name, entry)
+        logger.debug("建立目标文件夹内容索引: %s, 共 %s 个文件", target_folder, len(folder.entries))
+        self._folders[folder_key] = folder
+        self._dirty = True
+        return folder
+
+    def _load(self):
+        if not self.index_file or not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('folders', {})
+        except Exception as e:
+            logger.warning("读取重复文件索引失败，将重新建立: %s", e)
+            return {}
+
+    def save(self):
+        """以原子方式将索引写入磁盘"""
+        if not self.index_file:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            folders = dict(self._stored or {})
+            for folder_key, folder in self._folders.items():
+                folders[folder_key] = {
+                    name: [entry.size, entry.mtime, entry.partial, entry.full]
+                    for name, entry in folder.entries.items()
+                }
+            self._dirty = False
+        try:
+            temp_file = self.index_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'folders': folders}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self.index_file)
+            logger.debug("重复文件索引已保存: %s 个文件夹", len(folders))
+        except Exception as e:
+            logger.error("保存重复文件索引失败: %s", e)
@@ -0,0 +1,90 @@
+import os
+import threading
+
+from logger import logger  # 导入日志模块
+
+
+class DirectoryCache:
+    """已确认存在的文件夹缓存
+
+    目标文件夹在开始监听时批量创建并记录，之后分类文件时只需一次集合查找，
+    不再为每个文件调用 os.makedirs（目标文件夹位于网络驱动器时每次调用都是一次网络往返）。
+    文件夹被删除后，使用方在操作时会遇到 FileNotFoundError，此时调用 invalidate 清除记录，
+    下次 ensure 时重新创建。
+    """
+
+    def __init__(self):
+        self._known = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, folder):
+        """确保文件夹存在，已记录的文件夹直接返回
+
+        Args:
+            folder: 文件夹路径
+
+        Raises:
+            OSError: 创建文件夹失败
+        """
+        key = os.path.normcase(os.path.abspath(folder))
+        if key in self._known:
+            return
+        os.makedirs(folder, exist_ok=True)
+        with self._lock:
+            self._known.add(key)
+        logger.debug("确保目标文件夹存在: %s", folder)
+
+    def ensure_all(self, folders):
+        """批量创建文件夹，单个文件夹创建失败时记录日志后继续
+
+        Args:
+            folders: 文件夹路径列表
+
+        Returns:
+            int: 新创建或确认存在的文件夹数量（不包括已记录的文件夹）
+        """
+        count = 0
+        for folder in folders:
+            if not folder or self.is_known(folder):
+                continue
+            try:
+                self.ensure(folder)
+                count += 1
+            except OSError as e:
+                logger.error("创建目标文件夹 %s 失败: %s", folder, e)
+        return count
+
+    def ensure_all_in_background(self, folders):
+        """在后台线程中批量创建尚未记录的文件夹，不阻塞调用方（例如界面线程）
+
+        创建完成前分类的文件由 ensure 自行创建目标文件夹。
+
+        Args:
+            folders: 文件夹路径列表
+        """
+        folders = [folder for folder in folders if folder and not self.is_known(folder)]
+        if folders:
+            threading.Thread(target=self.ensure_all, args=(folders,), name='EnsureFolders', daemon=True).start()
+
+    def is_known(self, folder):
+        """文件夹是否已确认存在"""
+        return os.path.normcase(os.path.abspath(folder)) in self._known
+
+    def invalidate(self, folder=None):
+        """清除文件夹及其子文件夹的记录
+
+        Args:
+            folder: 要清除的文件夹，为None时清除全部
+        """
+        with self._lock:
+            if folder is None:
+                self._known.clear()
+                return
+            key = os.path.normcase(os.path.abspath(folder))
+            prefix = key.rstrip(os.sep) + os.sep
+            self._known = {known for known in self._known if known != key and not known.startswith(prefix)}
+        logger.debug("目标文件夹已不存在，清除缓存: %s", folder)
+
+
+# 创建全局文件夹缓存实例，分类引擎、批量分类和托盘程序共用
+known_directories = DirectoryCache()
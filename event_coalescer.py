@@ -0,0 +1,162 @@
+import os
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+from logger import logger  # 导入日志模块
+from metrics import metrics
+from constants import COALESCE_WINDOW, COALESCE_REMEMBER
+
+
+class _PendingEvent:
+    """合并窗口内的文件事件"""
+    __slots__ = ('path', 'first_seen', 'due', 'count')
+
+    def __init__(self, path, now, due):
+        self.path = path
+        self.first_seen = now
+        self.due = due
+        self.count = 1
+
+
+class EventCoalescer:
+    """文件事件合并器
+
+    同一个文件经常产生多个事件（浏览器下载的创建和重命名、复制工具的创建和移动等）。
+    事件按规范化路径合并，该路径在 window 秒内没有新事件后才交给下一阶段；
+    交出前按文件标识（设备号、inode/文件ID、大小、修改时间）去重，
+    remember 秒内已经交出过的同一文件不再重复处理。
+    """
+
+    def __init__(self, on_file, window=COALESCE_WINDOW, remember=COALESCE_REMEMBER):
+        """
+        Args:
+            on_file: 合并后的回调函数，参数为文件路径，在合并线程中调用
+            window: 合并窗口（秒）
+            remember: 已交出文件标识的保留时间（秒）
+        """
+        self.on_file = on_file
+        self.window = window
+        self.remember = remember
+        self._pending = {}
+        self._heap = []
+        self._counter = 0
+        self._recent = OrderedDict()  # 文件标识 -> 交出时间，按交出时间排序
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._stats = {'raw_events': 0, 'coalesced_events': 0, 'duplicate_events': 0, 'vanished_events': 0}
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='EventCoalescer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._pending.clear()
+            self._heap.clear()
+            self._recent.clear()
+            self._condition.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def submit(self, file_path):
+        """登记一个文件事件，立即返回
+
+        Args:
+            file_path: 事件对应的最终文件路径
+        """
+        key = os.path.normcase(file_path)
+        now = time.monotonic()
+        due = now + self.window
+        with self._condition:
+            self._stats['raw_events'] += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                # 窗口内的重复事件只推迟到期时间，堆中的旧条目在到期时重新放入
+                pending.due = due
+                pending.count += 1
+                self._stats['coalesced_events'] += 1
+                return
+            pending = _PendingEvent(file_path, now, due)
+            self._pending[key] = pending
+            self._counter += 1
+            heapq.heappush(self._heap, (due, self._counter, key))
+            self._condition.notify()
+
+    def stats(self):
+        """获取事件计数
+
+        Returns:
+            dict: 原始事件数、窗口内合并的事件数、按文件标识丢弃的重复事件数、文件已不存在的事件数
+        """
+        with self._condition:
+            return dict(self._stats, pending_events=len(self._pending))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if self._heap:
+                        timeout = self._heap[0][0] - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        self._condition.wait(timeout)
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+                due, _, key = heapq.heappop(self._heap)
+                pending = self._pending.get(key)
+                if pending is None:
+                    continue
+                if pending.due > due:
+                    # 窗口内又有新事件，按新的到期时间重新放入
+                    self._counter += 1
+                    heapq.heappush(self._heap, (pending.due, self._counter, key))
+                    continue
+                del self._pending[key]
+
+            if self._accept(pending):
+                metrics.observe('event', time.monotonic() - pending.first_seen)
+                try:
+                    self.on_file(pending.path)
+                except Exception as e:
+                    logger.error("处理合并后的文件事件 %s 时出错: %s", pending.path, e)
+
+    def _accept(self, pending):
+        """检查文件是否仍然存在，以及是否在最近已经交出过"""
+        try:
+            stat = os.stat(pending.path)
+        except OSError:
+            with self._condition:
+                self._stats['vanished_events'] += pending.count
+            logger.debug("合并窗口结束时文件已不存在: %s", pending.path)
+            return False
+
+        if not stat.st_ino:
+            # 文件系统不提供文件标识时只按路径合并
+            return True
+        identity = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        now = time.monotonic()
+        with self._condition:
+            # 丢弃过期的文件标识
+            while self._recent and next(iter(self._recent.values())) <= now - self.remember:
+                self._recent.popitem(last=False)
+            if identity in self._recent:
+                self._stats['duplicate_events'] += pending.count
+                logger.debug("忽略同一文件的重复事件: %s", pending.path)
+                return False
+            self._recent[identity] = now
+        if pending.count > 1:
+            logger.debug("合并了 %s 个文件事件: %s", pending.count, pending.path)
+        return True
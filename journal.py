@@ -0,0 +1,309 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from logger import logger  # 导入日志模块
+from move_engine import MoveEngine
+from name_allocator import TargetNameAllocator
+from constants import JOURNAL_FILE, JOURNAL_BATCH_SIZE, WORKER_COUNT
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS moves (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    category TEXT,
+    action TEXT NOT NULL,
+    size INTEGER,
+    started REAL,
+    finished REAL NOT NULL,
+    undone REAL
+);
+CREATE INDEX IF NOT EXISTS moves_file_name ON moves (file_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS moves_finished ON moves (finished);
+CREATE INDEX IF NOT EXISTS moves_category ON moves (category, finished);
+CREATE INDEX IF NOT EXISTS moves_destination ON moves (destination);
+'''
+
+_COLUMNS = ('id', 'source', 'destination', 'file_name', 'category', 'action', 'size', 'started', 'finished', 'undone')
+
+# 写入线程的停止标记
+_STOP = object()
+
+
+def journal_path(config_manager):
+    """获取分类记录数据库的路径（与配置文件位于同一目录）"""
+    return os.path.join(os.path.dirname(os.path.abspath(config_manager.config_file)), JOURNAL_FILE)
+
+
+class JournalEntry:
+    """一条分类记录"""
+    __slots__ = _COLUMNS
+
+    def __init__(self, *values):
+        for name, value in zip(_COLUMNS, values):
+            setattr(self, name, value)
+
+
+class ClassificationJournal:
+    """文件分类记录
+
+    每次移动都记录到本地 SQLite 数据库（WAL 模式）。分类线程只把记录放入队列，
+    由专用的写入线程按批次在一个事务中写入，分类管道不会等待磁盘。
+    支持按文件名、时间和分类查询，以及撤销最近的 N 次或某个时间之后的全部移动。
+    """
+
+    def __init__(self, db_file):
+        """
+        Args:
+            db_file: 数据库文件路径
+        """
+        self.db_file = db_file
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_file, timeout=10)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def record(self, source, destination, category=None, size=None, started=None, action='move'):
+        """记录一次移动，立即返回
+
+        Args:
+            source: 原文件路径
+            destination: 移动后的文件路径
+            category: 分类名称
+            size: 文件大小
+            started: 开始移动的时间（time.time()）
+            action: move、hardlink 或 delete
+        """
+        finished = time.time()
+        self._queue.put((source, destination, os.path.basename(source), category, action, size,
+                         started or finished, finished))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='JournalWriter', daemon=True)
+                    self._thread.start()
+
+    def close(self):
+        """写入队列中剩余的记录并停止写入线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self):
+        connection = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                stop = item is _STOP
+                batch = [] if stop else [item]
+                while len(batch) < JOURNAL_BATCH_SIZE:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                if batch:
+                    try:
+                        with connection:
+                            connection.executemany(
+                                'INSERT INTO moves (source, destination, file_name, category, action, size, started, finished) '
+                                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', batch)
+                    except sqlite3.Error as e:
+                        logger.error("写入分类记录失败: %s", e)
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def relocate(self, moves):
+        """文件在目标文件夹内被再次移动（例如整理到分片子文件夹）后更新记录中的位置，撤销时移回原位置
+
+        Args:
+            moves: (原目标路径, 新目标路径) 列表，在一个事务中更新
+        """
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany('UPDATE moves SET destination = ? WHERE destination = ? AND undone IS NULL',
+                                       [(new, old) for old, new in moves])
+        except sqlite3.Error as e:
+            logger.error("更新分类记录失败: %s", e)
+        finally:
+            connection.close()
+
+    def query(self, file_name=None, since=None, until=None, category=None, include_undone=False, limit=100,
+              actions=None):
+        """查询分类记录，按时间从新到旧排列
+
+        Args:
+            file_name: 文件名，可以包含 * 和 ? 通配符
+            since: 起始时间（time.time() 格式）
+            until: 结束时间
+            category: 分类名称
+            include_undone: 是否包含已撤销的记录
+            limit: 最多返回的记录数量，None 表示不限制
+            actions: 只返回这些操作（move、hardlink、delete）的记录，None 表示不限制
+
+        Returns:
+            list: JournalEntry 列表
+        """
+        conditions = []
+        params = []
+        if file_name:
+            if '*' in file_name or '?' in file_name:
+                conditions.append('file_name LIKE ? ESCAPE \'\\\'')
+                pattern = file_name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params.append(pattern.replace('*', '%').replace('?', '_'))
+            else:
+                conditions.append('file_name = ? COLLATE NOCASE')
+                params.append(file_name)
+        if since is not None:
+            conditions.append('finished >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('finished < ?')
+            params.append(until)
+        if category:
+            conditions.append('category = ?')
+            params.append(category)
+        if not include_undone:
+            conditions.append('undone IS NULL')
+        if actions:
+            conditions.append(f'action IN ({", ".join("?" * len(actions))})')
+            params.extend(actions)
+
+        sql = f'SELECT {", ".join(_COLUMNS)} FROM moves'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+
+        connection = self._connect()
+        try:
+            return [JournalEntry(*row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def undo(self, last=None, since=None, worker_count=WORKER_COUNT):
+        """撤销移动，把文件移回原来的位置
+
+        同一原文件夹的记录按从新到旧的顺序依次撤销，不同文件夹之间并行。
+        原位置已有同名文件时添加序号；删除重复文件的记录无法撤销，不计入撤销的数量。
+        撤销前应先关闭监听，否则移回监听文件夹的文件会被再次分类。
+
+        Args:
+            last: 撤销最近的 N 次移动（包括硬链接），为None时不限制数量
+            since: 只撤销该时间（time.time() 格式）之后的移动
+            worker_count: 并行撤销的线程数
+
+        Returns:
+            tuple: (成功撤销的数量, 失败的数量)
+        """
+        self.close()
+        entries = self.query(since=since, limit=last, actions=('move', 'hardlink'))
+        groups = {}
+        for entry in entries:
+            groups.setdefault(os.path.normcase(os.path.dirname(entry.source)), []).append(entry)
+
+        move_engine = MoveEngine()
+        allocator = TargetNameAllocator()
+        undone = []
+        failed = []
+
+        def undo_group(group):
+            for entry in group:
+                if not os.path.exists(entry.destination):
+                    logger.warning("无法撤销，文件已不存在: %s", entry.destination)
+                    failed.append(entry.id)
+                    continue
+                target_file_path = None
+                try:
+                    source_folder = os.path.dirname(entry.source)
+                    os.makedirs(source_folder, exist_ok=True)
+                    target_file_path = allocator.reserve(source_folder, os.path.basename(entry.source))
+                    move_engine.move(entry.destination, target_file_path)
+                    undone.append(entry.id)
+                    logger.info("已撤销移动: %s -> %s", entry.destination, target_file_path)
+                except Exception as e:
+                    if target_file_path:
+                        allocator.release(target_file_path)
+                    logger.error("撤销移动 %s 时出错: %s", entry.destination, e)
+                    failed.append(entry.id)
+
+        with ThreadPoolExecutor(max_workers=max(1, worker_count), thread_name_prefix='JournalUndo') as executor:
+            for group in groups.values():
+                executor.submit(undo_group, group)
+
+        if undone:
+            now = time.time()
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.executemany('UPDATE moves SET undone = ? WHERE id = ?', [(now, i) for i in undone])
+            finally:
+                connection.close()
+        return len(undone), len(failed)
+
+
+def parse_time(text):
+    """解析命令行中的时间，例如 2024-05-01 或 "2024-05-01 18:30"
+
+    Returns:
+        float: time.time() 格式的时间
+    """
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def _format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def run_history(file_name=None, since=None, category=None, limit=50):
+    """命令行入口：打印分类记录
+
+    Returns:
+        int: 进程退出码
+    """
+    from config_manager import ConfigManager
+
+    journal = ClassificationJournal(journal_path(ConfigManager()))
+    entries = journal.query(file_name=file_name, since=parse_time(since) if since else None,
+                            category=category, limit=limit)
+    for entry in entries:
+        print(f"{_format_time(entry.finished)}  [{entry.category or ''}] {entry.source} -> {entry.destination}")
+    print(f"共 {len(entries)} 条记录")
+    return 0
+
+
+def run_undo(last=None, since=None):
+    """命令行入口：撤销最近的移动
+
+    Returns:
+        int: 进程退出码
+    """
+    from config_manager import ConfigManager
+
+    journal = ClassificationJournal(journal_path(ConfigManager()))
+    undone, failed = journal.undo(last=last, since=parse_time(since) if since else None)
+    print(f"已撤销 {undone} 次移动, 失败 {failed} 次")
+    return 0 if failed == 0 else 1
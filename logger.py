@@ -1,6 +1,8 @@
 import os
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import datetime
 
 from constants import ENABLE_LOGGING, LOG_LEVEL, LOG_FILE
@@ -10,6 +12,7 @@ from constants import ENABLE_LOGGING, LOG_LEVEL, LOG_FILE
 class Logger:
     _instance = None
     _logger = None
+    _listener = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -30,6 +33,9 @@ class Logger:
         # 清除已有的处理器
         if cls._logger.handlers:
             cls._logger.handlers.clear()
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
         
         if ENABLE_LOGGING:
             # 获取应用程序所在目录
@@ -62,51 +68,63 @@ class Logger:
             file_handler.setFormatter(formatter)
             console_handler.setFormatter(formatter)
             
+            # 文件和控制台写入由后台线程完成，记录日志的线程只需把记录放入队列
+            log_queue = queue.SimpleQueue()
+            cls._listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+            cls._listener.start()
+            atexit.register(cls.shutdown)
+            
             # 添加处理器到日志记录器
-            cls._logger.addHandler(file_handler)
-            cls._logger.addHandler(console_handler)
+            cls._logger.addHandler(QueueHandler(log_queue))
             
             cls._logger.info("日志系统初始化完成")
     
     @classmethod
-    def debug(cls, message):
-        """记录调试信息"""
-        if cls._logger is None:
-            cls._setup_logger()
-        if ENABLE_LOGGING:
-            cls._logger.debug(message)
+    def shutdown(cls):
+        """停止后台写入线程，写出队列中剩余的日志"""
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
     
     @classmethod
-    def info(cls, message):
-        """记录一般信息"""
+    def is_enabled_for(cls, level):
+        """判断指定级别的日志是否会被记录，可用于跳过代价较高的日志参数计算"""
         if cls._logger is None:
             cls._setup_logger()
-        if ENABLE_LOGGING:
-            cls._logger.info(message)
+        return ENABLE_LOGGING and cls._logger.isEnabledFor(level)
     
     @classmethod
-    def warning(cls, message):
-        """记录警告信息"""
+    def _log(cls, level, message, args):
         if cls._logger is None:
             cls._setup_logger()
-        if ENABLE_LOGGING:
-            cls._logger.warning(message)
+        # 级别未启用时直接返回，不格式化日志参数
+        if ENABLE_LOGGING and cls._logger.isEnabledFor(level):
+            cls._logger.log(level, message, *args)
     
     @classmethod
-    def error(cls, message):
-        """记录错误信息"""
-        if cls._logger is None:
-            cls._setup_logger()
-        if ENABLE_LOGGING:
-            cls._logger.error(message)
+    def debug(cls, message, *args):
+        """记录调试信息，支持 % 格式的延迟格式化参数"""
+        cls._log(logging.DEBUG, message, args)
     
     @classmethod
-    def critical(cls, message):
-        """记录严重错误信息"""
-        if cls._logger is None:
-            cls._setup_logger()
-        if ENABLE_LOGGING:
-            cls._logger.critical(message)
+    def info(cls, message, *args):
+        """记录一般信息，支持 % 格式的延迟格式化参数"""
+        cls._log(logging.INFO, message, args)
+    
+    @classmethod
+    def warning(cls, message, *args):
+        """记录警告信息，支持 % 格式的延迟格式化参数"""
+        cls._log(logging.WARNING, message, args)
+    
+    @classmethod
+    def error(cls, message, *args):
+        """记录错误信息，支持 % 格式的延迟格式化参数"""
+        cls._log(logging.ERROR, message, args)
+    
+    @classmethod
+    def critical(cls, message, *args):
+        """记录严重错误信息，支持 % 格式的延迟格式化参数"""
+        cls._log(logging.CRITICAL, message, args)
 
 # 创建全局日志实例
 logger = Logger()
\ No newline at end of file
@@ -0,0 +1,254 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from logger import logger  # 导入日志模块
+
+# 直方图的精度：每个 2 的幂区间分为 2^SUB_BUCKET_BITS 个线性子区间，相对误差不超过 1/8
+SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+_LINEAR_LIMIT = _SUB_BUCKETS * 2
+
+# 各处理阶段的名称和说明，按管道顺序排列
+STAGES = (
+    ('event', '收到文件事件到事件合并结束'),
+    ('settle_wait', '等待文件写入完成'),
+    ('rule_lookup', '匹配分类规则'),
+    ('mkdir', '创建目标文件夹'),
+    ('name_allocation', '分配目标文件名'),
+    ('move', '移动文件'),
+    ('notify', '通知监听器'),
+)
+
+# 导出的分位数
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _bucket_index(micros):
+    """微秒数对应的桶序号：小于 16 微秒时每微秒一个桶，之后按对数-线性划分"""
+    if micros < _LINEAR_LIMIT:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return _LINEAR_LIMIT + (shift - 1) * _SUB_BUCKETS + (micros >> shift) - _SUB_BUCKETS
+
+
+def _bucket_upper(index):
+    """桶的上界（微秒）"""
+    if index < _LINEAR_LIMIT:
+        return index + 1
+    shift, offset = divmod(index - _LINEAR_LIMIT, _SUB_BUCKETS)
+    shift += 1
+    return (_SUB_BUCKETS + offset + 1) << shift
+
+
+class Histogram:
+    """对数-线性桶的延迟直方图（类似 HdrHistogram）
+
+    记录一次耗时只需一次整数运算和一次字典计数，内存固定，适合在生产环境中一直开启。
+    """
+    __slots__ = ('_counts', 'count', 'total', 'max', '_lock')
+
+    def __init__(self):
+        self._counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """记录一次耗时（秒）"""
+        index = _bucket_index(int(seconds * 1000000)) if seconds > 0 else 0
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """获取分位数（秒），没有记录时返回0"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index in sorted(self._counts):
+                seen += self._counts[index]
+                if seen >= rank:
+                    return min(_bucket_upper(index) / 1000000, self.max)
+            return self.max
+
+
+class Metrics:
+    """分类管道的计数器、延迟直方图和状态值
+
+    计数器和直方图由管道各阶段直接更新；队列深度等状态值在导出时通过注册的回调函数读取。
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {name: Histogram() for name, _ in STAGES}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1):
+        """增加计数器"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, stage, seconds):
+        """记录某个阶段的一次耗时（秒）"""
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+    def register_collector(self, name, callback):
+        """注册状态值回调，callback 返回 名称 -> 数值 的字典，同名的回调会被替换"""
+        with self._lock:
+            self._collectors[name] = callback
+
+    def unregister_collector(self, name):
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def snapshot(self):
+        """获取当前的全部指标
+
+        Returns:
+            tuple: (计数器字典, 状态值字典, 阶段名称 -> Histogram 字典)
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            collectors = list(self._collectors.values())
+            histograms = dict(self._histograms)
+        gauges = {}
+        for callback in collectors:
+            try:
+                gauges.update(callback())
+            except Exception as e:
+                logger.debug("读取状态值失败: %s", e)
+        return counters, gauges, histograms
+
+    def to_prometheus(self):
+        """生成 Prometheus 文本格式的指标"""
+        counters, gauges, histograms = self.snapshot()
+        lines = []
+        for name in sorted(counters):
+            metric = f'file_classifier_{name}'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {counters[name]}')
+        for name in sorted(gauges):
+            metric = f'file_classifier_{name}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {gauges[name]}')
+        lines.append('# TYPE file_classifier_stage_seconds summary')
+        for stage, histogram in histograms.items():
+            for q in QUANTILES:
+                lines.append(f'file_classifier_stage_seconds{{stage="{stage}",quantile="{q}"}} '
+                             f'{histogram.quantile(q):.6f}')
+            lines.append(f'file_classifier_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'file_classifier_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def format_summary(self):
+        """生成供界面显示的统计信息文本"""
+        counters, gauges, histograms = self.snapshot()
+        lines = [
+            f"已分类文件: {counters.get('files_classified_total', 0)}",
+            f"移动数据: {counters.get('bytes_moved_total', 0) / 1024 / 1024:.1f} MB",
+            f"文件事件: {gauges.get('raw_events', 0)}",
+            f"移动失败: {counters.get('move_errors_total', 0)}",
+            f"队列深度: {gauges.get('queue_depth', 0)}, 正在处理: {gauges.get('in_flight', 0)}, "
+            f"等待写入完成: {gauges.get('settling', 0)}",
+            '',
+            '各阶段耗时 (p50 / p99 / 次数):',
+        ]
+        for stage, description in STAGES:
+            histogram = histograms[stage]
+            lines.append(f"{description}: {histogram.quantile(0.5) * 1000:.1f} ms / "
+                         f"{histogram.quantile(0.99) * 1000:.1f} ms / {histogram.count}")
+        return '\n'.join(lines)
+
+
+class MetricsExporter:
+    """定期将指标写入 Prometheus 文本文件（供 node_exporter 的 textfile 收集器读取），
+    或在本机端口上提供 /metrics 接口"""
+
+    def __init__(self, registry, metrics_file='', port=0, interval=10.0):
+        """
+        Args:
+            registry: Metrics 实例
+            metrics_file: 指标文件路径，为空时不写文件
+            port: 本机 HTTP 端口，为0时不启动
+            interval: 写入文件的间隔（秒）
+        """
+        self.registry = registry
+        self.metrics_file = metrics_file
+        self.port = port
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def start(self):
+        if self.metrics_file and self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='MetricsExporter', daemon=True)
+            self._thread.start()
+        if self.port and self._server is None:
+            registry = self.registry
+
+            class _Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.rstrip('/') not in ('', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body = registry.to_prometheus().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            try:
+                # 只监听本机地址
+                self._server = ThreadingHTTPServer(('127.0.0.1', self.port), _Handler)
+            except OSError as e:
+                logger.error("启动指标接口失败，端口 %s: %s", self.port, e)
+                return
+            threading.Thread(target=self._server.serve_forever, name='MetricsHTTP', daemon=True).start()
+            logger.info("指标接口已启动: http://127.0.0.1:%s/metrics", self.port)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._write()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        """以原子方式写入指标文件，避免读取到写了一半的文件"""
+        try:
+            temp_file = self.metrics_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(self.registry.to_prometheus())
+            os.replace(temp_file, self.metrics_file)
+        except Exception as e:
+            logger.error("写入指标文件失败: %s", e)
+
+
+# 创建全局指标实例
+metrics = Metrics()
@@ -12,7 +12,8 @@ class MonitoringManager(QObject):
     
     # 定义信号
     monitoring_status_changed = pyqtSignal(bool)  # 监听状态变化信号，参数为是否正在监听
-    file_classified_signal = pyqtSignal(str, str)  # 文件分类信号，参数为文件路径和目标文件夹
+    files_classified_signal = pyqtSignal(list)  # 文件分类信号，参数为一批 (文件路径, 目标文件夹)
+    backlog_progress_signal = pyqtSignal(int, bool)  # 已有文件扫描进度信号，参数为已提交的文件数量和是否已完成
     
     def __init__(self, config_manager):
         super().__init__()
@@ -29,7 +30,14 @@ class MonitoringManager(QObject):
         source_folder = config.get('source_folder', '')
         is_monitoring = config.get('is_monitoring', False)
         
-        logger.debug(f"源文件夹: {source_folder}, 监听状态: {is_monitoring}")
+        logger.debug("源文件夹: %s, 监听状态: %s", source_folder, is_monitoring)
+        
+        # 监视器正在运行且仍需监听时直接热更新配置，避免重建监视器期间丢失文件事件
+        if (is_monitoring and self.file_watcher and self.file_watcher.is_monitoring
+                and self.watcher_thread and self.watcher_thread.isRunning()):
+            logger.info("监视器正在运行，热更新配置")
+            self.file_watcher.reload_config()
+            return
         
         # 如果已经有监视器在运行，先停止它
         if self.file_watcher and self.watcher_thread and self.watcher_thread.isRunning():
@@ -40,7 +48,8 @@ class MonitoringManager(QObject):
         
         # 创建新的文件监视器
         self.file_watcher = FileWatcher(self.config_manager)
-        self.file_watcher.file_classified.connect(self.file_classified_signal)
+        self.file_watcher.files_classified.connect(self.files_classified_signal)
+        self.file_watcher.backlog_progress.connect(self.backlog_progress_signal)
         logger.debug("创建新的文件监视器实例")
         
         # 创建线程并移动监视器到线程中
@@ -49,17 +58,18 @@ class MonitoringManager(QObject):
         self.watcher_thread.started.connect(self.file_watcher.start_monitoring)
         logger.debug("创建监视器线程并设置连接")
         
-        # 如果配置中设置了自动开始监听，且源文件夹有效，则启动监视器
-        if is_monitoring and source_folder and os.path.isdir(source_folder):
-            logger.info(f"启动文件监视器线程，监听文件夹: {source_folder}")
+        # 如果配置中设置了自动开始监听，且至少有一个监听文件夹有效，则启动监视器
+        has_valid_root = self.config_manager.has_valid_watch_root()
+        if is_monitoring and has_valid_root:
+            logger.info("启动文件监视器线程，监听文件夹: %s", source_folder)
             self.watcher_thread.start()
             # 不在这里发送监听状态变化信号，避免重复通知
             # self.monitoring_status_changed.emit(True)
         else:
-            if not source_folder:
+            if not source_folder and not has_valid_root:
                 logger.warning("未设置源文件夹，无法启动监视器")
-            elif not os.path.isdir(source_folder):
-                logger.warning(f"源文件夹不存在: {source_folder}，无法启动监视器")
+            elif not has_valid_root:
+                logger.warning("源文件夹不存在: %s，无法启动监视器", source_folder)
             elif not is_monitoring:
                 logger.debug("监听状态为关闭，不启动监视器")
             # 不在这里发送监听状态变化信号，避免重复通知
@@ -78,8 +88,8 @@ class MonitoringManager(QObject):
         config = self.config_manager.get_config()
         source_folder = config.get('source_folder', '')
         
-        # 检查是否设置了源文件夹
-        if not source_folder or not os.path.isdir(source_folder):
+        # 检查是否设置了有效的监听文件夹
+        if not self.config_manager.has_valid_watch_root():
             logger.warning("未设置有效的源文件夹，无法切换监听状态")
             if parent_widget is not None:
                 QMessageBox.warning(parent_widget, f'{APP_NAME} - 警告', '请先设置要监听的源文件夹！')
@@ -106,7 +116,7 @@ class MonitoringManager(QObject):
             # 发送监听状态变化信号
             self.monitoring_status_changed.emit(False)
         else:
-            logger.info(f"开启监听，源文件夹: {source_folder}")
+            logger.info("开启监听，源文件夹: %s", source_folder)
             # 开始监听
             config['is_monitoring'] = True
             self.config_manager.save_config(config)
@@ -129,10 +139,10 @@ class MonitoringManager(QObject):
         is_monitoring = config.get('is_monitoring', False)
         source_folder = config.get('source_folder', '')
         
-        logger.debug(f"配置信息 - 监听状态: {is_monitoring}, 源文件夹: {source_folder}")
+        logger.debug("配置信息 - 监听状态: %s, 源文件夹: %s", is_monitoring, source_folder)
         
-        # 检查是否设置了源文件夹
-        if not source_folder or not os.path.isdir(source_folder):
+        # 检查是否设置了有效的监听文件夹
+        if not self.config_manager.has_valid_watch_root():
             logger.warning("未设置有效的源文件夹，无法恢复监听状态")
             # 不在这里发送监听状态变化信号，避免重复通知
             # self.monitoring_status_changed.emit(False)
@@ -140,7 +150,7 @@ class MonitoringManager(QObject):
         
         # 如果上次是开启监听状态，则启动监视器
         if is_monitoring:
-            logger.info(f"恢复监听状态：开启监听文件夹 {source_folder}")
+            logger.info("恢复监听状态：开启监听文件夹 %s", source_folder)
             # 重新设置文件监视器，确保使用最新的配置
             self.setup_file_watcher()
             # 启动监视器线程
@@ -179,11 +189,7 @@ class MonitoringManager(QObject):
             return True
         
         # 停止监听
-        if self.file_watcher and self.watcher_thread and self.watcher_thread.isRunning():
-            logger.debug("停止文件监视器线程")
-            self.file_watcher.stop()
-            self.watcher_thread.quit()
-            self.watcher_thread.wait()
+        self.shutdown()
         
         # 更新配置
         config['is_monitoring'] = False
@@ -195,6 +201,14 @@ class MonitoringManager(QObject):
         
         return True
     
+    def shutdown(self):
+        """停止文件监视器线程，不修改配置中的监听状态，下次启动时仍按原状态恢复"""
+        if self.file_watcher and self.watcher_thread and self.watcher_thread.isRunning():
+            logger.debug("停止文件监视器线程")
+            self.file_watcher.stop()
+            self.watcher_thread.quit()
+            self.watcher_thread.wait()
+    
     def start_monitoring(self):
         """开始监听
         
@@ -205,8 +219,8 @@ class MonitoringManager(QObject):
         config = self.config_manager.get_config()
         source_folder = config.get('source_folder', '')
         
-        # 检查是否设置了源文件夹
-        if not source_folder or not os.path.isdir(source_folder):
+        # 检查是否设置了有效的监听文件夹
+        if not self.config_manager.has_valid_watch_root():
             logger.warning("未设置有效的源文件夹，无法开始监听")
             return False
         
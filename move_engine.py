@@ -0,0 +1,273 @@
+import os
+import errno
+import shutil
+import threading
+import time
+import zlib
+
+from logger import logger  # 导入日志模块
+
+# 跨文件系统复制时每次复制的数据块大小
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# 未完成复制的临时文件后缀
+PARTIAL_SUFFIX = '.fcpart'
+# 未完成复制的临时文件保留时间（秒），超过后在清理时删除
+PARTIAL_MAX_AGE = 7 * 24 * 3600
+# 清理未完成复制的临时文件时扫描的子文件夹深度（覆盖按扩展名的子文件夹和分片子文件夹）
+PARTIAL_SCAN_DEPTH = 2
+
+
+class MoveResult:
+    """一次文件移动的结果"""
+    __slots__ = ('source', 'destination', 'size', 'seconds', 'same_device', 'resumed_bytes')
+
+    def __init__(self, source, destination, size, seconds, same_device, resumed_bytes=0):
+        self.source = source
+        self.destination = destination
+        self.size = size
+        self.seconds = seconds
+        self.same_device = same_device
+        self.resumed_bytes = resumed_bytes
+
+    @property
+    def throughput(self):
+        """移动速度（字节/秒）"""
+        if self.seconds <= 0:
+            return float(self.size)
+        return self.size / self.seconds
+
+
+class MoveEngine:
+    """文件移动引擎
+
+    同一文件系统内直接使用 os.replace 重命名；跨文件系统时使用 os.copy_file_range / os.sendfile
+    分块复制到临时文件，完成后再替换目标文件并删除源文件。
+    中断的复制会保留临时文件，下次移动同一个源文件时从中断处继续。临时文件名包含源文件的标识（路径、大小和修改时间），
+    程序崩溃后重新分配的目标文件名可能不同，recover_partials 在启动时找回这些临时文件，
+    删除过期的临时文件和上次分配文件名时留下的空占位文件。
+    文件夹所在的设备号会被缓存，每对文件夹只需判断一次是否位于同一文件系统。
+    """
+
+    def __init__(self, fsync=False, chunk_size=COPY_CHUNK_SIZE):
+        """
+        Args:
+            fsync: 跨文件系统复制完成后是否调用 fsync 确保数据写入磁盘
+            chunk_size: 跨文件系统复制时每次复制的字节数
+        """
+        self.fsync = fsync
+        self.chunk_size = chunk_size
+        self._device_cache = {}
+        self._orphans = {}  # (目标文件夹, 源文件标识) -> 上次运行留下的临时文件路径
+        self._lock = threading.Lock()
+
+    def move(self, source, destination, progress_callback=None):
+        """移动文件，目标文件已存在时会被覆盖
+
+        Args:
+            source: 源文件路径
+            destination: 目标文件路径
+            progress_callback: 跨文件系统复制时的进度回调，参数为已复制字节数和文件总字节数
+
+        Returns:
+            MoveResult: 移动结果
+        """
+        start_time = time.perf_counter()
+        size = os.path.getsize(source)
+        same_device = self.is_same_device(os.path.dirname(source), os.path.dirname(destination))
+
+        resumed_bytes = 0
+        if same_device:
+            try:
+                os.replace(source, destination)
+            except OSError as e:
+                # 只有设备号判断失误（例如挂载点变化）时才回退到复制；文件被占用等其他错误直接抛出，
+                # 否则复制后无法删除源文件，文件会同时留在两个位置
+                if e.errno != errno.EXDEV:
+                    raise
+                logger.debug("重命名失败，改为复制: %s", e)
+                self.clear_cache()
+                same_device = False
+        if not same_device:
+            resumed_bytes = self._copy_and_remove(source, destination, size, progress_callback)
+
+        result = MoveResult(source, destination, size, time.perf_counter() - start_time, same_device, resumed_bytes)
+        logger.debug("移动完成: %s, %s 字节, 耗时 %.3f 秒, 速度 %.1f MB/s, 同一文件系统: %s",
+                     destination, size, result.seconds, result.throughput / 1024 / 1024, same_device)
+        return result
+
+    def is_same_device(self, source_folder, target_folder):
+        """判断两个文件夹是否位于同一文件系统，结果按文件夹缓存
+
+        Args:
+            source_folder: 源文件夹
+            target_folder: 目标文件夹
+
+        Returns:
+            bool: 是否位于同一文件系统
+        """
+        source_device = self._get_device(source_folder)
+        target_device = self._get_device(target_folder)
+        return source_device is not None and source_device == target_device
+
+    def clear_cache(self):
+        """清除缓存的设备号"""
+        with self._lock:
+            self._device_cache.clear()
+
+    def _get_device(self, folder):
+        key = os.path.normcase(os.path.abspath(folder))
+        with self._lock:
+            device = self._device_cache.get(key)
+        if device is None:
+            try:
+                device = os.stat(folder).st_dev
+            except OSError:
+                return None
+            with self._lock:
+                self._device_cache[key] = device
+        return device
+
+    def recover_partials(self, folders, max_age=PARTIAL_MAX_AGE):
+        """找回上次运行中断的复制留下的临时文件，应在开始移动文件之前调用
+
+        超过 max_age 的临时文件直接删除；其余的按源文件标识记录，之后移动同一个源文件时即使目标文件名不同也从中断处继续。
+        临时文件对应的空占位文件（分配文件名时创建）一并删除。
+
+        Args:
+            folders: 目标文件夹列表，同时扫描 PARTIAL_SCAN_DEPTH 层子文件夹
+            max_age: 临时文件的保留时间（秒）
+
+        Returns:
+            int: 删除的文件数量
+        """
+        now = time.time()
+        removed = 0
+        pending = [(folder, 0) for folder in folders if folder]
+        while pending:
+            folder, depth = pending.pop()
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if depth < PARTIAL_SCAN_DEPTH:
+                            pending.append((entry.path, depth + 1))
+                        continue
+                    if not entry.name.endswith(PARTIAL_SUFFIX):
+                        continue
+                    destination, _, token = entry.name[:-len(PARTIAL_SUFFIX)].rpartition('.')
+                    placeholder = os.path.join(folder, destination)
+                    # 临时文件还在说明复制没有完成，同名的空文件是上次留下的占位文件
+                    if destination and os.path.isfile(placeholder) and os.path.getsize(placeholder) == 0:
+                        os.remove(placeholder)
+                        removed += 1
+                    if now - entry.stat(follow_symlinks=False).st_mtime > max_age:
+                        os.remove(entry.path)
+                        removed += 1
+                        logger.info("删除过期的未完成复制: %s", entry.path)
+                        continue
+                except OSError as e:
+                    logger.debug("清理未完成的复制 %s 失败: %s", entry.path, e)
+                    continue
+                with self._lock:
+                    self._orphans[(os.path.normcase(os.path.abspath(folder)), token)] = entry.path
+        return removed
+
+    def _partial_path(self, source, destination, stat):
+        """根据源文件的路径、大小和修改时间生成临时文件路径，只有同一版本的源文件才会续传
+
+        Returns:
+            tuple: (临时文件路径, 源文件标识)
+        """
+        identity = f"{os.path.abspath(source)}|{stat.st_size}|{stat.st_mtime_ns}"
+        token = format(zlib.crc32(identity.encode('utf-8')), '08x')
+        return f"{destination}.{token}{PARTIAL_SUFFIX}", token
+
+    def _copy_and_remove(self, source, destination, size, progress_callback):
+        """跨文件系统复制文件后删除源文件，返回续传的字节数"""
+        source_stat = os.stat(source)
+        partial_path, token = self._partial_path(source, destination, source_stat)
+        # 上次运行中断时分配的目标文件名可能不同，按源文件标识找回临时文件
+        folder_key = os.path.normcase(os.path.abspath(os.path.dirname(destination)))
+        with self._lock:
+            orphan = self._orphans.pop((folder_key, token), None)
+        if orphan and orphan != partial_path and not os.path.exists(partial_path):
+            try:
+                os.replace(orphan, partial_path)
+            except OSError as e:
+                logger.debug("无法继续上次未完成的复制 %s: %s", orphan, e)
+
+        resumed_bytes = 0
+        if os.path.exists(partial_path):
+            resumed_bytes = min(os.path.getsize(partial_path), size)
+            logger.info("继续未完成的复制: %s, 已复制 %s 字节", partial_path, resumed_bytes)
+
+        with open(source, 'rb') as src, open(partial_path, 'r+b' if resumed_bytes else 'wb') as dst:
+            dst.truncate(resumed_bytes)
+            copied = self._copy_range(src, dst, resumed_bytes, size, progress_callback)
+            if copied != size:
+                raise OSError(f"复制不完整: {copied}/{size} 字节，源文件可能在复制过程中被修改")
+            if self.fsync:
+                dst.flush()
+                os.fsync(dst.fileno())
+
+        shutil.copystat(source, partial_path)
+        os.replace(partial_path, destination)
+        try:
+            os.remove(source)
+        except OSError:
+            # 源文件无法删除（例如被其他程序占用）时删除已复制的文件，不留下两份
+            try:
+                os.remove(destination)
+            except OSError as e:
+                logger.error("删除已复制的文件 %s 失败: %s", destination, e)
+            raise
+        return resumed_bytes
+
+    def _copy_range(self, src, dst, offset, size, progress_callback):
+        """从 offset 开始将源文件剩余内容复制到目标文件，返回复制后的文件长度"""
+        src_fd = src.fileno()
+        dst_fd = dst.fileno()
+        copied = offset
+
+        # 优先使用内核内复制，避免数据在用户态来回拷贝
+        copy_file_range = getattr(os, 'copy_file_range', None)
+        for copy_func in (copy_file_range, getattr(os, 'sendfile', None)):
+            if copy_func is None or copied >= size:
+                continue
+            try:
+                os.lseek(dst_fd, copied, os.SEEK_SET)
+                while copied < size:
+                    count = min(self.chunk_size, size - copied)
+                    if copy_func is copy_file_range:
+                        sent = copy_func(src_fd, dst_fd, count, copied, copied)
+                    else:
+                        sent = copy_func(dst_fd, src_fd, copied, count)
+                    if sent == 0:
+                        break
+                    copied += sent
+                    if progress_callback:
+                        progress_callback(copied, size)
+                if copied >= size:
+                    return copied
+            except OSError as e:
+                logger.debug("内核复制不可用，改用其他方式: %s", e)
+                os.ftruncate(dst_fd, copied)
+
+        # 通用的分块读写复制
+        src.seek(copied)
+        dst.seek(copied)
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        while copied < size:
+            read = src.readinto(buffer)
+            if not read:
+                break
+            dst.write(view[:read])
+            copied += read
+            if progress_callback:
+                progress_callback(copied, size)
+        dst.flush()
+        return copied
@@ -0,0 +1,164 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from logger import logger  # 导入日志模块
+
+# 最多缓存的目标文件夹数量（不含分片子文件夹，分片子文件夹的数量通过 set_capacity 另外加上）
+MAX_CACHED_FOLDERS = 64
+
+# 匹配 "名称_序号" 形式的文件名
+_SUFFIX_PATTERN = re.compile(r'^(.*)_(\d+)$')
+
+
+class _FolderNames:
+    """单个目标文件夹中的文件名索引"""
+    __slots__ = ('names', 'max_suffix')
+
+    def __init__(self):
+        self.names = set()
+        # (名称, 扩展名) -> 已使用的最大序号
+        self.max_suffix = {}
+
+    def add(self, file_name):
+        file_name = os.path.normcase(file_name)
+        self.names.add(file_name)
+        name, ext = os.path.splitext(file_name)
+        match = _SUFFIX_PATTERN.match(name)
+        if match:
+            key = (match.group(1), ext)
+            suffix = int(match.group(2))
+            if suffix > self.max_suffix.get(key, 0):
+                self.max_suffix[key] = suffix
+
+
+class TargetNameAllocator:
+    """目标文件名分配器
+
+    为每个目标文件夹懒加载一次 os.scandir 建立文件名索引，记录每个文件名已使用的最大序号，
+    发生重名时直接生成下一个 "名称_序号.扩展名"，不再逐个 os.path.exists 探测。
+    选中的文件名通过独占创建（O_EXCL）占位，与其他程序同时写入时也不会覆盖已有文件。
+    """
+
+    def __init__(self, max_folders=MAX_CACHED_FOLDERS):
+        """
+        Args:
+            max_folders: 最多缓存的目标文件夹数量
+        """
+        self.max_folders = max(int(max_folders), 1)
+        self._folders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_capacity(self, max_folders):
+        """调整最多缓存的目标文件夹数量，分片子文件夹较多时避免索引被反复淘汰和重新扫描
+
+        Args:
+            max_folders: 最多缓存的目标文件夹数量
+        """
+        with self._lock:
+            self.max_folders = max(int(max_folders), 1)
+            while len(self._folders) > self.max_folders:
+                self._folders.popitem(last=False)
+
+    def reserve(self, target_folder, file_name, create=True):
+        """为文件在目标文件夹中分配不冲突的文件名，并创建同名的空占位文件
+
+        调用方随后应使用 os.replace 等方式用实际文件覆盖占位文件，
+        移动失败时调用 release 删除占位文件。
+
+        Args:
+            target_folder: 目标文件夹（必须已存在，create 为 False 时可以不存在）
+            file_name: 原始文件名
+            create: 是否创建占位文件；为 False 时只在索引中记录分配结果，用于生成移动计划
+
+        Returns:
+            str: 分配的目标文件路径
+        """
+        name, ext = os.path.splitext(file_name)
+        key = (os.path.normcase(name), os.path.normcase(ext))
+
+        with self._lock:
+            folder = self._get_folder(target_folder)
+            candidate = file_name
+            if os.path.normcase(file_name) in folder.names:
+                # 索引中记录的文件可能已被用户删除，原文件名可用时优先使用原文件名；
+                # 生成计划时索引中还包含已计划但尚未移动的文件，不能据此判断
+                if not create or os.path.lexists(os.path.join(target_folder, file_name)):
+                    candidate = f"{name}_{folder.max_suffix.get(key, 0) + 1}{ext}"
+                else:
+                    folder.names.discard(os.path.normcase(file_name))
+
+            while True:
+                target_file_path = os.path.join(target_folder, candidate)
+                if not create:
+                    if os.path.normcase(candidate) in folder.names:
+                        candidate = f"{name}_{folder.max_suffix.get(key, 0) + 1}{ext}"
+                        continue
+                    folder.add(candidate)
+                    break
+                try:
+                    fd = os.open(target_file_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    # 其他程序同时创建了同名文件，记录后继续使用下一个序号
+                    folder.add(candidate)
+                    candidate = f"{name}_{folder.max_suffix.get(key, 0) + 1}{ext}"
+                    continue
+                os.close(fd)
+                folder.add(candidate)
+                break
+
+        if candidate != file_name:
+            logger.debug("目标文件已存在，重命名为: %s", candidate)
+        return target_file_path
+
+    def release(self, target_file_path):
+        """删除 reserve 创建的占位文件（移动失败时调用）
+
+        Args:
+            target_file_path: reserve 返回的目标文件路径
+        """
+        target_folder, file_name = os.path.split(target_file_path)
+        try:
+            if os.path.getsize(target_file_path) == 0:
+                os.remove(target_file_path)
+        except OSError:
+            pass
+        with self._lock:
+            folder = self._folders.get(os.path.normcase(target_folder))
+            if folder is not None:
+                folder.names.discard(os.path.normcase(file_name))
+
+    def invalidate(self, target_folder=None):
+        """清除文件名索引，下次分配时重新扫描
+
+        Args:
+            target_folder: 要清除的目标文件夹，为None时清除全部
+        """
+        with self._lock:
+            if target_folder is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(os.path.normcase(target_folder), None)
+
+    def _get_folder(self, target_folder):
+        """获取目标文件夹的文件名索引，调用方需持有锁"""
+        folder_key = os.path.normcase(target_folder)
+        folder = self._folders.get(folder_key)
+        if folder is not None:
+            self._folders.move_to_end(folder_key)
+            return folder
+
+        folder = _FolderNames()
+        try:
+            with os.scandir(target_folder) as entries:
+                for entry in entries:
+                    folder.add(entry.name)
+        except FileNotFoundError:
+            pass
+        logger.debug("建立目标文件夹文件名索引: %s, 共 %s 个文件", target_folder, len(folder.names))
+
+        self._folders[folder_key] = folder
+        if len(self._folders) > self.max_folders:
+            self._folders.popitem(last=False)
+        return folder
@@ -1,73 +1,155 @@
 import os
-import subprocess
+from collections import OrderedDict
 from PyQt5.QtCore import QObject
 
 # 导入软件名称常量
-from constants import APP_NAME
+from constants import APP_NAME, NOTIFICATION_HISTORY_SIZE, NOTIFICATION_MAX_FILES
 from logger import logger  # 导入日志模块
 
+
+class _NotificationRecord:
+    """一条通知对应的分类文件信息"""
+    __slots__ = ('notification_id', 'folder_counts', 'files', 'total')
+
+    def __init__(self, notification_id):
+        self.notification_id = notification_id
+        self.folder_counts = OrderedDict()  # 目标文件夹 -> 文件数量
+        self.files = []  # 最近的 (文件路径, 目标文件夹)，最多 NOTIFICATION_MAX_FILES 个
+        self.total = 0
+
+
 class NotificationHandler(QObject):
     """
     处理通知相关的功能，包括点击通知打开目标文件所在文件夹并选中文件
+
+    每条通知的分类文件信息保存在固定大小的环形缓冲区中，按通知ID索引，
+    无论一次分类多少文件，占用的内存都有上限。
     """
-    def __init__(self):
+    def __init__(self, history_size=NOTIFICATION_HISTORY_SIZE):
         super().__init__()
-        self.last_classified_file = None
-        self.last_target_folder = None
+        self._history = [None] * history_size
+        self._next_id = 1
+        self.current_notification_id = None
         logger.debug("通知处理器初始化完成")
-    
+
+    def store_classified_files(self, files):
+        """
+        存储一批分类文件的信息，生成新的通知ID
+
+        Args:
+            files: (移动后的文件路径, 目标文件夹路径) 列表
+
+        Returns:
+            int: 通知ID
+        """
+        notification_id = self._next_id
+        self._next_id += 1
+        record = _NotificationRecord(notification_id)
+        for file_path, target_folder in files:
+            record.folder_counts[target_folder] = record.folder_counts.get(target_folder, 0) + 1
+            record.total += 1
+        record.files = list(files[-NOTIFICATION_MAX_FILES:])
+
+        # 覆盖环形缓冲区中最旧的记录
+        self._history[notification_id % len(self._history)] = record
+        self.current_notification_id = notification_id
+        logger.debug("存储分类文件信息: 通知 %s, 共 %s 个文件", notification_id, record.total)
+        return notification_id
+
     def store_classified_file_info(self, file_path, target_folder):
         """
-        存储最近一次分类的文件信息
-        
+        存储单个分类文件的信息
+
         Args:
-            file_path: 原始文件路径
+            file_path: 移动后的文件路径
             target_folder: 目标文件夹路径
+
+        Returns:
+            int: 通知ID
         """
-        self.last_classified_file = file_path
-        self.last_target_folder = target_folder
-        logger.debug(f"存储分类文件信息: {file_path} -> {target_folder}")
-    
-    def open_folder_and_select_file(self):
+        return self.store_classified_files([(file_path, target_folder)])
+
+    def get_record(self, notification_id):
+        """获取通知对应的分类文件信息，已被新通知覆盖时返回None"""
+        record = self._history[notification_id % len(self._history)]
+        if record is None or record.notification_id != notification_id:
+            return None
+        return record
+
+    def format_summary(self, notification_id):
+        """
+        生成通知内容，例如 "132 个文件 → Images, 40 个文件 → Documents"
+
+        Args:
+            notification_id: 通知ID
+
+        Returns:
+            str: 通知内容
+        """
+        record = self.get_record(notification_id)
+        if record is None:
+            return ''
+        if record.total == 1:
+            file_name = os.path.basename(record.files[0][0])
+            return f'文件 {file_name} 已被移动到目标目录'
+        folders = sorted(record.folder_counts.items(), key=lambda item: item[1], reverse=True)
+        parts = [f'{count} 个文件 → {os.path.basename(os.path.normpath(folder))}' for folder, count in folders[:5]]
+        if len(folders) > 5:
+            parts.append(f'等 {len(folders)} 个文件夹')
+        return ', '.join(parts)
+
+    def open_folder_and_select_file(self, notification_id=None):
         """
         打开目标文件夹并选中文件
+
+        Args:
+            notification_id: 通知ID，为None时使用最近一条通知
         """
-        if not self.last_classified_file or not self.last_target_folder:
+        if notification_id is None:
+            notification_id = self.current_notification_id
+        record = self.get_record(notification_id) if notification_id is not None else None
+        if record is None or not record.files:
             logger.warning("没有最近分类的文件信息，无法打开文件夹")
             return False
-        
+
+        # 选中文件数量最多的目标文件夹中最后分类的文件
+        main_folder = max(record.folder_counts.items(), key=lambda item: item[1])[0]
+        file_path = next((path for path, folder in reversed(record.files) if folder == main_folder),
+                         record.files[-1][0])
+
         # 确保路径使用正确的分隔符
-        target_folder = self.last_target_folder.replace('/', '\\')
-        target_file_path = self.last_classified_file.replace('/', '\\')
-        
-        logger.info(f"尝试打开文件: {target_file_path}")
-        
+        target_file_path = file_path.replace('/', '\\')
+
+        logger.info("尝试打开文件: %s", target_file_path)
+
         # 如果找到了文件，打开文件夹并选中文件
         if os.path.exists(target_file_path):
             try:
+                import subprocess
+                
                 # 在Windows上使用explorer选中文件
                 # 修复explorer命令参数格式，确保路径格式正确
                 # 当路径中包含空格时，需要使用shell=True并将整个命令作为一个字符串传递
                 command = f'explorer /select,"{target_file_path}"'
-                logger.debug(f"执行命令: {command}")
+                logger.debug("执行命令: %s", command)
                 subprocess.run(command, shell=True)
                 logger.info("成功打开文件夹并选中文件")
                 return True
             except Exception as e:
-                logger.error(f"打开文件夹时出错: {str(e)}")
+                logger.error("打开文件夹时出错: %s", e)
                 return False
         else:
-            logger.warning(f"文件不存在，无法打开: {target_file_path}")
+            logger.warning("文件不存在，无法打开: %s", target_file_path)
             return False
-    
+
     def show_notification(self, title, message):
         """
         显示系统通知
-        
+
         Args:
             title: 通知标题
             message: 通知内容
         """
-        logger.debug(f"显示通知: {title} - {message}")
+        logger.debug("显示通知: %s - %s", title, message)
         # 这里可以根据需要实现系统通知功能
-        # 目前通知功能由系统托盘图标实现，此方法保留为扩展接口
\ No newline at end of file
+        # 目前通知功能由系统托盘图标实现，此方法保留为扩展接口
@@ -0,0 +1,349 @@
+import os
+import array
+import threading
+import time
+from watchdog.events import FileCreatedEvent, FileMovedEvent
+
+from logger import logger  # 导入日志模块
+from constants import POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, POLL_RACY_WINDOW
+
+# 不提供可靠变化通知的网络文件系统类型（Linux /proc/mounts 中的名称）
+REMOTE_FILESYSTEMS = frozenset({
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'afs', 'ncpfs', '9p', 'ceph', 'glusterfs', 'lustre',
+    'davfs', 'fuse.sshfs', 'fuse.rclone', 'fuse.s3fs', 'fuse.davfs2',
+})
+
+# Windows GetDriveTypeW 返回的网络驱动器类型
+_DRIVE_REMOTE = 4
+
+
+def is_remote_filesystem(path):
+    """判断文件夹是否位于网络文件系统（SMB/NFS 等）上
+
+    Linux 根据 /proc/mounts 中最长匹配的挂载点判断，Windows 根据 UNC 路径和驱动器类型判断；
+    其他系统无法判断时返回 False，可以在配置中为监听文件夹指定 "polling": true。
+    """
+    path = os.path.realpath(path)
+    if os.name == 'nt':
+        if path.startswith('\\\\'):
+            return True
+        try:
+            import ctypes
+            drive = os.path.splitdrive(path)[0] + '\\'
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == _DRIVE_REMOTE
+        except Exception:
+            return False
+
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8', errors='replace') as f:
+            mounts = f.read().splitlines()
+    except OSError:
+        return False
+    best_mount_point = ''
+    fstype = ''
+    for line in mounts:
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        # /proc/mounts 中的空格写作 \040
+        mount_point = fields[1].replace('\\040', ' ')
+        if path == mount_point or path.startswith(mount_point.rstrip('/') + '/'):
+            if len(mount_point) > len(best_mount_point):
+                best_mount_point, fstype = mount_point, fields[2]
+    return fstype in REMOTE_FILESYSTEMS
+
+
+class _DirSnapshot:
+    """一个文件夹的快照：文件名及对应的大小、修改时间和文件标识（按位置存放在数组中）"""
+    __slots__ = ('mtime', 'scanned', 'index', 'sizes', 'mtimes', 'inodes', 'subdirs')
+
+    def __init__(self, mtime, scanned):
+        self.mtime = mtime      # 文件夹的修改时间（纳秒）
+        self.scanned = scanned  # 扫描时间（time.time()）
+        self.index = {}         # 文件名 -> 数组中的位置
+        self.sizes = array.array('q')
+        self.mtimes = array.array('q')
+        self.inodes = array.array('Q')
+        self.subdirs = []
+
+    def add(self, name, size, mtime, inode):
+        self.index[name] = len(self.sizes)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.inodes.append(inode)
+
+
+class PolledWatch:
+    """一个使用轮询监听的文件夹"""
+
+    def __init__(self, handler, skip_folder=None):
+        self.handler = handler
+        self.skip_folder = skip_folder
+        self.dirs = {}  # 文件夹路径 -> _DirSnapshot，父文件夹总是在子文件夹之前
+        self.interval = POLL_MIN_INTERVAL
+        self.due = 0.0
+        self.initialized = False
+        self.lost = False  # 监听文件夹暂时无法访问（例如网络中断），恢复后其中的文件作为新文件处理
+
+    @property
+    def root(self):
+        # 热更新配置时事件处理器的过滤条件会被替换，每次都从事件处理器读取
+        return self.handler.root
+
+
+class PollingObserver:
+    """基于 os.scandir 快照比较的轮询监听，用于不提供变化通知的网络文件系统
+
+    每个文件夹只保存紧凑的快照（文件名 -> 大小、修改时间、文件标识数组）。每次轮询只对文件夹本身调用一次 stat，
+    文件夹的修改时间没有变化时跳过该文件夹；有变化时用一次 os.scandir 重新读取并与快照比较，
+    新出现的文件作为创建事件、文件标识与消失文件相同的作为重命名事件交给事件处理器。
+    Windows 下 scandir 不提供文件标识，只在重新读取时为新文件单独读取一次，首次快照中的文件被重命名时按新文件处理；
+    不提供文件标识的网络共享（st_ino 为 0）上重命名同样按新文件处理。
+    监听文件夹本身无法访问时（SMB 重连、VPN 断开）清空快照，之后每次轮询尝试重新建立，恢复后其中的文件作为新文件处理。
+    轮询间隔随文件变化自适应：有变化时缩短到 POLL_MIN_INTERVAL，没有变化时逐步延长到 POLL_MAX_INTERVAL。
+    """
+
+    def __init__(self, min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._watches = []
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._stats = {'polled_dirs': 0, 'rescanned_dirs': 0, 'skipped_dirs': 0}
+
+    def schedule(self, handler, skip_folder=None):
+        """添加一个轮询监听的文件夹，首次轮询时建立快照，已有文件不产生事件
+
+        Args:
+            handler: 事件处理器，需要有 root 属性（WatchRoot）
+            skip_folder: 判断递归时是否跳过子文件夹的函数，例如分类目标文件夹
+
+        Returns:
+            PolledWatch: 用于 unschedule 的监听对象
+        """
+        watch = PolledWatch(handler, skip_folder)
+        watch.interval = self.min_interval
+        with self._condition:
+            self._watches.append(watch)
+            self._condition.notify()
+        return watch
+
+    def unschedule(self, watch):
+        with self._condition:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='PollingObserver', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def join(self):
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        """获取轮询计数
+
+        Returns:
+            dict: 轮询的文件夹数量、因内容变化重新读取的文件夹数量、修改时间未变化而跳过的文件夹数量
+        """
+        with self._condition:
+            return dict(self._stats)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if self._watches:
+                        watch = min(self._watches, key=lambda w: w.due)
+                        timeout = watch.due - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        self._condition.wait(timeout)
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+
+            try:
+                changed = self._poll(watch)
+            except Exception as e:
+                logger.error("轮询文件夹 %s 时出错: %s", watch.root.path, e)
+                changed = False
+
+            # 有变化时缩短轮询间隔，没有变化时逐步延长
+            if changed:
+                watch.interval = self.min_interval
+            else:
+                watch.interval = min(watch.interval * 2, self.max_interval)
+            watch.due = time.monotonic() + watch.interval
+
+    def _poll(self, watch):
+        """轮询一次监听文件夹，返回是否有文件变化"""
+        if not watch.initialized:
+            self._add_tree(watch, watch.root.path, emit=watch.lost)
+            if watch.root.path not in watch.dirs:
+                if not watch.lost:
+                    watch.lost = True
+                    logger.warning("无法访问轮询监听的文件夹，恢复后重新建立快照: %s", watch.root.path)
+                return False
+            watch.initialized = True
+            if watch.lost:
+                watch.lost = False
+                logger.info("轮询监听的文件夹已恢复访问: %s, 共 %s 个文件夹", watch.root.path, len(watch.dirs))
+                return True
+            logger.debug("轮询监听快照已建立: %s, 共 %s 个文件夹", watch.root.path, len(watch.dirs))
+            return False
+
+        changed = False
+        polled = rescanned = 0
+        for path in list(watch.dirs):
+            snapshot = watch.dirs.get(path)
+            if snapshot is None:
+                # 父文件夹已在本次轮询中被删除
+                continue
+            polled += 1
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                self._drop_tree(watch, path)
+                changed = True
+                continue
+            # 修改时间没有变化，并且距离上次扫描足够久（排除时间精度导致的漏检）时跳过
+            if mtime == snapshot.mtime and snapshot.scanned - mtime / 1e9 > POLL_RACY_WINDOW:
+                continue
+            rescanned += 1
+            if self._rescan(watch, path, snapshot):
+                changed = True
+
+        # 监听文件夹本身无法访问时，下次轮询重新建立快照
+        if watch.root.path not in watch.dirs:
+            watch.dirs.clear()
+            watch.initialized = False
+            watch.lost = True
+            logger.warning("无法访问轮询监听的文件夹，恢复后重新建立快照: %s", watch.root.path)
+
+        with self._condition:
+            self._stats['polled_dirs'] += polled
+            self._stats['rescanned_dirs'] += rescanned
+            self._stats['skipped_dirs'] += polled - rescanned
+        return changed
+
+    def _scan(self, watch, path, previous=None):
+        """用一次 os.scandir 读取文件夹，大小和修改时间只对新文件调用 stat
+
+        Returns:
+            _DirSnapshot: 文件夹快照，文件夹不存在时返回None
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            scanned = time.time()
+            entries = os.scandir(path)
+        except OSError:
+            return None
+
+        snapshot = _DirSnapshot(mtime, scanned)
+        root = watch.root
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if (root.recursive and root.accepts_folder(entry.path)
+                                and not (watch.skip_folder and watch.skip_folder(entry.path))):
+                            snapshot.subdirs.append(entry.path)
+                        continue
+                    position = previous.index.get(entry.name) if previous is not None else None
+                    if os.name == 'nt':
+                        # Windows 下 scandir 已包含大小和修改时间；文件标识需要额外的系统调用，
+                        # 只为重新读取时出现的新文件读取，用于识别重命名（首次快照中的文件记为 0）
+                        stat = entry.stat()
+                        if position is not None:
+                            inode = previous.inodes[position]
+                        else:
+                            inode = entry.inode() if previous is not None else 0
+                        snapshot.add(entry.name, stat.st_size, stat.st_mtime_ns, inode)
+                        continue
+                    inode = entry.inode()
+                    if position is not None and previous.inodes[position] == inode:
+                        snapshot.add(entry.name, previous.sizes[position], previous.mtimes[position], inode)
+                    else:
+                        stat = entry.stat(follow_symlinks=False)
+                        snapshot.add(entry.name, stat.st_size, stat.st_mtime_ns, inode)
+                except OSError:
+                    continue
+        return snapshot
+
+    def _rescan(self, watch, path, previous):
+        """重新读取发生变化的文件夹，把新文件交给事件处理器，返回是否有文件变化"""
+        snapshot = self._scan(watch, path, previous)
+        if snapshot is None:
+            self._drop_tree(watch, path)
+            return True
+        watch.dirs[path] = snapshot
+
+        # 消失的文件按文件标识记录，用于识别重命名（例如 .crdownload 下载完成后的重命名）
+        vanished = {}
+        for name, position in previous.index.items():
+            if name not in snapshot.index and previous.inodes[position]:
+                vanished[previous.inodes[position]] = name
+        changed = len(snapshot.index) != len(previous.index) or bool(vanished)
+
+        for name, position in snapshot.index.items():
+            if name in previous.index:
+                continue
+            changed = True
+            file_path = os.path.join(path, name)
+            source_name = vanished.get(snapshot.inodes[position])
+            if source_name is not None:
+                self._dispatch(watch, FileMovedEvent(os.path.join(path, source_name), file_path))
+            else:
+                self._dispatch(watch, FileCreatedEvent(file_path))
+
+        # 新增的子文件夹中的文件都是新文件，删除的子文件夹从快照中移除
+        subdirs = set(snapshot.subdirs)
+        for subdir in previous.subdirs:
+            if subdir not in subdirs:
+                self._drop_tree(watch, subdir)
+                changed = True
+        for subdir in snapshot.subdirs:
+            if subdir not in watch.dirs:
+                self._add_tree(watch, subdir, emit=True)
+                changed = True
+        return changed
+
+    def _add_tree(self, watch, path, emit):
+        """读取文件夹及其子文件夹并加入快照，emit 为 True 时其中的文件作为新文件处理"""
+        folders = [path]
+        while folders:
+            folder = folders.pop()
+            snapshot = self._scan(watch, folder)
+            if snapshot is None:
+                continue
+            watch.dirs[folder] = snapshot
+            if emit:
+                for name in snapshot.index:
+                    self._dispatch(watch, FileCreatedEvent(os.path.join(folder, name)))
+            folders.extend(reversed(snapshot.subdirs))
+
+    def _drop_tree(self, watch, path):
+        """从快照中移除已删除的文件夹及其子文件夹"""
+        prefix = path.rstrip(os.sep) + os.sep
+        for folder in [folder for folder in watch.dirs if folder == path or folder.startswith(prefix)]:
+            del watch.dirs[folder]
+
+    def _dispatch(self, watch, event):
+        try:
+            watch.handler.dispatch(event)
+        except Exception as e:
+            logger.error("处理轮询到的文件事件 %s 时出错: %s", event.src_path, e)
@@ -0,0 +1,386 @@
+import os
+import re
+import time
+import fnmatch
+from types import MappingProxyType
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+from logger import logger  # 导入日志模块
+from sharding import ShardPolicy
+
+# 缓存的未匹配扩展名数量上限，避免异常的扩展名无限增长
+MAX_FALLBACK_ENTRIES = 1024
+
+# 正则表达式开头的全局标记，例如 (?i)，合并为一个表达式时需要改写为局部标记 (?i:...)
+_GLOBAL_FLAGS = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+# 引用分组的正则表达式操作（反向引用 \1、(?P=name) 和条件分组 (?(1)...)）
+_GROUP_REFERENCES = (sre_parse.GROUPREF, sre_parse.GROUPREF_EXISTS)
+
+
+def _references_groups(items):
+    """解析后的正则表达式中是否引用了分组"""
+    for op, av in items:
+        if op in _GROUP_REFERENCES:
+            return True
+        for value in (av if isinstance(av, (tuple, list)) else (av,)):
+            if isinstance(value, sre_parse.SubPattern) and _references_groups(value):
+                return True
+            if isinstance(value, (tuple, list)) and any(
+                    isinstance(item, sre_parse.SubPattern) and _references_groups(item) for item in value):
+                return True
+    return False
+
+
+def _needs_standalone(regex):
+    """正则表达式是否需要单独匹配
+
+    合并为一个表达式时分组编号会改变，反向引用和条件分组会指向错误的分组；
+    命名分组在不同规则之间可能重名。这些正则表达式不参与合并，按规则顺序单独匹配。
+    """
+    parsed = sre_parse.parse(regex)
+    groupdict = parsed.state.groupdict if hasattr(parsed, 'state') else parsed.pattern.groupdict
+    return bool(groupdict) or _references_groups(parsed)
+
+
+def _number(rule, key):
+    """读取规则中的数值条件，没有设置或格式错误时返回None"""
+    value = rule.get(key)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        logger.warning("规则 %s 的 %s 不是数字，已忽略: %s", rule.get('category', ''), key, value)
+        return None
+
+
+class _CompiledRule:
+    """编译后的一条规则：目标文件夹、分类名称以及文件大小和修改时间条件"""
+    __slots__ = ('order', 'target_folder', 'category', 'min_size', 'max_size', 'min_age', 'max_age')
+
+    def __init__(self, order, target_folder, category, rule):
+        self.order = order
+        self.target_folder = target_folder
+        self.category = category
+        self.min_size = _number(rule, 'min_size')
+        self.max_size = _number(rule, 'max_size')
+        self.min_age = _number(rule, 'min_age')
+        self.max_age = _number(rule, 'max_age')
+
+    @property
+    def constrained(self):
+        """是否有需要读取文件信息的条件"""
+        return not (self.min_size is None and self.max_size is None
+                    and self.min_age is None and self.max_age is None)
+
+    def accepts(self, stat, now):
+        """文件大小（字节）和文件修改后经过的时间（秒）是否满足条件"""
+        if self.min_size is not None and stat.st_size < self.min_size:
+            return False
+        if self.max_size is not None and stat.st_size > self.max_size:
+            return False
+        age = now - stat.st_mtime
+        if self.min_age is not None and age < self.min_age:
+            return False
+        if self.max_age is not None and age > self.max_age:
+            return False
+        return True
+
+
+class RuleIndex:
+    """编译后的分类规则查找表
+
+    根据规则列表预先计算 扩展名 -> (目标文件夹, 分类名称) 的映射，
+    默认目标文件夹下的子文件夹也在编译时确定，文件分类时只需一次字典查找。
+
+    规则还可以按多段后缀（.tar.gz）、文件名通配符（patterns）、正则表达式（regex）、
+    文件大小（min_size/max_size，字节）和文件修改后经过的时间（min_age/max_age，秒）匹配。
+    所有多段后缀编译为一个后缀表，从文件名最后一个点开始向前逐段查找；所有通配符和正则表达式
+    合并为一个带命名分组的正则表达式，一次匹配即可得到最靠前的规则。无论规则数量多少，
+    每个文件只需一次后缀查找和一次正则匹配，并且保持按规则顺序第一个匹配的规则生效。
+    包含反向引用、条件分组或命名分组的正则表达式合并后分组编号会改变，这些表达式单独匹配。
+    只有扩展名的规则（以及位于所有其他规则之前的扩展名规则）仍然只需一次字典查找。
+    规则变化时应重新创建实例，实例本身不可修改。
+    """
+    __slots__ = ('_table', '_default_target_folder', '_fallbacks', '_rules', '_fast', '_suffixes',
+                 '_max_suffix_dots', '_pattern', '_alternatives', '_standalone', '_unconditional', '_rich', '_target_folders',
+                 '_shard_policies')
+
+    def __init__(self, rules, default_target_folder=''):
+        """
+        Args:
+            rules: 规则列表，每条规则包含 extensions、target_folder 和 category，
+                可选 patterns、regex、min_size、max_size、min_age、max_age 和 shard
+            default_target_folder: 默认目标文件夹
+        """
+        table = {}
+        compiled_rules = []
+        suffixes = {}
+        alternatives = []
+        standalone = []
+        unconditional = []
+        target_folders = {}
+        shard_policies = {}
+        first_rich = len(rules)
+        for order, rule in enumerate(rules):
+            target_folder = rule.get('target_folder', '')
+            category = rule.get('category', '')
+
+            # 如果规则中的target_folder为空，但有category和default_target_folder，则使用默认目标文件夹下的子文件夹
+            if not target_folder and category and default_target_folder:
+                target_folder = os.path.join(default_target_folder, category)
+
+            compiled = _CompiledRule(order, target_folder or None, category, rule)
+            compiled_rules.append(compiled)
+            extensions = rule.get('extensions', [])
+            for extension in extensions:
+                # 保持按规则顺序第一个匹配的规则生效；目标文件夹为None时按扩展名分类
+                table.setdefault(extension, (target_folder or None, category))
+                suffixes.setdefault(extension.lower(), []).append(order)
+
+            rule_alternatives, rule_standalone = self._compile_patterns(order, rule)
+            alternatives.extend(rule_alternatives)
+            standalone.extend(rule_standalone)
+            has_patterns = bool(rule_alternatives or rule_standalone)
+            if not extensions and not has_patterns and compiled.constrained:
+                # 只有大小或时间条件的规则匹配任何文件名
+                unconditional.append(order)
+
+            if target_folder and (extensions or has_patterns or compiled.constrained):
+                target_folders.setdefault(target_folder, None)
+                # 同一目标文件夹只使用第一条规则的分片设置
+                if target_folder not in shard_policies:
+                    policy = ShardPolicy.from_rule(rule, target_folder)
+                    if policy is not None:
+                        shard_policies[target_folder] = policy
+
+            rich = (compiled.constrained or has_patterns or not extensions
+                    or any(extension.count('.') > 1 for extension in extensions))
+            if rich and (extensions or has_patterns or compiled.constrained):
+                first_rich = min(first_rich, order)
+
+        self._table = MappingProxyType(table)
+        self._default_target_folder = default_target_folder
+        # 未匹配规则的扩展名对应的默认分类，首次使用时计算
+        self._fallbacks = {}
+        self._rules = tuple(compiled_rules)
+        self._suffixes = MappingProxyType({suffix: tuple(orders) for suffix, orders in suffixes.items()})
+        self._max_suffix_dots = max((suffix.count('.') for suffix in suffixes), default=0)
+        self._alternatives = tuple((order, re.compile(source)) for order, _, source in alternatives)
+        self._standalone = tuple(standalone)
+        self._unconditional = tuple(unconditional)
+        self._rich = first_rich < len(rules)
+        self._target_folders = tuple(target_folders)
+        self._shard_policies = tuple(shard_policies.values())
+
+        # 位于所有其他类型规则之前的扩展名规则只需一次字典查找
+        fast = {}
+        for extension, orders in self._suffixes.items():
+            rule = self._rules[orders[0]]
+            if orders[0] < first_rich and rule.target_folder and extension.count('.') <= 1:
+                fast[extension] = (rule.target_folder, rule.category)
+        self._fast = MappingProxyType(fast)
+
+        self._pattern = None
+        if alternatives:
+            try:
+                self._pattern = re.compile('|'.join(f'(?P<{name}>{source})' for _, name, source in alternatives))
+            except re.error as e:
+                # 例如不同规则的正则表达式中有同名分组，改为逐个匹配
+                logger.warning("无法合并规则中的正则表达式，将逐个匹配: %s", e)
+
+    @staticmethod
+    def _compile_patterns(order, rule):
+        """将规则中的通配符和正则表达式转换为可以合并的表达式
+
+        Returns:
+            tuple: (可以合并的 (规则序号, 分组名称, 表达式) 列表, 需要单独匹配的 (规则序号, 编译后的正则表达式) 列表)，
+                无效的正则表达式会被忽略
+        """
+        sources = []
+        for pattern in rule.get('patterns') or []:
+            if pattern:
+                # 通配符匹配完整的文件名，不区分大小写
+                sources.append(f'(?i:{fnmatch.translate(pattern)})')
+        standalone = []
+        regex = rule.get('regex')
+        if regex:
+            try:
+                compiled = re.compile(regex)
+            except re.error as e:
+                logger.error("规则 %s 的正则表达式无效，已忽略: %s", rule.get('category', ''), e)
+            else:
+                if _needs_standalone(regex):
+                    # 正则表达式在文件名中搜索（search），与合并后的表达式语义相同
+                    logger.debug("规则 %s 的正则表达式包含分组引用或命名分组，将单独匹配", rule.get('category', ''))
+                    standalone.append((order, compiled))
+                else:
+                    match = _GLOBAL_FLAGS.match(regex)
+                    if match:
+                        regex = f'(?{match.group(1)}:{regex[match.end():]})'
+                    # 正则表达式在文件名中搜索，可以用 ^ 和 $ 限定位置
+                    sources.append(f'(?s:.*?)(?:{regex})')
+        return [(order, f'r{order}x{i}', source) for i, source in enumerate(sources)], standalone
+
+    def __len__(self):
+        return len(self._table)
+
+    def lookup(self, file_extension):
+        """查找扩展名对应的目标文件夹和分类
+
+        Args:
+            file_extension: 小写的文件扩展名（包含点），没有扩展名时为空字符串
+
+        Returns:
+            tuple: (目标文件夹, 分类名称)，没有可用的目标文件夹时目标文件夹为None
+        """
+        entry = self._table.get(file_extension)
+        if entry is not None and entry[0]:
+            return entry
+        return self._fallback(file_extension, entry)
+
+    def match(self, file_path, file_extension, stat=None):
+        """按全部规则条件查找文件的目标文件夹和分类
+
+        Args:
+            file_path: 文件路径
+            file_extension: 小写的文件扩展名（包含点），可以是根据文件内容识别出的扩展名
+            stat: 文件的 os.stat 结果，为None时在规则需要时才读取
+
+        Returns:
+            tuple: (目标文件夹, 分类名称)，没有可用的目标文件夹时目标文件夹为None
+        """
+        if not self._rich:
+            return self.lookup(file_extension)
+        entry = self._fast.get(file_extension)
+        if entry is not None:
+            return entry
+
+        rule = self._first_match(file_path, file_extension, stat)
+        if rule is None:
+            return self._fallback(file_extension, None)
+        if rule.target_folder:
+            return rule.target_folder, rule.category
+        return self._fallback(file_extension, (None, rule.category))
+
+    def _first_match(self, file_path, file_extension, stat):
+        """找到所有条件都满足的第一条规则"""
+        file_name = os.path.basename(file_path)
+        lower_name = file_name.lower()
+
+        # 后缀：从最后一个点开始向前逐段查找，例如 .gz、.tar.gz
+        candidates = set(self._suffixes.get(file_extension, ()))
+        end = len(lower_name)
+        for _ in range(self._max_suffix_dots):
+            end = lower_name.rfind('.', 0, end)
+            if end <= 0:
+                break
+            candidates.update(self._suffixes.get(lower_name[end:], ()))
+        candidates.update(self._unconditional)
+
+        # 通配符和正则表达式：合并后的表达式返回最靠前的规则
+        pattern_order = None
+        if self._pattern is not None:
+            match = self._pattern.match(file_name)
+            if match:
+                name = match.lastgroup
+                if not name or not name.startswith('r') or 'x' not in name:
+                    name = next(key for key, value in match.groupdict().items()
+                                if value is not None and key.startswith('r') and 'x' in key)
+                pattern_order = int(name[1:name.index('x')])
+                candidates.add(pattern_order)
+        elif self._alternatives:
+            candidates.update(order for order, regex in self._alternatives if regex.match(file_name))
+        # 包含分组引用的正则表达式单独匹配，与其他候选规则一起按规则顺序比较
+        candidates.update(order for order, regex in self._standalone if regex.search(file_name))
+
+        now = None
+        for order in sorted(candidates):
+            rule = self._rules[order]
+            if not rule.constrained:
+                return rule
+            if stat is None:
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    return None
+            if now is None:
+                now = time.time()
+            if rule.accepts(stat, now):
+                return rule
+            if order == pattern_order:
+                # 合并的表达式只给出第一个匹配的规则，该规则条件不满足时逐个检查后面的通配符和正则表达式
+                later = {o for o, regex in self._alternatives if o > order and regex.match(file_name)}
+                for later_order in sorted(later | {o for o in candidates if o > order}):
+                    later_rule = self._rules[later_order]
+                    if not later_rule.constrained or later_rule.accepts(stat, now):
+                        return later_rule
+                return None
+        return None
+
+    def _fallback(self, file_extension, entry):
+        fallback = self._fallbacks.get(file_extension)
+        if fallback is None:
+            # 如果没有找到匹配的规则，使用默认目标文件夹和扩展名作为分类
+            if self._default_target_folder:
+                category = file_extension[1:] if file_extension else 'other'
+                fallback = (os.path.join(self._default_target_folder, category), category)
+            elif entry is not None:
+                fallback = (None, entry[1])
+            else:
+                fallback = (None, None)
+            if len(self._fallbacks) < MAX_FALLBACK_ENTRIES:
+                self._fallbacks[file_extension] = fallback
+        return fallback
+
+    def matches(self, file_extension):
+        """判断扩展名是否被某条规则匹配"""
+        return file_extension in self._table
+
+    def target_folders(self):
+        """获取所有规则解析后的目标文件夹（去重，保持规则顺序）"""
+        return list(self._target_folders)
+
+    def shard_policies(self):
+        """获取设置了分片的目标文件夹的分片方式"""
+        return list(self._shard_policies)
+
+
+class RulesSnapshot:
+    """某一版本配置编译后的全部分类数据
+
+    包含全局规则查找表、各监听文件夹专用的查找表、监听文件夹列表、全部目标文件夹及其前缀和目标文件夹的分片方式。
+    配置变化时 ConfigManager 会编译出新的快照并整体替换引用，
+    分类管道每处理一个文件只读取一次快照，因此规则更新是原子的，无需停止监视器。
+    """
+    __slots__ = ('version', 'rule_index', 'root_rule_indexes', 'watch_roots', 'target_prefixes', 'shard_policies',
+                 'target_folders')
+
+    def __init__(self, version, rule_index, root_rule_indexes, watch_roots, target_prefixes, shard_policies=None,
+                 target_folders=()):
+        self.version = version
+        self.rule_index = rule_index
+        self.root_rule_indexes = MappingProxyType(dict(root_rule_indexes))
+        self.watch_roots = tuple(watch_roots)
+        self.target_prefixes = tuple(target_prefixes)
+        self.shard_policies = MappingProxyType(dict(shard_policies or {}))
+        self.target_folders = tuple(target_folders)
+
+    def get_rule_index(self, root=None):
+        """获取文件所在监听文件夹对应的查找表，root 为None时返回全局查找表"""
+        if root is not None:
+            return self.root_rule_indexes.get(root.key, self.rule_index)
+        return self.rule_index
+
+    def get_shard_policy(self, target_folder):
+        """获取目标文件夹的分片方式，没有设置分片时返回None"""
+        return self.shard_policies.get(target_folder)
+
+    def is_in_target_folder(self, file_path):
+        """判断文件（或文件夹）是否位于某个分类目标文件夹中"""
+        return (os.path.normcase(os.path.abspath(file_path)) + os.sep).startswith(self.target_prefixes)
@@ -171,7 +171,7 @@ class SettingsDialog(QDialog):
             self.config['auto_start'] = is_in_startup()
         
         # 保存配置
-        if self.config_manager.save_config(self.config):
+        if self.config_manager.save_config(self.config, immediate=True):
             super().accept()
         else:
             QMessageBox.critical(self, f'{APP_NAME} - 错误', '保存配置失败！')
@@ -524,7 +524,7 @@ class RuleSettingsDialog(QDialog):
     def accept(self):
         # 保存规则
         self.config['rules'] = self.rules
-        if self.config_manager.save_config(self.config):
+        if self.config_manager.save_config(self.config, immediate=True):
             super().accept()
         else:
             QMessageBox.critical(self, f'{APP_NAME} - 错误', '保存配置失败！')
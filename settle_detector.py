@@ -0,0 +1,205 @@
+import os
+import heapq
+import threading
+import time
+
+from logger import logger  # 导入日志模块
+from metrics import metrics
+from constants import (SETTLE_MIN_INTERVAL, SETTLE_MAX_INTERVAL, SETTLE_STABLE_CHECKS, SETTLE_QUIET_PERIOD,
+                       SETTLE_MAX_WAIT)
+
+
+class _PendingFile:
+    """等待写入完成的文件状态"""
+    __slots__ = ('path', 'first_seen', 'interval', 'last_size', 'last_mtime', 'stable_count', 'changed', 'due')
+
+    def __init__(self, path, now):
+        self.path = path
+        self.first_seen = now
+        self.interval = SETTLE_MIN_INTERVAL
+        self.last_size = None
+        self.last_mtime = None
+        self.stable_count = 0
+        self.changed = now  # 最后一次观察到文件变化的时间
+        self.due = now + SETTLE_MIN_INTERVAL
+
+
+def is_exclusively_openable(file_path):
+    """检查文件是否可以被独占打开
+
+    Windows 下正在被其他进程写入的文件通常无法以读写方式打开；
+    其他系统没有强制锁，直接返回 True。
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        bool: 文件当前是否可以被打开
+    """
+    if os.name != 'nt':
+        return True
+    try:
+        fd = os.open(file_path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+    except OSError:
+        return False
+    os.close(fd)
+    return True
+
+
+class SettleDetector:
+    """文件写入完成检测器
+
+    事件线程只负责登记文件路径，由后台线程按最小堆中的到期时间轮询文件的大小和修改时间，
+    连续保持不变、距离最后一次变化超过 SETTLE_QUIET_PERIOD（并且可以被独占打开）后才认为文件写入完成，然后调用回调函数。
+    登记时已经写完一段时间的文件（最后一次写入早于静默期）只需再确认一次没有变化，不重新等待静默期。
+    文件仍在写入时检查间隔按指数退避，避免频繁检查大文件。
+    """
+
+    def __init__(self, on_settled):
+        """
+        Args:
+            on_settled: 文件写入完成后的回调函数，参数为文件路径，在检测线程中调用
+        """
+        self.on_settled = on_settled
+        self._pending = {}
+        self._heap = []
+        self._counter = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        logger.debug("文件写入完成检测器已创建")
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='SettleDetector', daemon=True)
+        self._thread.start()
+        logger.debug("文件写入完成检测线程已启动")
+
+    def stop(self):
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._pending.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        logger.debug("文件写入完成检测线程已停止")
+
+    def submit(self, file_path):
+        """登记需要等待写入完成的文件，立即返回
+
+        Args:
+            file_path: 文件路径
+        """
+        now = time.monotonic()
+        with self._condition:
+            pending = self._pending.get(file_path)
+            if pending is not None:
+                # 同一文件再次出现事件，说明仍有写入活动，重新计算稳定次数
+                pending.stable_count = 0
+                pending.changed = now
+                return
+            pending = _PendingFile(file_path, now)
+            self._pending[file_path] = pending
+            self._push(pending)
+            self._condition.notify()
+
+    def pending_count(self):
+        """获取等待写入完成的文件数量"""
+        with self._condition:
+            return len(self._pending)
+
+    def _push(self, pending):
+        self._counter += 1
+        heapq.heappush(self._heap, (pending.due, self._counter, pending))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if self._heap:
+                        timeout = self._heap[0][0] - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        self._condition.wait(timeout)
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+                _, _, pending = heapq.heappop(self._heap)
+
+            settled = self._check(pending)
+
+            with self._condition:
+                if not self._running:
+                    return
+                if settled is None:
+                    # 继续等待，按新的到期时间重新放入堆中
+                    self._push(pending)
+                    continue
+                self._pending.pop(pending.path, None)
+
+            if settled:
+                try:
+                    self.on_settled(pending.path)
+                except Exception as e:
+                    logger.error("处理写入完成的文件 %s 时出错: %s", pending.path, e)
+
+    def _check(self, pending):
+        """检查文件是否写入完成
+
+        Returns:
+            True 表示写入完成，False 表示放弃处理，None 表示需要继续等待
+        """
+        now = time.monotonic()
+        try:
+            stat = os.stat(pending.path)
+        except OSError:
+            logger.debug("文件不再存在，可能是临时文件: %s", pending.path)
+            return False
+
+        if stat.st_size == pending.last_size and stat.st_mtime_ns == pending.last_mtime:
+            pending.stable_count += 1
+        elif pending.last_size is None:
+            pending.last_size = stat.st_size
+            pending.last_mtime = stat.st_mtime_ns
+            # 静默期从文件最后一次写入算起（修改时间和状态变化时间中较晚的一个，复制的文件可能保留原来的修改时间）；
+            # 首次检查时最后一次写入已经早于静默期，说明文件在登记之前就已写完，只需再确认一次没有变化
+            age = max(time.time() - max(stat.st_mtime_ns, stat.st_ctime_ns) / 1e9, 0.0)
+            pending.changed = now - age
+            if age >= SETTLE_QUIET_PERIOD:
+                pending.stable_count = SETTLE_STABLE_CHECKS - 1
+        else:
+            # 文件仍在变化，重新计数并退避
+            pending.interval = min(pending.interval * 2, SETTLE_MAX_INTERVAL)
+            pending.last_size = stat.st_size
+            pending.last_mtime = stat.st_mtime_ns
+            pending.stable_count = 0
+            pending.changed = now
+
+        quiet = now - pending.changed
+        if pending.stable_count >= SETTLE_STABLE_CHECKS and quiet < SETTLE_QUIET_PERIOD:
+            # 检查次数已足够，但文件停止变化的时间还不够长，等到静默期结束时再检查
+            pending.due = now + max(pending.interval, SETTLE_QUIET_PERIOD - quiet)
+            return None
+
+        if pending.stable_count >= SETTLE_STABLE_CHECKS:
+            if is_exclusively_openable(pending.path):
+                logger.debug("文件写入完成: %s, 等待 %.2f 秒", pending.path, now - pending.first_seen)
+                metrics.observe('settle_wait', now - pending.first_seen)
+                return True
+            logger.debug("文件仍被占用: %s", pending.path)
+            pending.interval = min(pending.interval * 2, SETTLE_MAX_INTERVAL)
+
+        if now - pending.first_seen > SETTLE_MAX_WAIT:
+            logger.warning("等待文件写入完成超时，放弃处理: %s", pending.path)
+            return False
+
+        pending.due = now + pending.interval
+        return None
@@ -0,0 +1,323 @@
+import os
+import re
+import time
+import hashlib
+import threading
+
+from logger import logger  # 导入日志模块
+from metrics import metrics
+from dir_cache import known_directories
+from throttle import BatchThrottle
+from name_allocator import MAX_CACHED_FOLDERS
+from constants import (SHARD_DATE_FORMAT, SHARD_HASH_PREFIX_LENGTH, SHARD_MAX_ENTRIES,
+                       SHARD_REBALANCE_MIN_AGE)
+
+# 支持的分片方式
+SHARD_MODES = ('date', 'hash', 'count')
+
+# 预先计算全部子文件夹路径的最大数量（哈希前缀长度不超过 3）
+_PRECOMPUTE_LIMIT = 4096
+# 按日期缓存的子文件夹路径数量上限
+_DATE_CACHE_SIZE = 4096
+# 只与日期有关的 strftime 格式字段，格式中只有这些字段时同一天的文件使用同一个子文件夹
+_DAY_DIRECTIVES = frozenset('aAbBCdDeFgGhjmnuUVwWxyYt%')
+_DIRECTIVE_PATTERN = re.compile(r'%[-#]?(.)')
+
+
+class ShardPolicy:
+    """一个目标文件夹的分片方式
+
+    文件不再直接放入目标文件夹，而是放入其中的子文件夹，避免单个文件夹中的文件过多：
+    - date：按文件修改日期，例如 2024/05
+    - hash：按文件名哈希的十六进制前缀，例如 3f
+    - count：按编号 0001、0002……，每个子文件夹达到 max_entries 个文件后使用下一个，只有通过 commit 记录的移动才计入文件数量
+
+    子文件夹路径在创建时预先计算（哈希前缀）或首次使用后缓存（日期），分类文件时只需一次字典查找。
+    """
+
+    def __init__(self, target_folder, mode, date_format=SHARD_DATE_FORMAT,
+                 prefix_length=SHARD_HASH_PREFIX_LENGTH, max_entries=SHARD_MAX_ENTRIES):
+        """
+        Args:
+            target_folder: 规则的目标文件夹
+            mode: 分片方式，date、hash 或 count
+            date_format: 按日期分片时子文件夹的格式（time.strftime 格式，用 / 分隔多级文件夹）
+            prefix_length: 按哈希分片时使用的十六进制前缀长度
+            max_entries: 按数量分片时每个子文件夹最多存放的文件数量
+        """
+        if mode not in SHARD_MODES:
+            raise ValueError(f'未知的分片方式: {mode}')
+        self.target_folder = target_folder
+        self.mode = mode
+        self.date_format = date_format
+        self.prefix_length = min(max(int(prefix_length), 1), 8)
+        self.max_entries = max(int(max_entries), 1)
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._current = None  # 按数量分片时当前子文件夹的 [编号, 文件数量]
+        # 格式中有小时、分钟等字段时不能按日期缓存，改为按格式化后的字符串缓存
+        self._by_day = all(directive in _DAY_DIRECTIVES for directive in _DIRECTIVE_PATTERN.findall(date_format))
+
+        if mode == 'hash' and 16 ** self.prefix_length <= _PRECOMPUTE_LIMIT:
+            for i in range(16 ** self.prefix_length):
+                prefix = format(i, f'0{self.prefix_length}x')
+                self._paths[prefix] = os.path.join(target_folder, prefix)
+
+    @classmethod
+    def from_rule(cls, rule, target_folder):
+        """根据规则中的 shard 设置创建分片方式
+
+        Args:
+            rule: 分类规则，shard 为 {"mode": "date", "format": "%Y/%m"}、
+                {"mode": "hash", "prefix_length": 2} 或 {"mode": "count", "max_entries": 10000}
+            target_folder: 规则解析后的目标文件夹
+
+        Returns:
+            ShardPolicy: 分片方式，规则没有设置分片或设置无效时返回None
+        """
+        shard = rule.get('shard')
+        if not shard or not target_folder:
+            return None
+        if isinstance(shard, str):
+            shard = {'mode': shard}
+        try:
+            return cls(target_folder, shard.get('mode'),
+                       shard.get('format') or SHARD_DATE_FORMAT,
+                       shard.get('prefix_length', SHARD_HASH_PREFIX_LENGTH),
+                       shard.get('max_entries', SHARD_MAX_ENTRIES))
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.error("规则 %s 的分片设置无效，已忽略: %s", rule.get('category', ''), e)
+            return None
+
+    @property
+    def key(self):
+        """用于判断分片设置是否变化"""
+        return (os.path.normcase(self.target_folder), self.mode, self.date_format, self.prefix_length,
+                self.max_entries)
+
+    @property
+    def bucket_count(self):
+        """同时接收新文件的子文件夹数量（按日期和数量分片时只有当前子文件夹），用于确定文件名索引的缓存大小"""
+        if self.mode == 'hash':
+            return min(16 ** self.prefix_length, _PRECOMPUTE_LIMIT)
+        return 1
+
+    @property
+    def needs_mtime(self):
+        """是否需要文件的修改时间"""
+        return self.mode == 'date'
+
+    def copy(self):
+        """创建分片设置相同的新分片方式，按数量分片时重新扫描当前子文件夹，不共用已记录的文件数量"""
+        return ShardPolicy(self.target_folder, self.mode, self.date_format, self.prefix_length, self.max_entries)
+
+    def folder_for(self, file_name, mtime=None):
+        """获取文件应放入的子文件夹
+
+        按数量分片时不计入文件数量，文件移动完成后需要调用 commit，跳过或移动失败的文件不占用子文件夹的容量。
+
+        Args:
+            file_name: 文件名
+            mtime: 文件的修改时间，按日期分片时使用，为None时使用当前时间
+
+        Returns:
+            str: 子文件夹路径
+        """
+        if self.mode == 'hash':
+            prefix = hashlib.blake2b(file_name.lower().encode('utf-8', 'surrogatepass'),
+                                     digest_size=8).hexdigest()[:self.prefix_length]
+            path = self._paths.get(prefix)
+            if path is None:
+                path = self._paths.setdefault(prefix, os.path.join(self.target_folder, prefix))
+            return path
+
+        if self.mode == 'date':
+            local = time.localtime(time.time() if mtime is None else mtime)
+            key = local[:3] if self._by_day else time.strftime(self.date_format, local)
+            path = self._paths.get(key)
+            if path is None:
+                if len(self._paths) >= _DATE_CACHE_SIZE:
+                    self._paths.clear()
+                formatted = time.strftime(self.date_format, local) if self._by_day else key
+                parts = [part for part in formatted.split('/') if part]
+                path = self._paths.setdefault(key, os.path.join(self.target_folder, *parts))
+            return path
+
+        with self._lock:
+            if self._current is None:
+                self._current = self._find_current()
+            if self._current[1] >= self.max_entries:
+                self._current = [self._current[0] + 1, 0]
+            index = self._current[0]
+        path = self._paths.get(index)
+        if path is None:
+            path = self._paths.setdefault(index, os.path.join(self.target_folder, f'{index:04d}'))
+        return path
+
+    def commit(self, folder):
+        """记录一个文件已放入 folder_for 返回的子文件夹，按数量分片时计入当前子文件夹的文件数量
+
+        Args:
+            folder: folder_for 返回的子文件夹路径
+        """
+        if self.mode != 'count':
+            return
+        with self._lock:
+            if self._current is not None and self._paths.get(self._current[0]) == folder:
+                self._current[1] += 1
+
+    def _find_current(self):
+        """找到编号最大的子文件夹并统计其中的文件数量（只在首次使用时扫描一次）"""
+        index = 1
+        try:
+            with os.scandir(self.target_folder) as entries:
+                for entry in entries:
+                    if entry.name.isdigit() and entry.is_dir(follow_symlinks=False):
+                        index = max(index, int(entry.name))
+        except OSError:
+            return [index, 0]
+        try:
+            with os.scandir(os.path.join(self.target_folder, f'{index:04d}')) as entries:
+                count = sum(1 for _ in entries)
+        except OSError:
+            count = 0
+        return [index, count]
+
+
+def name_cache_size(policies):
+    """文件名分配器需要缓存的目标文件夹数量：常规的目标文件夹加上全部分片子文件夹
+
+    Args:
+        policies: ShardPolicy 列表
+
+    Returns:
+        int: 最多缓存的目标文件夹数量
+    """
+    return MAX_CACHED_FOLDERS + sum(policy.bucket_count for policy in policies)
+
+
+class ShardRebalancer:
+    """把设置分片之前直接存放在目标文件夹中的文件移动到对应的子文件夹
+
+    在后台线程中用 os.scandir 流式遍历目标文件夹，文件按批次移动，每批之间按速率限制休眠，
+    分类管道繁忙时暂停，不影响新文件的分类。移动后更新分类记录中的文件位置（撤销仍然有效）和重复文件索引。
+    """
+
+    def __init__(self, policies, name_allocator, move_engine, journal, duplicate_index, batch_size, files_per_second,
+                 is_busy=None):
+        """
+        Args:
+            policies: 要整理的目标文件夹的分片方式（ShardPolicy 列表）
+            name_allocator: 目标文件名分配器，与分类管道共用
+            move_engine: 移动文件使用的 MoveEngine
+            journal: 分类记录（ClassificationJournal），为None时不更新记录
+            duplicate_index: 重复文件索引（DuplicateIndex），为None时不更新索引
+            batch_size: 每批移动的文件数量
+            files_per_second: 每秒最多移动的文件数量，0 表示不限速
+            is_busy: 判断分类管道是否繁忙的函数，繁忙时暂停移动
+        """
+        self.policies = list(policies)
+        self.name_allocator = name_allocator
+        self.move_engine = move_engine
+        self.journal = journal
+        self.duplicate_index = duplicate_index
+        self.batch_size = max(1, int(batch_size))
+        self.files_per_second = max(0, float(files_per_second))
+        self.is_busy = is_busy
+        self.moved = 0
+        self.failed = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='ShardRebalancer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """中断整理并等待整理线程退出，已移动的文件不会移回"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        start_time = time.monotonic()
+        for policy in self.policies:
+            if self._stop_event.is_set():
+                break
+            try:
+                self._rebalance(policy)
+            except Exception as e:
+                logger.error("整理目标文件夹 %s 时出错: %s", policy.target_folder, e)
+
+        if self._stop_event.is_set():
+            logger.info("目标文件夹分片整理被中断，已移动 %s 个文件", self.moved)
+        elif self.moved or self.failed:
+            logger.info("目标文件夹分片整理完成，移动 %s 个文件，失败 %s 个，耗时 %.1f 秒",
+                        self.moved, self.failed, time.monotonic() - start_time)
+
+    def _rebalance(self, policy):
+        """整理一个目标文件夹中直接存放的文件"""
+        try:
+            entries = os.scandir(policy.target_folder)
+        except OSError:
+            return
+        batch = []
+        throttle = BatchThrottle(self.files_per_second, self._stop_event, self.is_busy)
+        with entries:
+            for entry in entries:
+                if self._stop_event.is_set():
+                    return
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    mtime = entry.stat(follow_symlinks=False).st_mtime
+                except OSError:
+                    continue
+                # 刚修改的文件可能是分类管道正在写入的占位文件
+                if time.time() - mtime < SHARD_REBALANCE_MIN_AGE:
+                    continue
+                batch.append((entry.path, entry.name, mtime))
+                if len(batch) >= self.batch_size:
+                    self._move_batch(policy, batch)
+                    throttle.wait(len(batch))
+                    batch = []
+        if batch:
+            self._move_batch(policy, batch)
+        # 文件已移出，目标文件夹本身的文件名索引不再准确
+        self.name_allocator.invalidate(policy.target_folder)
+
+    def _move_batch(self, policy, batch):
+        relocated = []
+        for file_path, file_name, mtime in batch:
+            target_file_path = None
+            try:
+                folder = policy.folder_for(file_name, mtime)
+                known_directories.ensure(folder)
+                target_file_path = self.name_allocator.reserve(folder, file_name)
+                self.move_engine.move(file_path, target_file_path)
+                policy.commit(folder)
+                relocated.append((file_path, target_file_path))
+            except Exception as e:
+                if target_file_path:
+                    self.name_allocator.release(target_file_path)
+                self.failed += 1
+                logger.error("移动文件 %s 到分片文件夹时出错: %s", file_path, e)
+        if relocated:
+            self.moved += len(relocated)
+            metrics.inc('files_rebalanced_total', len(relocated))
+            if self.journal is not None:
+                self.journal.relocate(relocated)
+            if self.duplicate_index is not None:
+                for old_path, new_path in relocated:
+                    self.duplicate_index.discard(old_path)
+                    self.duplicate_index.discard(old_path, policy.target_folder)
+                    self.duplicate_index.add(new_path, policy.target_folder)
+            logger.debug("已将 %s 个文件移动到分片文件夹: %s", len(relocated), policy.target_folder)
+
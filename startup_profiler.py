@@ -0,0 +1,41 @@
+import time
+
+
+class StartupProfiler:
+    """记录启动过程中各阶段（导入模块、初始化组件）的耗时
+
+    默认关闭，关闭时 mark 只做一次属性判断。使用 --profile-startup 启动时开启，
+    启动完成后打印各阶段耗时并退出程序。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._phases = []
+        self._last = self._start = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self._phases = []
+        self._last = self._start = time.perf_counter()
+
+    def mark(self, phase):
+        """记录从上一个阶段结束到现在的耗时
+
+        Args:
+            phase: 刚完成的阶段名称
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self):
+        """生成各阶段耗时的文本报告"""
+        lines = [f"{seconds * 1000:8.1f} ms  {phase}" for phase, seconds in self._phases]
+        lines.append(f"{(self._last - self._start) * 1000:8.1f} ms  总计")
+        return '\n'.join(lines)
+
+
+# 创建全局启动耗时记录实例
+profiler = StartupProfiler()
@@ -0,0 +1,48 @@
+import os
+
+from config_manager import ConfigManager
+from batch_classifier import BatchClassifier
+
+
+def _classifier(tmp_path):
+    source = tmp_path / 'src'
+    source.mkdir()
+    out = tmp_path / 'out'
+    config_manager = ConfigManager(str(tmp_path / 'config.json'))
+    config = config_manager.get_config()
+    config.update({
+        'source_folder': str(source),
+        'watch_roots': [],
+        'default_target_folder': str(out / 'other'),
+        'rules': [
+            {'extensions': ['.pdf'], 'target_folder': str(out / 'docs'), 'category': 'docs'},
+            {'extensions': ['.jpg'], 'target_folder': str(out / 'img'), 'category': 'img'},
+        ],
+    })
+    config_manager.save_config(config, immediate=True)
+    config_manager.compile_rules()
+    return BatchClassifier(config_manager, worker_count=2), source, out
+
+
+def test_plan_does_not_create_target_folders(tmp_path):
+    classifier, source, out = _classifier(tmp_path)
+    for name in ('a.pdf', 'b.jpg', 'c.txt'):
+        (source / name).write_bytes(b'x')
+
+    tasks = classifier.plan(classifier.get_root(str(source)))
+
+    assert sorted(os.path.relpath(task.destination, str(out)) for task in tasks) == [
+        os.path.join('docs', 'a.pdf'), os.path.join('img', 'b.jpg'), os.path.join('other', 'txt', 'c.txt')]
+    assert not out.exists()
+
+
+def test_execute_moves_planned_files(tmp_path):
+    classifier, source, out = _classifier(tmp_path)
+    (source / 'a.pdf').write_bytes(b'x')
+    (source / 'a_copy.pdf').write_bytes(b'y')
+
+    report = classifier.execute(classifier.plan(classifier.get_root(str(source))))
+
+    assert (report.files, report.failed) == (2, 0)
+    assert sorted(os.listdir(str(out / 'docs'))) == ['a.pdf', 'a_copy.pdf']
+    assert os.listdir(str(source)) == []
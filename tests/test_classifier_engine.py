@@ -0,0 +1,48 @@
+import os
+
+from config_manager import ConfigManager
+from classifier_engine import ClassifierEngine
+
+
+def _engine(tmp_path, **options):
+    source = tmp_path / 'src'
+    source.mkdir()
+    config_manager = ConfigManager(str(tmp_path / 'config.json'))
+    config = config_manager.get_config()
+    config.update({
+        'source_folder': str(source),
+        'watch_roots': [{'path': str(source)}],
+        'default_target_folder': str(tmp_path / 'other'),
+        'scan_existing_files': False,
+        'shard_rebalance': False,
+        'rules': [{'extensions': ['.pdf'], 'target_folder': str(tmp_path / 'docs'), 'category': '文档'}],
+    })
+    config.update(options)
+    config_manager.save_config(config, immediate=True)
+    config_manager.compile_rules()
+    return ClassifierEngine(config_manager), source
+
+
+def test_sniffed_file_is_journaled_under_rule_category(tmp_path):
+    engine, source = _engine(tmp_path, content_sniffing=True)
+    path = source / 'invoice'
+    path.write_bytes(b'%PDF-1.7\n' + b'x' * 64)
+
+    engine.process_new_file(str(path))
+    engine.journal.close()
+
+    assert os.listdir(str(tmp_path / 'docs')) == ['invoice']
+    [entry] = engine.journal.query()
+    assert entry.category == '文档'
+
+
+def test_queued_category_is_journaled(tmp_path):
+    engine, source = _engine(tmp_path)
+    path = source / 'a.pdf'
+    path.write_bytes(b'x')
+
+    engine.process_new_file(str(path), str(tmp_path / 'docs'), '文档')
+    engine.journal.close()
+
+    [entry] = engine.journal.query()
+    assert (entry.category, entry.destination) == ('文档', str(tmp_path / 'docs' / 'a.pdf'))
@@ -0,0 +1,41 @@
+import os
+
+from journal import ClassificationJournal
+
+
+def _move(journal, source_folder, target_folder, name):
+    destination = target_folder / name
+    destination.write_bytes(name.encode())
+    journal.record(str(source_folder / name), str(destination), 'docs', len(name))
+
+
+def test_undo_last_skips_deleted_duplicates(tmp_path):
+    source = tmp_path / 'src'
+    target = tmp_path / 'docs'
+    source.mkdir()
+    target.mkdir()
+    journal = ClassificationJournal(str(tmp_path / 'journal.db'))
+    _move(journal, source, target, 'a.pdf')
+    _move(journal, source, target, 'b.pdf')
+    journal.record(str(source / 'dup.pdf'), str(target / 'a.pdf'), 'docs', 5, action='delete')
+    journal.record(str(source / 'dup2.pdf'), str(target / 'b.pdf'), 'docs', 5, action='delete')
+
+    assert journal.undo(last=2) == (2, 0)
+    assert sorted(os.listdir(str(source))) == ['a.pdf', 'b.pdf']
+    assert os.listdir(str(target)) == []
+    # 已撤销的记录不会再次撤销
+    assert journal.undo(last=2) == (0, 0)
+
+
+def test_undo_keeps_existing_file_at_source(tmp_path):
+    source = tmp_path / 'src'
+    target = tmp_path / 'docs'
+    source.mkdir()
+    target.mkdir()
+    journal = ClassificationJournal(str(tmp_path / 'journal.db'))
+    _move(journal, source, target, 'a.pdf')
+    (source / 'a.pdf').write_bytes(b'new download')
+
+    assert journal.undo() == (1, 0)
+    assert (source / 'a.pdf').read_bytes() == b'new download'
+    assert (source / 'a_1.pdf').read_bytes() == b'a.pdf'
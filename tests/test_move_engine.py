@@ -0,0 +1,100 @@
+import errno
+import os
+import time
+
+import pytest
+
+from move_engine import MoveEngine
+
+
+def _cross_device(engine):
+    engine.is_same_device = lambda source_folder, target_folder: False
+    return engine
+
+
+def _files(tmp_path, content=b'0123456789' * 1000):
+    source = tmp_path / 'src'
+    target = tmp_path / 'dst'
+    source.mkdir()
+    target.mkdir()
+    path = source / 'a.bin'
+    path.write_bytes(content)
+    return path, target
+
+
+def test_rename_falls_back_to_copy_on_exdev(tmp_path, monkeypatch):
+    path, target = _files(tmp_path)
+    real_replace = os.replace
+
+    def replace(source, destination):
+        if source == str(path):
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+        return real_replace(source, destination)
+
+    monkeypatch.setattr(os, 'replace', replace)
+    result = MoveEngine().move(str(path), str(target / 'a.bin'))
+
+    assert not result.same_device
+    assert not path.exists()
+    assert (target / 'a.bin').read_bytes() == b'0123456789' * 1000
+
+
+def test_other_rename_errors_keep_the_source(tmp_path, monkeypatch):
+    path, target = _files(tmp_path)
+
+    def replace(source, destination):
+        raise PermissionError(errno.EACCES, 'in use')
+
+    monkeypatch.setattr(os, 'replace', replace)
+    with pytest.raises(PermissionError):
+        MoveEngine().move(str(path), str(target / 'a.bin'))
+    assert path.exists()
+    assert os.listdir(str(target)) == []
+
+
+def test_copy_is_removed_when_source_cannot_be_deleted(tmp_path, monkeypatch):
+    path, target = _files(tmp_path)
+    real_remove = os.remove
+
+    def remove(file_path):
+        if file_path == str(path):
+            raise PermissionError(errno.EACCES, 'in use')
+        return real_remove(file_path)
+
+    monkeypatch.setattr(os, 'remove', remove)
+    with pytest.raises(PermissionError):
+        _cross_device(MoveEngine()).move(str(path), str(target / 'a.bin'))
+    assert path.exists()
+    assert os.listdir(str(target)) == []
+
+
+def test_interrupted_copy_resumes_under_a_new_target_name(tmp_path):
+    content = bytes(range(256)) * 400
+    path, target = _files(tmp_path, content)
+    # 上次运行分配了 a.bin 并复制了一半后崩溃，留下空占位文件和临时文件
+    crashed = MoveEngine()
+    partial_path, _ = crashed._partial_path(str(path), str(target / 'a.bin'), os.stat(str(path)))
+    (target / 'a.bin').write_bytes(b'')
+    with open(partial_path, 'wb') as f:
+        f.write(content[:len(content) // 2])
+
+    engine = _cross_device(MoveEngine())
+    assert engine.recover_partials([str(target)]) == 1
+    assert not (target / 'a.bin').exists()
+    result = engine.move(str(path), str(target / 'a_1.bin'))
+
+    assert result.resumed_bytes == len(content) // 2
+    assert (target / 'a_1.bin').read_bytes() == content
+    assert os.listdir(str(target)) == ['a_1.bin']
+
+
+def test_stale_partials_are_removed(tmp_path):
+    target = tmp_path / 'dst'
+    (target / '2024').mkdir(parents=True)
+    stale = target / '2024' / 'old.zip.0badc0de.fcpart'
+    stale.write_bytes(b'x')
+    old = time.time() - 30 * 24 * 3600
+    os.utime(str(stale), (old, old))
+
+    assert MoveEngine().recover_partials([str(target)]) == 1
+    assert not stale.exists()
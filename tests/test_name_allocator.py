@@ -0,0 +1,71 @@
+import os
+import threading
+
+from name_allocator import TargetNameAllocator
+
+
+def test_reserve_creates_placeholder_and_numbers_collisions(tmp_path):
+    (tmp_path / 'a.txt').write_bytes(b'existing')
+    (tmp_path / 'a_3.txt').write_bytes(b'existing')
+    allocator = TargetNameAllocator()
+
+    first = allocator.reserve(str(tmp_path), 'b.txt')
+    assert first == os.path.join(str(tmp_path), 'b.txt')
+    assert os.path.getsize(first) == 0
+    # 已使用的最大序号之后继续编号，不逐个探测
+    assert allocator.reserve(str(tmp_path), 'a.txt') == os.path.join(str(tmp_path), 'a_4.txt')
+    assert allocator.reserve(str(tmp_path), 'b.txt') == os.path.join(str(tmp_path), 'b_1.txt')
+
+
+def test_reserve_does_not_overwrite_file_created_after_scan(tmp_path):
+    allocator = TargetNameAllocator()
+    allocator.reserve(str(tmp_path), 'other.txt')
+    # 索引建立之后由其他程序创建的文件
+    (tmp_path / 'c.txt').write_bytes(b'external')
+
+    path = allocator.reserve(str(tmp_path), 'c.txt')
+    assert path == os.path.join(str(tmp_path), 'c_1.txt')
+    assert (tmp_path / 'c.txt').read_bytes() == b'external'
+
+
+def test_release_removes_only_empty_placeholder(tmp_path):
+    allocator = TargetNameAllocator()
+    path = allocator.reserve(str(tmp_path), 'd.txt')
+    allocator.release(path)
+    assert not os.path.exists(path)
+    # 释放后原文件名可以再次使用
+    assert allocator.reserve(str(tmp_path), 'd.txt') == path
+
+    with open(path, 'wb') as f:
+        f.write(b'moved')
+    allocator.release(path)
+    assert os.path.exists(path)
+
+
+def test_plan_without_placeholders_and_invalidate(tmp_path):
+    allocator = TargetNameAllocator()
+    assert allocator.reserve(str(tmp_path), 'e.txt', create=False) == os.path.join(str(tmp_path), 'e.txt')
+    assert allocator.reserve(str(tmp_path), 'e.txt', create=False) == os.path.join(str(tmp_path), 'e_1.txt')
+    assert os.listdir(str(tmp_path)) == []
+
+    allocator.invalidate(str(tmp_path))
+    assert allocator.reserve(str(tmp_path), 'e.txt', create=False) == os.path.join(str(tmp_path), 'e.txt')
+
+
+def test_concurrent_reserve_returns_unique_names(tmp_path):
+    allocator = TargetNameAllocator()
+    results = []
+
+    def worker():
+        for _ in range(20):
+            results.append(allocator.reserve(str(tmp_path), 'f.txt'))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 80
+    assert len(set(results)) == 80
+    assert len(os.listdir(str(tmp_path))) == 80
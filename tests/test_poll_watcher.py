@@ -0,0 +1,55 @@
+import os
+
+from poll_watcher import PollingObserver
+from watch_roots import WatchRoot
+
+
+class _Handler:
+    def __init__(self, path):
+        self.root = WatchRoot(path)
+        self.events = []
+
+    def dispatch(self, event):
+        self.events.append((type(event).__name__, os.path.basename(getattr(event, 'dest_path', '') or event.src_path)))
+
+
+def _watch(tmp_path):
+    root = tmp_path / 'share'
+    root.mkdir()
+    (root / 'old.txt').write_bytes(b'x')
+    handler = _Handler(str(root))
+    observer = PollingObserver()
+    watch = observer.schedule(handler)
+    assert observer._poll(watch) is False
+    return observer, watch, handler, root
+
+
+def test_new_and_renamed_files_are_dispatched(tmp_path):
+    observer, watch, handler, root = _watch(tmp_path)
+    (root / 'a.crdownload').write_bytes(b'x')
+    observer._poll(watch)
+    os.rename(str(root / 'a.crdownload'), str(root / 'a.zip'))
+    observer._poll(watch)
+    assert handler.events == [('FileCreatedEvent', 'a.crdownload'), ('FileMovedEvent', 'a.zip')]
+
+
+def test_root_is_watched_again_after_it_comes_back(tmp_path):
+    observer, watch, handler, root = _watch(tmp_path)
+    offline = tmp_path / 'offline'
+    os.rename(str(root), str(offline))
+
+    assert observer._poll(watch) is True
+    assert watch.dirs == {} and not watch.initialized
+    # 共享仍不可访问时继续重试，不产生事件
+    assert observer._poll(watch) is False
+
+    os.rename(str(offline), str(root))
+    (root / 'during_outage.pdf').write_bytes(b'x')
+    assert observer._poll(watch) is True
+    assert watch.initialized and str(root) in watch.dirs
+    assert ('FileCreatedEvent', 'during_outage.pdf') in handler.events
+
+    handler.events.clear()
+    (root / 'after.pdf').write_bytes(b'x')
+    observer._poll(watch)
+    assert handler.events == [('FileCreatedEvent', 'after.pdf')]
@@ -0,0 +1,36 @@
+import os
+
+from rule_index import RuleIndex
+
+
+def _match(index, file_name):
+    _, file_extension = os.path.splitext(file_name)
+    return index.match(os.path.join('/downloads', file_name), file_extension.lower())
+
+
+def test_regex_with_backreference_matches():
+    index = RuleIndex([
+        {'regex': r'(\d)\1', 'target_folder': '/t/pairs', 'category': 'pairs'},
+        {'extensions': ['.bin'], 'target_folder': '/t/bin', 'category': 'bin'},
+    ])
+    assert _match(index, 'x11y.bin') == ('/t/pairs', 'pairs')
+    assert _match(index, 'x12y.bin') == ('/t/bin', 'bin')
+
+
+def test_standalone_regex_keeps_rule_order():
+    index = RuleIndex([
+        {'patterns': ['report*'], 'target_folder': '/t/reports', 'category': 'reports'},
+        {'regex': r'(?P<d>\d)(?P=d)', 'target_folder': '/t/pairs', 'category': 'pairs'},
+        {'regex': r'^scan', 'target_folder': '/t/scans', 'category': 'scans'},
+    ])
+    assert _match(index, 'report_11.pdf') == ('/t/reports', 'reports')
+    assert _match(index, 'scan_11.pdf') == ('/t/pairs', 'pairs')
+    assert _match(index, 'scan_12.pdf') == ('/t/scans', 'scans')
+
+
+def test_conditional_group_regex_matches():
+    index = RuleIndex([
+        {'regex': r'^(<)?\w+(?(1)>)$', 'target_folder': '/t/tags', 'category': 'tags'},
+    ], '/t/default')
+    assert _match(index, '<abc>') == ('/t/tags', 'tags')
+    assert _match(index, '<abc') == (os.path.join('/t/default', 'other'), 'other')
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import settle_detector
+from settle_detector import SettleDetector
+
+
+def _detector(monkeypatch):
+    monkeypatch.setattr(settle_detector, 'SETTLE_QUIET_PERIOD', 0.4)
+    settled = {}
+    done = threading.Event()
+
+    def on_settled(path):
+        settled[path] = time.monotonic()
+        done.set()
+
+    detector = SettleDetector(on_settled)
+    detector.start()
+    return detector, settled, done
+
+
+def test_file_written_before_submit_is_released_quickly(tmp_path, monkeypatch):
+    detector, settled, done = _detector(monkeypatch)
+    path = tmp_path / 'done.pdf'
+    path.write_bytes(b'x' * 100)
+    time.sleep(0.5)
+    try:
+        submitted = time.monotonic()
+        detector.submit(str(path))
+        assert done.wait(2)
+        # 两次检查（约 0.2 秒），不再等待完整的静默期
+        assert settled[str(path)] - submitted < 0.4
+    finally:
+        detector.stop()
+
+
+def test_fresh_file_waits_for_quiet_period(tmp_path, monkeypatch):
+    detector, settled, done = _detector(monkeypatch)
+    path = tmp_path / 'new.pdf'
+    path.write_bytes(b'x' * 100)
+    try:
+        submitted = time.monotonic()
+        detector.submit(str(path))
+        assert done.wait(2)
+        assert settled[str(path)] - submitted >= 0.3
+    finally:
+        detector.stop()
+
+
+def test_growing_file_is_not_released(tmp_path, monkeypatch):
+    detector, settled, done = _detector(monkeypatch)
+    path = tmp_path / 'download.zip'
+    path.write_bytes(b'x')
+    try:
+        detector.submit(str(path))
+        with open(str(path), 'ab') as f:
+            for _ in range(8):
+                f.write(b'x' * 1024)
+                f.flush()
+                time.sleep(0.1)
+        assert not settled
+        assert done.wait(2)
+        assert path.stat().st_size == 1 + 8 * 1024
+    finally:
+        detector.stop()
@@ -0,0 +1,124 @@
+import os
+import time
+
+from config_manager import ConfigManager
+from classifier_engine import ClassifierEngine, EngineListener
+from notification_handler import NotificationHandler
+from name_allocator import TargetNameAllocator
+from dedup_index import DuplicateIndex
+from move_engine import MoveEngine
+from sharding import ShardPolicy, ShardRebalancer, name_cache_size
+
+
+class _Recorder(EngineListener):
+    def __init__(self):
+        self.files = []
+
+    def file_classified(self, file_path, target_folder):
+        self.files.append((file_path, target_folder))
+
+
+def _engine(tmp_path, shard, **options):
+    source = tmp_path / 'src'
+    source.mkdir()
+    images = tmp_path / 'Images'
+    config_manager = ConfigManager(str(tmp_path / 'config.json'))
+    config = config_manager.get_config()
+    config.update({
+        'source_folder': str(source),
+        'watch_roots': [{'path': str(source)}],
+        'default_target_folder': '',
+        'scan_existing_files': False,
+        'shard_rebalance': False,
+        'rules': [{'extensions': ['.jpg'], 'target_folder': str(images), 'category': 'Images', 'shard': shard}],
+    })
+    config.update(options)
+    config_manager.save_config(config, immediate=True)
+    config_manager.compile_rules()
+    return ClassifierEngine(config_manager), source, images
+
+
+def test_summary_names_rule_folder_for_sharded_rule(tmp_path):
+    engine, source, images = _engine(tmp_path, {'mode': 'date', 'format': '%Y/%m'})
+    recorder = _Recorder()
+    engine.add_listener(recorder)
+    for name in ('a.jpg', 'b.jpg'):
+        path = source / name
+        path.write_bytes(b'x')
+        engine.process_new_file(str(path))
+    engine.journal.close()
+
+    assert len(recorder.files) == 2
+    assert all(folder == str(images) for _, folder in recorder.files)
+    assert all(os.path.dirname(path) != str(images) for path, _ in recorder.files)
+
+    handler = NotificationHandler()
+    notification_id = handler.store_classified_files(recorder.files)
+    assert handler.format_summary(notification_id) == '2 个文件 → Images'
+
+
+def test_date_shard_with_hour_field_is_not_cached_per_day(tmp_path):
+    policy = ShardPolicy(str(tmp_path), 'date', '%Y%m%d/%H')
+    morning = time.mktime((2024, 5, 1, 8, 30, 0, 0, 0, -1))
+    evening = time.mktime((2024, 5, 1, 20, 30, 0, 0, 0, -1))
+    assert policy.folder_for('a.jpg', morning) == os.path.join(str(tmp_path), '20240501', '08')
+    assert policy.folder_for('b.jpg', evening) == os.path.join(str(tmp_path), '20240501', '20')
+
+
+def test_name_cache_holds_every_hash_bucket(tmp_path):
+    policy = ShardPolicy(str(tmp_path), 'hash', prefix_length=2)
+    allocator = TargetNameAllocator(name_cache_size([policy]))
+    folders = {policy.folder_for(f'file{i}.jpg') for i in range(4000)}
+    assert len(folders) == 256
+    for folder in folders:
+        allocator.reserve(folder, 'a.jpg', create=False)
+    # 所有子文件夹的索引都仍在缓存中，再次分配同名文件时添加序号
+    for folder in folders:
+        assert allocator.reserve(folder, 'a.jpg', create=False) == os.path.join(folder, 'a_1.jpg')
+
+
+def test_count_shard_counts_only_committed_moves(tmp_path):
+    policy = ShardPolicy(str(tmp_path), 'count', max_entries=2)
+    first = os.path.join(str(tmp_path), '0001')
+    # 跳过或移动失败的文件不调用 commit，不占用子文件夹的容量
+    for i in range(5):
+        assert policy.folder_for(f'skipped{i}.txt') == first
+    policy.commit(policy.folder_for('a.txt'))
+    policy.commit(policy.folder_for('b.txt'))
+    assert policy.folder_for('c.txt') == os.path.join(str(tmp_path), '0002')
+
+
+def test_duplicate_in_another_shard_is_detected(tmp_path):
+    engine, source, images = _engine(tmp_path, {'mode': 'hash', 'prefix_length': 2}, duplicate_action='skip')
+    policy = engine.config_manager.get_snapshot().get_shard_policy(str(images))
+    # 两个文件名被分到不同的分片子文件夹
+    assert policy.folder_for('setup.jpg') != policy.folder_for('setup (1).jpg')
+    (source / 'setup.jpg').write_bytes(b'same content')
+    engine.process_new_file(str(source / 'setup.jpg'))
+    (source / 'setup (1).jpg').write_bytes(b'same content')
+    engine.process_new_file(str(source / 'setup (1).jpg'))
+    engine.journal.close()
+
+    assert os.listdir(str(source)) == ['setup (1).jpg']
+
+
+def test_rebalancer_moves_duplicate_index_entries(tmp_path):
+    images = tmp_path / 'Images'
+    images.mkdir()
+    flat = images / 'photo.jpg'
+    flat.write_bytes(b'photo')
+    old = time.time() - 3600
+    os.utime(str(flat), (old, old))
+    index = DuplicateIndex()
+    new_file = tmp_path / 'photo (1).jpg'
+    new_file.write_bytes(b'photo')
+    assert index.find_duplicate(str(new_file), str(images), recursive=True) == str(flat)
+
+    policy = ShardPolicy(str(images), 'hash', prefix_length=1)
+    rebalancer = ShardRebalancer([policy], TargetNameAllocator(), MoveEngine(), None, index, 10, 0)
+    rebalancer.start()
+    rebalancer._thread.join(5)
+
+    moved = os.path.join(policy.folder_for('photo.jpg'), 'photo.jpg')
+    assert os.path.exists(moved)
+    assert index.find_duplicate(str(new_file), str(images), recursive=True) == moved
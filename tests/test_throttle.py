@@ -0,0 +1,25 @@
+import threading
+import time
+
+from throttle import BatchThrottle
+
+
+def test_wait_limits_rate_and_returns_on_stop():
+    stop_event = threading.Event()
+    throttle = BatchThrottle(100, stop_event)
+    started = time.monotonic()
+    throttle.wait(20)
+    assert time.monotonic() - started >= 0.19
+
+    stop_event.set()
+    started = time.monotonic()
+    throttle.wait(1000)
+    assert time.monotonic() - started < 0.1
+
+
+def test_wait_pauses_while_busy():
+    stop_event = threading.Event()
+    busy_until = time.monotonic() + 0.3
+    throttle = BatchThrottle(0, stop_event, is_busy=lambda: time.monotonic() < busy_until)
+    throttle.wait(10)
+    assert time.monotonic() >= busy_until
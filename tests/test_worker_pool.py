@@ -0,0 +1,47 @@
+import threading
+
+from worker_pool import ClassificationWorkerPool
+
+
+def _blocked_pool(tmp_path, worker_count, queue_size):
+    release = threading.Event()
+    handled = []
+
+    def handler(file_path, target_folder, category):
+        release.wait(5)
+        handled.append(file_path)
+
+    pool = ClassificationWorkerPool(handler, worker_count, queue_size, str(tmp_path / 'spill.jsonl'))
+    pool.start()
+    return pool, release, handled
+
+
+def test_saturation_uses_capacity_of_all_lanes(tmp_path):
+    pool, release, _ = _blocked_pool(tmp_path, worker_count=4, queue_size=8)
+    try:
+        assert pool.capacity == 32
+        # 同一目标文件夹的任务进入同一通道，队列中至少有 5 个任务，超过单个通道容量的一半，但低于总容量的一半
+        for i in range(6):
+            pool.submit(f'/src/{i}.txt', '/target')
+        assert pool.stats()['spilled'] == 0
+        assert not pool.is_saturated()
+    finally:
+        release.set()
+        pool.stop()
+
+
+def test_overflow_spills_and_refills_in_order(tmp_path):
+    pool, release, handled = _blocked_pool(tmp_path, worker_count=1, queue_size=2)
+    files = [f'/src/{i}.txt' for i in range(6)]
+    for file_path in files:
+        assert pool.submit(file_path, '/target')
+    assert pool.stats()['spilled'] > 0
+    assert pool.is_saturated()
+
+    release.set()
+    for _ in range(100):
+        if len(handled) == len(files):
+            break
+        threading.Event().wait(0.05)
+    pool.stop()
+    assert handled == files
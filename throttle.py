@@ -0,0 +1,35 @@
+import time
+
+
+class BatchThrottle:
+    """后台批量任务的限速器
+
+    后台线程每处理完一批文件调用一次 wait：按每秒最多处理的文件数量休眠，分类管道繁忙时继续等待，
+    stop_event 被设置后立即返回，不影响任务的中断。
+    """
+
+    def __init__(self, files_per_second, stop_event, is_busy=None):
+        """
+        Args:
+            files_per_second: 每秒最多处理的文件数量，0 表示不限速
+            stop_event: 后台任务的停止事件（threading.Event），休眠期间被设置时立即返回
+            is_busy: 判断分类管道是否繁忙的函数，繁忙时暂停
+        """
+        self.files_per_second = max(0, float(files_per_second))
+        self.stop_event = stop_event
+        self.is_busy = is_busy
+        self._batch_start = time.monotonic()
+
+    def wait(self, count):
+        """一批文件处理完成后调用，按速率限制休眠并在分类管道繁忙时等待，下一批从返回时开始计时
+
+        Args:
+            count: 这一批处理的文件数量
+        """
+        if self.files_per_second:
+            delay = count / self.files_per_second - (time.monotonic() - self._batch_start)
+            if delay > 0:
+                self.stop_event.wait(delay)
+        while self.is_busy and self.is_busy() and not self.stop_event.is_set():
+            self.stop_event.wait(0.2)
+        self._batch_start = time.monotonic()
@@ -0,0 +1,478 @@
+import sys
+import os
+from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction, QMessageBox, QStyle
+from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+
+from config_manager import ConfigManager
+from notification_handler import NotificationHandler
+from logger import logger  # 导入日志模块
+from metrics import metrics
+from monitoring_manager import MonitoringManager  # 导入监听管理器
+from startup_profiler import profiler
+
+# 导入软件名称常量
+from constants import APP_NAME
+
+# 设置对话框（settings_dialog）、开机自启动管理（startup_manager）和 subprocess 只在使用时导入，加快启动速度
+
+
+class FileClassifierApp(QObject):
+    file_classified_signal = pyqtSignal(str, str)
+    
+    def __init__(self):
+        super().__init__()
+        logger.info("%s 应用程序启动", APP_NAME)
+        self.app = QApplication(sys.argv)
+        self.app.setQuitOnLastWindowClosed(False)
+        profiler.mark('创建 QApplication')
+        
+        # 初始化配置管理器
+        self.config_manager = ConfigManager()
+        logger.info("配置管理器初始化完成")
+        profiler.mark('加载配置')
+        
+        # 初始化通知处理器
+        self.notification_handler = NotificationHandler()
+        logger.info("通知处理器初始化完成")
+        
+        # 托盘图标创建之前收到的分类结果和扫描进度，创建之后再处理
+        self.tray_icon = None
+        self._pending_events = []
+        
+        # 初始化监听管理器
+        self.monitoring_manager = MonitoringManager(self.config_manager)
+        # 连接监听状态变化信号
+        self.monitoring_manager.monitoring_status_changed.connect(self.on_monitoring_status_changed)
+        # 连接文件分类信号
+        self.monitoring_manager.files_classified_signal.connect(self.on_files_classified)
+        # 连接已有文件扫描进度信号
+        self.monitoring_manager.backlog_progress_signal.connect(self.on_backlog_progress)
+        logger.info("监听管理器初始化完成")
+        
+        profiler.mark('创建监听管理器')
+        
+        # 先恢复上次的监听状态，尽快开始分类文件
+        self.monitoring_manager.restore_monitoring_state()
+        profiler.mark('恢复监听')
+        
+        # 托盘图标和开机自启动检查在事件循环启动后进行
+        QTimer.singleShot(0, self.finish_startup)
+    
+    def finish_startup(self):
+        """事件循环启动后完成初始化：创建托盘图标，同步开机自启动状态"""
+        # 初始化系统托盘图标
+        self.setup_tray_icon()
+        logger.info("系统托盘图标初始化完成")
+        profiler.mark('创建托盘图标')
+        
+        for handler, args in self._pending_events:
+            handler(*args)
+        self._pending_events = []
+        
+        # 检查并同步开机自启动状态
+        self.check_and_sync_auto_start()
+        profiler.mark('同步开机自启动状态')
+        logger.info("应用程序初始化完成")
+        
+        if profiler.enabled:
+            # 启动耗时分析模式：输出各阶段耗时后退出，不修改配置中的监听状态
+            print(profiler.report())
+            self.monitoring_manager.shutdown()
+            self.tray_icon.hide()
+            self.app.quit()
+    
+    def check_and_sync_auto_start(self):
+        """检查并同步开机自启动状态"""
+        logger.info("检查并同步开机自启动状态")
+        from startup_manager import update_startup_status, is_in_startup
+        
+        config = self.config_manager.get_config()
+        auto_start_config = config.get('auto_start', False)
+        auto_start_actual = is_in_startup()
+        
+        logger.debug("配置中的自启动状态: %s, 实际自启动状态: %s", auto_start_config, auto_start_actual)
+        
+        # 如果配置和实际状态不一致
+        if auto_start_config != auto_start_actual:
+            logger.info("配置和实际自启动状态不一致，进行同步")
+            # 如果是配置中设置了自启动但实际没有，尝试添加
+            if auto_start_config:
+                logger.info("尝试添加到开机自启动")
+                update_result = update_startup_status(True)
+                # 如果添加失败，更新配置
+                if not update_result:
+                    logger.warning("添加到开机自启动失败，更新配置")
+                    config['auto_start'] = False
+                    self.config_manager.save_config(config)
+                else:
+                    logger.info("成功添加到开机自启动")
+            else:
+                # 如果配置中没有设置自启动但实际有，更新配置
+                logger.info("配置中未设置自启动但实际已添加，更新配置")
+                config['auto_start'] = auto_start_actual
+                self.config_manager.save_config(config)
+        else:
+            logger.debug("配置和实际自启动状态一致，无需同步")
+    
+    def setup_tray_icon(self):
+        # 创建系统托盘图标
+        self.tray_icon = QSystemTrayIcon(self.app)
+        self.tray_icon.setToolTip(APP_NAME)
+        
+        # 设置图标（使用自定义图标icon.png）
+        icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icon.png')
+        if os.path.exists(icon_path):
+            self.tray_icon.setIcon(QIcon(icon_path))
+        else:
+            # 如果图标文件不存在，使用默认图标
+            self.tray_icon.setIcon(self.app.style().standardIcon(QStyle.SP_FileIcon))
+        
+        # 连接托盘图标的点击事件
+        self.tray_icon.activated.connect(self.on_tray_icon_activated)
+        
+        # 连接通知点击事件
+        self.tray_icon.messageClicked.connect(self.on_notification_clicked)
+        
+        # 当前显示的消息对应的分类通知ID，消息超时或被下一条消息替换时清除
+        self.displayed_notification_id = None
+        self.message_timer = QTimer()
+        self.message_timer.setSingleShot(True)
+        self.message_timer.timeout.connect(self.clear_displayed_notification)
+        
+        # 创建托盘菜单
+        self.tray_menu = QMenu()
+        
+        # 监听控制动作
+        self.toggle_monitoring_action = QAction('开启监听')
+        self.toggle_monitoring_action.triggered.connect(self.toggle_monitoring)
+        self.tray_menu.addAction(self.toggle_monitoring_action)
+        
+        # 添加分隔线
+        self.tray_menu.addSeparator()
+        
+        # 设置动作
+        self.folder_settings_action = QAction('设置')
+        self.folder_settings_action.triggered.connect(self.open_folder_settings)
+        self.tray_menu.addAction(self.folder_settings_action)
+        
+        self.rule_settings_action = QAction('规则设置')
+        self.rule_settings_action.triggered.connect(self.open_rule_settings)
+        self.tray_menu.addAction(self.rule_settings_action)
+        
+        # 添加查看日志选项
+        self.view_log_action = QAction('查看日志')
+        self.view_log_action.triggered.connect(self.open_log_file)
+        self.tray_menu.addAction(self.view_log_action)
+
+        # 添加统计信息选项
+        self.view_stats_action = QAction('统计信息')
+        self.view_stats_action.triggered.connect(self.show_stats)
+        self.tray_menu.addAction(self.view_stats_action)
+        
+        # 分隔线 - 分类文件夹菜单项将在这里添加
+        self.category_separator = self.tray_menu.addSeparator()
+        
+        # 分隔线 - 分隔分类文件夹菜单项和退出菜单项，只创建一次
+        self.exit_separator = self.tray_menu.addSeparator()
+        
+        # 添加退出动作
+        self.exit_action = QAction('退出')
+        self.exit_action.triggered.connect(self.exit_app)
+        self.tray_menu.addAction(self.exit_action)
+        
+        # 目标文件夹 -> 菜单项，按规则顺序排列
+        self.folder_actions = {}
+        
+        # 更新分类文件夹菜单项
+        self.update_category_folders()
+        
+        # 设置托盘菜单
+        self.tray_icon.setContextMenu(self.tray_menu)
+        
+        # 显示托盘图标
+        self.tray_icon.show()
+        
+        # 更新菜单状态
+        self.update_menu_state()
+    
+    def update_category_folders(self):
+        """更新分类文件夹菜单项
+
+        将规则对应的 目标文件夹 -> 分类名称 与当前显示的菜单项比较，只增删或修改发生变化的菜单项。
+        不访问文件系统：目标文件夹由开始监听时的后台线程创建，打开文件夹时也会按需创建。
+        """
+        config = self.config_manager.get_config()
+        rules = config.get('rules', [])
+        default_target_folder = config.get('default_target_folder', '')
+        
+        # 规则对应的目标文件夹（保持规则顺序，同一文件夹只显示第一个分类名称）
+        folders = {}
+        for rule in rules:
+            target_folder = rule.get('target_folder', '')
+            category = rule.get('category', '')
+            
+            # 如果目标文件夹为空，使用默认目标文件夹
+            if not target_folder and default_target_folder:
+                target_folder = os.path.join(default_target_folder, category)
+            
+            if target_folder:
+                folders.setdefault(target_folder, category)
+        
+        # 没有变化时直接返回（切换监听状态时通常如此）
+        if ([(folder, f'{category}文件夹') for folder, category in folders.items()]
+                == [(folder, action.text()) for folder, action in self.folder_actions.items()]):
+            return
+        
+        # 移除不再使用的文件夹菜单项
+        for folder in list(self.folder_actions):
+            if folder not in folders:
+                self.tray_menu.removeAction(self.folder_actions.pop(folder))
+        
+        # 已有菜单项的相对顺序不变并且新增的文件夹都在最后时，只需追加新的菜单项
+        existing = [folder for folder in folders if folder in self.folder_actions]
+        order_changed = existing != list(self.folder_actions) or list(folders)[:len(existing)] != existing
+        folder_actions = {}
+        for target_folder, category in folders.items():
+            folder_action = self.folder_actions.get(target_folder)
+            if folder_action is None:
+                folder_action = QAction(f'{category}文件夹', self.tray_menu)
+                folder_action.triggered.connect(lambda checked, folder=target_folder: self.open_folder(folder))
+                # 插入到退出菜单项前面的分隔线之前
+                self.tray_menu.insertAction(self.exit_separator, folder_action)
+                logger.debug("添加菜单项: %s", folder_action.text())
+            else:
+                if folder_action.text() != f'{category}文件夹':
+                    folder_action.setText(f'{category}文件夹')
+                if order_changed:
+                    # 已在菜单中的菜单项重新插入时会移动到新的位置
+                    self.tray_menu.insertAction(self.exit_separator, folder_action)
+            folder_actions[target_folder] = folder_action
+        self.folder_actions = folder_actions
+    
+    def open_log_file(self):
+        """打开日志文件"""
+        import subprocess
+        from constants import LOG_FILE
+        
+        # 获取应用程序所在目录
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        # 日志目录路径
+        log_dir = os.path.join(app_dir, 'log')
+        # 日志文件完整路径
+        log_file_path = os.path.join(log_dir, LOG_FILE)
+        
+        logger.info("尝试打开日志文件: %s", log_file_path)
+        
+        if not os.path.exists(log_file_path):
+            logger.warning("日志文件不存在: %s", log_file_path)
+            QMessageBox.information(None, f'{APP_NAME} - 提示', '日志文件尚未创建。')
+            return
+        
+        try:
+            # 根据操作系统打开日志文件
+            if os.name == 'nt':  # Windows
+                os.startfile(log_file_path)
+            elif os.name == 'posix':  # macOS 和 Linux
+                if sys.platform == 'darwin':  # macOS
+                    subprocess.run(['open', log_file_path])
+                else:  # Linux
+                    subprocess.run(['xdg-open', log_file_path])
+            logger.debug("成功打开日志文件: %s", log_file_path)
+        except Exception as e:
+            logger.error("打开日志文件失败: %s", e)
+            QMessageBox.warning(None, f'{APP_NAME} - 警告', f'打开日志文件失败: {str(e)}')
+
+    def show_stats(self):
+        """显示分类管道的统计信息"""
+        QMessageBox.information(None, f'{APP_NAME} - 统计信息', metrics.format_summary())
+
+    def open_folder(self, folder_path):
+        """打开指定的文件夹"""
+        import subprocess
+        
+        if not os.path.exists(folder_path):
+            try:
+                os.makedirs(folder_path, exist_ok=True)
+            except Exception as e:
+                print(f"创建文件夹失败: {str(e)}")
+                QMessageBox.warning(None, f'{APP_NAME} - 警告', f'文件夹不存在且无法创建: {folder_path}')
+                return
+        
+        try:
+            # 根据操作系统打开文件夹
+            if os.name == 'nt':  # Windows
+                os.startfile(folder_path)
+            elif os.name == 'posix':  # macOS 和 Linux
+                if sys.platform == 'darwin':  # macOS
+                    subprocess.run(['open', folder_path])
+                else:  # Linux
+                    subprocess.run(['xdg-open', folder_path])
+        except Exception as e:
+            print(f"打开文件夹失败: {str(e)}")
+            QMessageBox.warning(None, f'{APP_NAME} - 警告', f'打开文件夹失败: {str(e)}')
+    
+    def toggle_monitoring(self):
+        """切换监听状态"""
+        # 使用监听管理器切换监听状态
+        self.monitoring_manager.toggle_monitoring()
+    
+    def on_monitoring_status_changed(self, is_monitoring):
+        """监听状态变化的处理函数
+        
+        Args:
+            is_monitoring: 是否正在监听
+        """
+        config = self.config_manager.get_config()
+        
+        # 更新菜单状态
+        if is_monitoring:
+            self.toggle_monitoring_action.setText('关闭监听')
+            self.tray_icon.setToolTip(f'{APP_NAME} (监听中)')
+            
+            # 显示通知
+            if config.get('show_notifications', True):
+                source_folder = config.get('source_folder', '')
+                self.show_message(APP_NAME, f'开始监听文件夹: {source_folder}')
+                logger.debug("显示通知：开始监听文件夹 %s", source_folder)
+        else:
+            self.toggle_monitoring_action.setText('开启监听')
+            self.tray_icon.setToolTip(f'{APP_NAME} (监听已停止)')
+            
+            # 显示通知
+            if config.get('show_notifications', True):
+                self.show_message(APP_NAME, '文件监听已停止')
+                logger.debug("显示通知：文件监听已停止")
+        
+        # 更新菜单状态
+        self.update_menu_state()
+    
+    def update_menu_state(self):
+        config = self.config_manager.get_config()
+        is_monitoring = config.get('is_monitoring', False)
+        
+        if is_monitoring:
+            self.toggle_monitoring_action.setText('关闭监听')
+            self.tray_icon.setToolTip(f'{APP_NAME} (监听中)')
+        else:
+            self.toggle_monitoring_action.setText('开启监听')
+            self.tray_icon.setToolTip(f'{APP_NAME} (监听已停止)')
+        
+        # 更新分类文件夹菜单项
+        self.update_category_folders()
+    
+    def open_folder_settings(self):
+        from settings_dialog import SettingsDialog
+        
+        dialog = SettingsDialog(self.config_manager, self.monitoring_manager)
+        if dialog.exec_():
+            # 获取最新配置
+            config = self.config_manager.get_config()
+            is_monitoring = config.get('is_monitoring', False)
+            
+            # 如果设置已更改，重新设置文件监视器
+            # 使用 silent 参数调用 setup_file_watcher 方法，避免触发通知
+            self.monitoring_manager.setup_file_watcher()
+            
+            # 更新菜单状态，但不触发通知
+            self.update_menu_state()
+    
+    def open_rule_settings(self):
+        from settings_dialog import RuleSettingsDialog
+        
+        dialog = RuleSettingsDialog(self.config_manager)
+        if dialog.exec_():
+            # 如果规则设置已更改，更新分类文件夹菜单
+            self.update_category_folders()
+    
+    def on_files_classified(self, files):
+        """一批文件分类完成的处理函数，合并为一条通知
+        
+        Args:
+            files: (文件路径, 目标文件夹) 列表
+        """
+        if self.tray_icon is None:
+            self._pending_events.append((self.on_files_classified, (files,)))
+            return
+        
+        config = self.config_manager.get_config()
+        if config.get('show_notifications', True):
+            # 存储分类文件信息，用于通知点击事件
+            notification_id = self.notification_handler.store_classified_files(files)
+            
+            self.show_message(
+                f'{APP_NAME} - 文件已分类',
+                self.notification_handler.format_summary(notification_id),
+                notification_id=notification_id
+            )
+    
+    def on_backlog_progress(self, submitted, finished):
+        """已有文件扫描进度的处理函数
+        
+        Args:
+            submitted: 已提交分类的文件数量
+            finished: 扫描是否已结束
+        """
+        if self.tray_icon is None:
+            self._pending_events.append((self.on_backlog_progress, (submitted, finished)))
+            return
+        
+        if not finished:
+            self.tray_icon.setToolTip(f'{APP_NAME} (正在整理已有文件: {submitted})')
+            return
+        
+        self.update_menu_state()
+        config = self.config_manager.get_config()
+        if submitted and config.get('show_notifications', True):
+            self.show_message(APP_NAME, f'已整理监听关闭期间新增的 {submitted} 个文件')
+            logger.debug("显示通知：已有文件扫描完成，共 %s 个文件", submitted)
+    
+    def show_message(self, title, message, msecs=2000, notification_id=None):
+        """显示托盘消息，并记录该消息对应的分类通知ID
+        
+        Args:
+            title: 标题
+            message: 消息内容
+            msecs: 显示时间（毫秒）
+            notification_id: 分类通知ID，其他消息为None
+        """
+        # 新消息会替换正在显示的消息，点击时只处理当前显示的消息
+        self.displayed_notification_id = notification_id
+        self.message_timer.start(msecs)
+        self.tray_icon.showMessage(title, message, QSystemTrayIcon.Information, msecs)
+    
+    def clear_displayed_notification(self):
+        """消息显示超时后清除对应的分类通知ID"""
+        self.displayed_notification_id = None
+    
+    def on_notification_clicked(self):
+        """处理通知点击事件，打开被点击的通知中的目标文件所在文件夹并选中文件"""
+        notification_id = self.displayed_notification_id
+        if notification_id is None:
+            # 点击的不是文件分类通知（例如开始监听的消息）
+            return
+        self.notification_handler.open_folder_and_select_file(notification_id)
+    
+    def on_tray_icon_activated(self, reason):
+        # 当用户点击托盘图标时打开设置文件夹面板
+        # QSystemTrayIcon.Trigger表示单击，QSystemTrayIcon.DoubleClick表示双击
+        from PyQt5.QtWidgets import QSystemTrayIcon
+        if reason == QSystemTrayIcon.Trigger or reason == QSystemTrayIcon.DoubleClick:
+            self.open_folder_settings()
+    
+    def exit_app(self):
+        # 停止文件监视器
+        self.monitoring_manager.stop_monitoring()
+        
+        # 写入尚未保存的配置
+        self.config_manager.flush()
+        
+        # 退出应用
+        self.tray_icon.hide()
+        self.app.quit()
+
+
+def run_tray_app():
+    """启动托盘程序，返回退出码"""
+    app = FileClassifierApp()
+    return app.app.exec_()
\ No newline at end of file
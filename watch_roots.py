@@ -0,0 +1,150 @@
+import os
+import re
+import fnmatch
+
+
+def _compile_globs(patterns):
+    """将多个通配符模式合并编译为一个正则表达式，没有模式时返回None"""
+    patterns = [os.path.normcase(p) for p in patterns or [] if p]
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{fnmatch.translate(p)})' for p in patterns))
+
+
+class WatchRoot:
+    """一个被监听的文件夹及其过滤条件"""
+    __slots__ = ('path', 'recursive', 'max_depth', 'rules', 'default_target_folder', 'polling',
+                 '_include', '_exclude', '_key')
+
+    def __init__(self, path, recursive=False, max_depth=None, include=None, exclude=None,
+                 rules=None, default_target_folder=None, polling=None):
+        """
+        Args:
+            path: 监听的文件夹
+            recursive: 是否监听子文件夹
+            max_depth: 递归监听时的最大子文件夹深度，None 表示不限制
+            include: 只处理匹配这些通配符的文件（匹配文件名或相对路径）
+            exclude: 不处理匹配这些通配符的文件或文件夹
+            rules: 该文件夹专用的分类规则，None 表示使用全局规则
+            default_target_folder: 该文件夹专用的默认分类文件夹，None 表示使用全局设置
+            polling: 是否使用轮询监听，None 表示位于网络文件系统时自动使用
+        """
+        self.path = os.path.abspath(path)
+        self.recursive = bool(recursive)
+        self.max_depth = max_depth if self.recursive else 0
+        self.rules = rules
+        self.default_target_folder = default_target_folder
+        self.polling = polling
+        self._include = _compile_globs(include)
+        self._exclude = _compile_globs(exclude)
+        self._key = os.path.normcase(self.path)
+
+    @classmethod
+    def from_config(cls, entry):
+        """根据配置文件中的 watch_roots 条目创建实例"""
+        return cls(
+            entry.get('path', ''),
+            recursive=entry.get('recursive', False),
+            max_depth=entry.get('max_depth'),
+            include=entry.get('include'),
+            exclude=entry.get('exclude'),
+            rules=entry.get('rules'),
+            default_target_folder=entry.get('default_target_folder'),
+            polling=entry.get('polling')
+        )
+
+    @property
+    def key(self):
+        """用于比较和查找的规范化路径"""
+        return self._key
+
+    def contains(self, file_path):
+        """判断路径是否位于该文件夹内"""
+        file_key = os.path.normcase(os.path.abspath(file_path))
+        return file_key.startswith(self._key.rstrip(os.sep) + os.sep)
+
+    def accepts(self, file_path):
+        """判断文件是否满足深度和通配符过滤条件
+
+        Args:
+            file_path: 文件的完整路径
+
+        Returns:
+            bool: 是否应该处理该文件
+        """
+        try:
+            relative_path = os.path.normcase(os.path.relpath(file_path, self.path))
+        except ValueError:
+            # Windows 下位于不同驱动器
+            return False
+        if relative_path.startswith(os.pardir):
+            return False
+        depth = relative_path.count(os.sep)
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+
+        file_name = os.path.basename(relative_path)
+        if self._exclude and (self._exclude.match(file_name) or self._exclude.match(relative_path)):
+            return False
+        if self._include and not (self._include.match(file_name) or self._include.match(relative_path)):
+            return False
+        return True
+
+    def accepts_folder(self, folder_path):
+        """判断递归扫描时是否应该进入子文件夹"""
+        relative_path = os.path.normcase(os.path.relpath(folder_path, self.path))
+        if self.max_depth is not None and relative_path.count(os.sep) + 1 > self.max_depth:
+            return False
+        if self._exclude and (self._exclude.match(os.path.basename(relative_path)) or self._exclude.match(relative_path)):
+            return False
+        return True
+
+
+def load_watch_roots(config):
+    """根据配置获取所有被监听的文件夹
+
+    source_folder 总是作为第一个监听文件夹；watch_roots 中相同路径的条目会覆盖它的选项。
+
+    Args:
+        config: 配置字典
+
+    Returns:
+        list: WatchRoot 列表，路径不重复
+    """
+    roots = []
+    seen = {}
+    source_folder = config.get('source_folder', '')
+    if source_folder:
+        root = WatchRoot(source_folder)
+        seen[root.key] = len(roots)
+        roots.append(root)
+
+    for entry in config.get('watch_roots', []):
+        if not entry.get('path'):
+            continue
+        root = WatchRoot.from_config(entry)
+        if root.key in seen:
+            roots[seen[root.key]] = root
+        else:
+            seen[root.key] = len(roots)
+            roots.append(root)
+    return roots
+
+
+def find_root(roots, file_path):
+    """查找包含并接受该文件的监听文件夹，嵌套时返回最内层的文件夹
+
+    Args:
+        roots: WatchRoot 列表
+        file_path: 文件路径
+
+    Returns:
+        WatchRoot: 包含该文件的监听文件夹，没有时返回None
+    """
+    best = None
+    for root in roots:
+        if best is not None and len(root.key) <= len(best.key):
+            continue
+        if root.contains(file_path) and root.accepts(file_path):
+            best = root
+    return best
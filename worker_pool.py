@@ -0,0 +1,268 @@
+import os
+import json
+import queue
+import threading
+
+from logger import logger  # 导入日志模块
+
+
+class ClassificationWorkerPool:
+    """文件分类工作线程池
+
+    每个工作线程拥有一条有界队列（通道），任务按目标文件夹分配到固定的通道，
+    保证同一目标文件夹内的移动按顺序执行，而不同目标文件夹可以并行处理。
+    队列已满时不会阻塞调用方：重复提交的文件会被合并，其余任务溢出到磁盘文件，
+    等队列有空位时再按原顺序读回。
+    """
+
+    def __init__(self, handler, worker_count, queue_size, spill_file=None):
+        """
+        Args:
+            handler: 任务处理函数，参数为文件路径、目标文件夹和分类名称，在工作线程中调用
+            worker_count: 工作线程数量
+            queue_size: 每个工作线程的队列容量
+            spill_file: 队列溢出时写入的磁盘文件路径，为None时溢出任务会被丢弃
+        """
+        self.handler = handler
+        self.worker_count = max(1, int(worker_count))
+        self.queue_size = max(1, int(queue_size))
+        self.spill_file = spill_file
+
+        self._lanes = []
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._queued_paths = set()
+        self._in_flight = 0
+        self._coalesced = 0
+        self._spilled = 0
+        self._spill_pending = 0
+        self._spill_offset = 0
+        self._running = False
+        logger.debug("文件分类线程池已创建: %s 个线程, 队列容量 %s", self.worker_count, self.queue_size)
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._stop_event.clear()
+            self._lanes = [queue.Queue(self.queue_size) for _ in range(self.worker_count)]
+            self._spill_pending = self._count_spilled()
+
+        self._threads = []
+        for index in range(self.worker_count):
+            thread = threading.Thread(target=self._run, args=(index,), name=f'ClassifyWorker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        if self._spill_pending:
+            logger.info("发现 %s 个上次未处理的文件，将继续处理", self._spill_pending)
+            self._refill()
+        logger.debug("文件分类线程池已启动")
+
+    def stop(self):
+        """停止线程池，尚未处理的任务写入溢出文件，下次启动时继续处理"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        # 保存队列中剩余的任务
+        remaining = []
+        for lane in self._lanes:
+            while True:
+                try:
+                    remaining.append(lane.get_nowait())
+                except queue.Empty:
+                    break
+        with self._lock:
+            self._queued_paths.clear()
+            if remaining or self._spill_offset:
+                self._rewrite_spill(remaining)
+        if remaining:
+            logger.info("线程池停止，%s 个未处理的文件已保存", len(remaining))
+        logger.debug("文件分类线程池已停止")
+
+    def submit(self, file_path, target_folder, category=None):
+        """提交分类任务，不会阻塞
+
+        Args:
+            file_path: 文件路径
+            target_folder: 目标文件夹，用于选择处理通道
+            category: 匹配到的分类名称，随任务传给处理函数
+
+        Returns:
+            bool: 任务是否被接受（进入队列或溢出到磁盘）
+        """
+        with self._lock:
+            if not self._running:
+                logger.warning("线程池未运行，无法处理文件: %s", file_path)
+                return False
+
+            # 同一文件已经在队列中，合并事件
+            if file_path in self._queued_paths:
+                self._coalesced += 1
+                logger.debug("文件已在处理队列中，合并事件: %s", file_path)
+                return True
+
+            # 磁盘上有溢出任务时新任务也追加到溢出文件，保证处理顺序
+            if not self._spill_pending:
+                lane = self._lanes[self._lane_index(target_folder)]
+                try:
+                    lane.put_nowait((file_path, target_folder, category))
+                    self._queued_paths.add(file_path)
+                    return True
+                except queue.Full:
+                    pass
+
+            return self._spill([(file_path, target_folder, category)])
+
+    def stats(self):
+        """获取线程池状态
+
+        Returns:
+            dict: 队列深度、正在处理、合并和溢出的任务数量
+        """
+        with self._lock:
+            return {
+                'queue_depth': sum(lane.qsize() for lane in self._lanes),
+                'in_flight': self._in_flight,
+                'coalesced': self._coalesced,
+                'spilled': self._spilled,
+                'spill_pending': self._spill_pending,
+            }
+
+    @property
+    def capacity(self):
+        """全部通道的队列容量之和"""
+        return self.worker_count * self.queue_size
+
+    def is_saturated(self):
+        """队列中的任务达到全部通道总容量的一半，或有任务溢出到磁盘时视为饱和，批量提交的调用方应暂停
+
+        Returns:
+            bool: 是否饱和
+        """
+        with self._lock:
+            return self._spill_pending > 0 or sum(lane.qsize() for lane in self._lanes) >= self.capacity // 2
+
+    def _lane_index(self, target_folder):
+        return hash(os.path.normcase(target_folder or '')) % self.worker_count
+
+    def _run(self, index):
+        lane = self._lanes[index]
+        while not self._stop_event.is_set():
+            try:
+                file_path, target_folder, category = lane.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            with self._lock:
+                self._queued_paths.discard(file_path)
+                self._in_flight += 1
+            try:
+                self.handler(file_path, target_folder, category)
+            except Exception as e:
+                logger.error("处理文件 %s 时出错: %s", file_path, e)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+            if self._spill_pending:
+                self._refill()
+
+    def _spill(self, items):
+        """将任务追加到溢出文件，调用方需持有锁"""
+        if not self.spill_file:
+            logger.warning("处理队列已满，丢弃 %s 个文件", len(items))
+            return False
+        try:
+            with open(self.spill_file, 'a', encoding='utf-8') as f:
+                for item in items:
+                    f.write(json.dumps(list(item), ensure_ascii=False) + '\n')
+        except Exception as e:
+            logger.error("写入溢出文件失败: %s", e)
+            return False
+        self._spilled += len(items)
+        self._spill_pending += len(items)
+        logger.debug("处理队列已满，%s 个文件溢出到磁盘", len(items))
+        return True
+
+    def _rewrite_spill(self, items):
+        """将队列中剩余的任务放在溢出文件未读部分之前重新写入，调用方需持有锁"""
+        if not self.spill_file:
+            return
+        unread = []
+        try:
+            if os.path.exists(self.spill_file):
+                with open(self.spill_file, 'r', encoding='utf-8') as f:
+                    f.seek(self._spill_offset)
+                    unread = [line for line in f if line.strip()]
+            with open(self.spill_file, 'w', encoding='utf-8') as f:
+                for item in items:
+                    f.write(json.dumps(list(item), ensure_ascii=False) + '\n')
+                f.writelines(unread)
+        except Exception as e:
+            logger.error("写入溢出文件失败: %s", e)
+            return
+        self._spill_offset = 0
+        self._spill_pending = len(items) + len(unread)
+
+    def _count_spilled(self):
+        if not self.spill_file or not os.path.exists(self.spill_file):
+            return 0
+        try:
+            with open(self.spill_file, 'r', encoding='utf-8') as f:
+                return sum(1 for line in f if line.strip())
+        except Exception as e:
+            logger.error("读取溢出文件失败: %s", e)
+            return 0
+
+    def _refill(self):
+        """从溢出文件按顺序读回任务，直到某个通道已满"""
+        with self._lock:
+            if not self._running or not self._spill_pending:
+                return
+            try:
+                with open(self.spill_file, 'r', encoding='utf-8') as f:
+                    f.seek(self._spill_offset)
+                    while True:
+                        line = f.readline()
+                        if not line:
+                            break
+                        if not line.strip():
+                            self._spill_offset = f.tell()
+                            continue
+                        try:
+                            # 旧版本的溢出记录没有分类名称
+                            file_path, target_folder, category = (json.loads(line) + [None])[:3]
+                        except (ValueError, TypeError):
+                            logger.warning("忽略无法解析的溢出记录: %s", line.strip())
+                            self._spill_offset = f.tell()
+                            self._spill_pending -= 1
+                            continue
+                        if file_path not in self._queued_paths:
+                            lane = self._lanes[self._lane_index(target_folder)]
+                            try:
+                                lane.put_nowait((file_path, target_folder, category))
+                            except queue.Full:
+                                break
+                            self._queued_paths.add(file_path)
+                        self._spill_offset = f.tell()
+                        self._spill_pending -= 1
+
+                # 溢出文件已全部读回，清空文件
+                if self._spill_pending <= 0:
+                    self._spill_pending = 0
+                    self._spill_offset = 0
+                    os.remove(self.spill_file)
+            except FileNotFoundError:
+                self._spill_pending = 0
+                self._spill_offset = 0
+            except Exception as e:
+                logger.error("读取溢出文件失败: %s", e)